@@ -0,0 +1,40 @@
+"""Project estimate summary
+
+Revision ID: c8e1f2a3b4d5
+Revises: 7402b1fa9269
+Create Date: 2025-06-02 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f2a3b4d5'
+down_revision: Union[str, None] = '7402b1fa9269'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'project_estimate',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('slopes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('sheets_amount', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('accessories', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('project_id', sa.UUID(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('project_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('project_estimate')
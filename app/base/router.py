@@ -13,6 +13,7 @@ from app.base.schemas import (
 )
 from app.db import get_session
 from app.exceptions import RoofNotFound, TariffNotFound
+from app.projects.estimate import remove_accessory_base
 from app.users.dependencies import get_current_user
 from app.users.models import Users
 
@@ -164,13 +165,14 @@ async def delete_accessories_base(
     session: AsyncSession = Depends(get_session)
 ) -> None:
     """
-    Удаляет доборный материал из библиотеки по его идентификатору.
+    Удаляет доборный материал из библиотеки по его идентификатору
+    вместе с аксессуарами проектов и их строками в сметах.
 
     :param accessory_id: Идентификатор доборного материала.
     :param user: Текущий пользователь.
     :param session: Асинхронная сессия для работы с базой данных.
     """
-    await Accessory_baseDAO.delete_(session, model_id=accessory_bd_id)
+    await remove_accessory_base(session, accessory_bd_id)
 
 
 @router.post("/tariff", description="Добавление тарифа в библиотеку")
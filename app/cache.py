@@ -0,0 +1,166 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from loguru import logger
+
+from app.metrics import CacheMetrics, timed_redis
+
+
+def content_hash(data: Any) -> str:
+    """
+    Канонический хэш данных: JSON с сортировкой ключей и без пробелов, затем sha256.
+    """
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LRUCache:
+    """
+    Локальный LRU-кэш строковых значений с вытеснением по суммарному размеру.
+
+    :param max_bytes: предельный суммарный размер значений (в символах).
+    :param ttl: время жизни записи в секундах (None — без ограничения).
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self.delete(key)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (value, expires_at)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self._data.popitem(last=False)
+            self.size -= len(evicted)
+
+    def delete(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+
+class TieredCache:
+    """
+    Двухуровневый кэш JSON-значений: локальный LRU процесса и Redis.
+
+    Клиент Redis (app.state.redis) привязывается в lifespan приложения;
+    без него и при ошибках Redis кэш работает только локально.
+
+    :param ttl: время жизни записи в Redis, секунды.
+    :param local_ttl: время жизни записи в локальном LRU (None — без ограничения).
+    """
+
+    def __init__(self, prefix: str, max_bytes: int, ttl: int, local_ttl: Optional[float] = None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.local = LRUCache(max_bytes, ttl=local_ttl)
+        self.redis = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.metrics = CacheMetrics(prefix)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        result = "local_hit"
+        if value is None and self.redis is not None:
+            try:
+                with timed_redis(self.prefix, "get"):
+                    value = await self.redis.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning("Redis cache get failed for {}: {}", self.prefix, e)
+                value = None
+            if value is not None:
+                self.redis_hits += 1
+                result = "redis_hit"
+                self.local.set(key, value)
+        if value is None:
+            self.misses += 1
+            self.metrics.observe(self.stats(), "miss")
+            return None
+        self.hits += 1
+        self.metrics.observe(self.stats(), result)
+        return json.loads(value)
+
+    async def set(self, key: str, data: Any) -> None:
+        value = json.dumps(data, separators=(",", ":"))
+        self.local.set(key, value)
+        self.metrics.observe(self.stats())
+        if self.redis is not None:
+            try:
+                with timed_redis(self.prefix, "set"):
+                    await self.redis.set(self._redis_key(key), value, ex=self.ttl)
+            except Exception as e:
+                logger.warning("Redis cache set failed for {}: {}", self.prefix, e)
+
+    async def add(self, key: str, data: Any) -> bool:
+        """
+        Записать значение, только если ключа еще нет (в Redis — SET NX): значение,
+        записанное другим запросом или процессом, не перезаписывается.
+
+        :return: True, если значение записано.
+        """
+        if self.local.get(key) is not None:
+            return False
+        value = json.dumps(data, separators=(",", ":"))
+        if self.redis is not None:
+            try:
+                with timed_redis(self.prefix, "set"):
+                    if not await self.redis.set(self._redis_key(key), value, ex=self.ttl, nx=True):
+                        return False
+            except Exception as e:
+                logger.warning("Redis cache set failed for {}: {}", self.prefix, e)
+        self.local.set(key, value)
+        self.metrics.observe(self.stats())
+        return True
+
+    async def delete(self, key: str) -> None:
+        self.local.delete(key)
+        self.metrics.observe(self.stats())
+        if self.redis is not None:
+            try:
+                with timed_redis(self.prefix, "delete"):
+                    await self.redis.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning("Redis cache delete failed for {}: {}", self.prefix, e)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "entries": len(self.local),
+            "bytes": self.local.size,
+        }
@@ -18,9 +18,46 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = os.getenv("DB_PASSWORD")
     DB_NAME: str = os.getenv("DB_NAME")
 
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 30 * 60))
+    DB_POOL_PRE_PING: int = int(os.getenv("DB_POOL_PRE_PING", 1))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+
     REDIS_HOST: str = os.getenv("REDIS_HOST")
     REDIS_PORT: str = os.getenv("REDIS_PORT")
 
+    GEOMETRY_WORKERS: int = int(os.getenv("GEOMETRY_WORKERS", 2))
+    GEOMETRY_INLINE_THRESHOLD: int = int(os.getenv("GEOMETRY_INLINE_THRESHOLD", 40))
+
+    LAYOUT_CACHE_MAX_BYTES: int = int(os.getenv("LAYOUT_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    LAYOUT_CACHE_TTL: int = int(os.getenv("LAYOUT_CACHE_TTL", 24 * 60 * 60))
+
+    PLAN_CACHE_MAX_BYTES: int = int(os.getenv("PLAN_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    PLAN_CACHE_TTL: int = int(os.getenv("PLAN_CACHE_TTL", 7 * 24 * 60 * 60))
+
+    AUTH_CACHE_MAX_BYTES: int = int(os.getenv("AUTH_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+    AUTH_CACHE_TTL: int = int(os.getenv("AUTH_CACHE_TTL", 60))
+    AUTH_CACHE_LOCAL_TTL: int = int(os.getenv("AUTH_CACHE_LOCAL_TTL", 5))
+
+    GEOIP_DB_PATH: str = os.getenv("GEOIP_DB_PATH", "/auto_app/service/GeoLite2-City.mmdb")
+    GEOIP_CACHE_BYTES: int = int(os.getenv("GEOIP_CACHE_BYTES", 256 * 1024))
+
+    PASSWORD_WORKERS: int = int(os.getenv("PASSWORD_WORKERS", 2))
+    PASSWORD_MAX_WAITING: int = int(os.getenv("PASSWORD_MAX_WAITING", 100))
+
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "exports")
+    EXPORT_CONCURRENCY: int = int(os.getenv("EXPORT_CONCURRENCY", 4))
+    EXPORT_MAX_PROJECTS: int = int(os.getenv("EXPORT_MAX_PROJECTS", 200))
+    EXPORT_TTL: int = int(os.getenv("EXPORT_TTL", 24 * 60 * 60))
+
+    DEBUG: int = int(os.getenv("DEBUG", 0))
+    PATH_LOGS: str = os.getenv("PATH_LOGS", "logs/app.log")
+    PATH_SLOW_LOGS: str = os.getenv("PATH_SLOW_LOGS", "logs/slow.log")
+    SLOW_REQUEST_QUERIES: int = int(os.getenv("SLOW_REQUEST_QUERIES", 30))
+    SLOW_REQUEST_DB_MS: int = int(os.getenv("SLOW_REQUEST_DB_MS", 500))
+
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = os.getenv("ALGORITHM")
 
@@ -1,8 +1,15 @@
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from sqlalchemy import insert, select, delete, update, Result
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
+
+# Профили загрузки связей (см. BaseDAO.load_profiles)
+GEOMETRY = "geometry"        # координаты: линии с концами, измерения с линиями и точками
+SHEETS_ONLY = "sheets-only"  # листы с отметками об удалении/замене
+FULL_GRAPH = "full-graph"    # все связи так, как они настроены в моделях (lazy='joined')
+LOAD_PROFILES = (GEOMETRY, SHEETS_ONLY, FULL_GRAPH)
 
 
 class BaseDAO:
@@ -15,30 +22,47 @@ class BaseDAO:
 
     model = None  # Каждая наследуемая DAO-класс должна указать свою модель, например: model = UserModel
 
+    # Опции загрузки для профилей GEOMETRY и SHEETS_ONLY: {профиль: (selectinload(...), ...)}.
+    # Профиль, не указанный в словаре, загружает только колонки модели (raiseload('*')).
+    load_profiles: Dict[str, Tuple] = {}
+
+    @classmethod
+    def profile_options(cls, profile: Optional[str]) -> Tuple:
+        """
+        Опции запроса для профиля загрузки; None и FULL_GRAPH — настройки связей из модели.
+        """
+        if profile is None or profile == FULL_GRAPH:
+            return ()
+        if profile not in LOAD_PROFILES:
+            raise ValueError(f"Unknown load profile: {profile}")
+        return cls.load_profiles.get(profile, (raiseload('*'),))
+
     @classmethod
-    async def find_by_id(cls, session: AsyncSession, model_id: UUID) -> Optional[Any]:
+    async def find_by_id(cls, session: AsyncSession, model_id: UUID, profile: Optional[str] = None) -> Optional[Any]:
         """
         Вернуть одну запись по её ID или None.
         """
-        query = select(cls.model).filter_by(id=model_id)
+        query = select(cls.model).filter_by(id=model_id).options(*cls.profile_options(profile))
         result: Result = await session.execute(query)
         return result.unique().scalars().one_or_none()
 
     @classmethod
-    async def find_one_or_none(cls, session: AsyncSession, **filter_by) -> Optional[Any]:
+    async def find_one_or_none(cls, session: AsyncSession, profile: Optional[str] = None, **filter_by) -> Optional[Any]:
         """
         Вернуть одну запись по фильтрам или None.
         """
-        query = select(cls.model).filter_by(**filter_by)
+        query = select(cls.model).filter_by(**filter_by).options(*cls.profile_options(profile))
         result: Result = await session.execute(query)
-        return result.scalars().one_or_none()
+        return result.unique().scalars().one_or_none()
 
     @classmethod
-    async def find_all(cls, session: AsyncSession, **filter_by) -> List[Any]:
+    async def find_all(cls, session: AsyncSession, profile: Optional[str] = None, **filter_by) -> List[Any]:
         """
         Вернуть все записи, удовлетворя фильтрам (или все записи, если фильтры не заданы).
+
+        :param profile: профиль загрузки связей (GEOMETRY, SHEETS_ONLY, FULL_GRAPH).
         """
-        query = select(cls.model).filter_by(**filter_by)
+        query = select(cls.model).filter_by(**filter_by).options(*cls.profile_options(profile))
         result: Result = await session.execute(query)
         return result.scalars().unique().all()
 
@@ -63,6 +87,35 @@ class BaseDAO:
         await session.execute(query)
         await session.flush()
 
+    @classmethod
+    async def delete_by(cls, session: AsyncSession, *filters, **filter_by) -> None:
+        """
+        Удалить все записи, подходящие под условия, одним DELETE.
+        Например: delete_by(session, slope_id=slope_id) или delete_by(session, Sheet.id.in_(ids))
+        """
+        query = delete(cls.model).filter(*filters).filter_by(**filter_by)
+        await session.execute(query)
+
+    @classmethod
+    async def add_many(cls, session: AsyncSession, rows: List[dict]) -> None:
+        """
+        Добавить несколько записей одним многострочным INSERT (без RETURNING и flush на каждую строку).
+        Значения по умолчанию (например, id=uuid4) подставляются на стороне Python.
+        """
+        if not rows:
+            return
+        await session.execute(insert(cls.model), rows)
+
+    @classmethod
+    async def update_many(cls, session: AsyncSession, rows: List[dict]) -> None:
+        """
+        Обновить несколько записей по первичному ключу одним executemany UPDATE.
+        Каждый словарь должен содержать `id` и обновляемые поля.
+        """
+        if not rows:
+            return
+        await session.execute(update(cls.model), rows)
+
     @classmethod
     async def update_(cls, session: AsyncSession, model_id: UUID, **data) -> Optional[Any]:
         """
@@ -1,12 +1,36 @@
+from typing import Awaitable, Callable
+
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.config import settings
+from app.db_stats import TimedAsyncQueuePool, instrument_engine
 
 
 DATABASE_URL = settings.db_url
 
-engine = create_async_engine(DATABASE_URL)
+# Пул на каждый процесс uvicorn: при --workers 4 до 4 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) соединений.
+# statement_cache_size — кэш подготовленных выражений asyncpg, prepared_statement_cache_size —
+# кэш SQLAlchemy поверх него; за pgbouncer в режиме transaction оба должны быть 0.
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=bool(settings.DB_POOL_PRE_PING),
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+)
+instrument_engine(engine)
+
+# Тот же пул, но транзакции только на чтение. REPEATABLE READ дает всем запросам
+# обработчика один снимок (граф проекта читается несколькими SELECT), а read only
+# транзакции в PostgreSQL на этом уровне не получают ошибок сериализации.
+read_engine = engine.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
 
 async_session_maker = sessionmaker(
     engine,
@@ -14,6 +38,12 @@ async_session_maker = sessionmaker(
     expire_on_commit=False
     )
 
+async_read_session_maker = sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+    )
+
 
 class Base(DeclarativeBase):
 
@@ -37,12 +67,45 @@ async def delete_tables():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Отложить действие до фиксации транзакции сессии (например, сброс кэша,
+    чтобы параллельный запрос не закэшировал данные, которые еще не зафиксированы).
+    При откате транзакции действие не выполняется.
+
+    :param callback: async-функция без аргументов.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session: AsyncSession) -> None:
+    """
+    Выполнить действия, отложенные через after_commit. Вызывается после выхода из session.begin().
+    """
+    for callback in session.info.pop("after_commit", []):
+        await callback()
+
+
 async def get_session() -> AsyncSession:
     """
     Зависимость для получения асинхронной сессии работы с базой данных.
+    После фиксации транзакции выполняются действия, отложенные через after_commit.
 
     :return: Объект AsyncSession.
     """
     async with async_session_maker() as session:
         async with session.begin():
             yield session
+        await run_after_commit(session)
+
+
+async def get_read_session() -> AsyncSession:
+    """
+    Зависимость для GET-эндпоинтов: сессия с транзакцией только на чтение.
+    Попытка записи завершится ошибкой базы данных.
+
+    :return: Объект AsyncSession.
+    """
+    async with async_read_session_maker() as session:
+        async with session.begin():
+            yield session
@@ -0,0 +1,209 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.logging import log_slow_request
+from app.metrics import DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS, observe_pool
+
+# Длина текста запроса, сохраняемого как самый медленный
+STATEMENT_MAX_LENGTH = 500
+
+
+@dataclass
+class RequestQueries:
+    """
+    SQL-запросы одного HTTP-запроса: число, суммарное время и самый медленный.
+    """
+    count: int = 0
+    seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def observe(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement[:STATEMENT_MAX_LENGTH]
+
+
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = current_queries.get()
+    started = getattr(context, "_stats_started", None)
+    if queries is not None and started is not None:
+        queries.observe(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Подключить учет запросов к движку (AsyncEngine или Engine).
+    Запросы вне HTTP-запроса (миграции, фоновые задачи) не учитываются.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    for name, listener in (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+    ):
+        if not event.contains(sync_engine, name, listener):
+            event.listen(sync_engine, name, listener)
+
+
+class TimedCheckoutMixin:
+    """
+    Замер выдачи соединения пулом (ожидание свободного соединения или открытие нового)
+    в roof_db_pool_checkout_seconds, исчерпание пула — в roof_db_pool_timeouts_total,
+    заполнение после выдачи и возврата соединения — в roof_db_pool_*.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        observe_pool(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+        observe_pool(self)
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        observe_pool(self)
+
+
+class TimedAsyncQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+@dataclass
+class EndpointQueries:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def observe(self, queries: RequestQueries) -> None:
+        self.requests += 1
+        self.queries += queries.count
+        self.max_queries = max(self.max_queries, queries.count)
+        self.seconds += queries.seconds
+        self.max_seconds = max(self.max_seconds, queries.seconds)
+        if queries.slowest_seconds >= self.slowest_seconds and queries.slowest_statement is not None:
+            self.slowest_seconds = queries.slowest_seconds
+            self.slowest_statement = queries.slowest_statement
+
+
+@dataclass
+class QueryStats:
+    """
+    Накопленные по эндпоинтам ("GET /roofs/projects/{project_id}") данные о запросах к БД.
+    """
+    endpoints: Dict[str, EndpointQueries] = field(default_factory=dict)
+
+    def observe(self, endpoint: str, queries: RequestQueries) -> None:
+        self.endpoints.setdefault(endpoint, EndpointQueries()).observe(queries)
+
+    def snapshot(self) -> dict:
+        return {
+            endpoint: {
+                "requests": s.requests,
+                "avg_queries": s.queries / s.requests,
+                "max_queries": s.max_queries,
+                "avg_db_seconds": s.seconds / s.requests,
+                "max_db_seconds": s.max_seconds,
+                "slowest_seconds": s.slowest_seconds,
+                "slowest_statement": s.slowest_statement,
+            }
+            for endpoint, s in self.endpoints.items()
+        }
+
+
+query_stats = QueryStats()
+
+
+def endpoint_name(scope) -> str:
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+
+
+def is_slow(queries: RequestQueries) -> bool:
+    return (
+        queries.count > settings.SLOW_REQUEST_QUERIES
+        or queries.seconds * 1000 > settings.SLOW_REQUEST_DB_MS
+    )
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware: привязывает RequestQueries к запросу (contextvar и request.state.db_queries),
+    после ответа учитывает его в query_stats и пишет медленные запросы в slow-лог.
+
+    В режиме DEBUG добавляет заголовки X-DB-Queries, X-DB-Time-Ms и X-DB-Slowest-Ms.
+    Зависимость get_session закрывает транзакцию до отправки ответа, поэтому
+    в заголовках учтены все запросы обработчика.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+        scope.setdefault("state", {})["db_queries"] = queries
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_stats(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.DEBUG:
+                    message.setdefault("headers", [])
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(queries.count)
+                    headers["X-DB-Time-Ms"] = f"{queries.seconds * 1000:.1f}"
+                    headers["X-DB-Slowest-Ms"] = f"{queries.slowest_seconds * 1000:.1f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_queries.reset(token)
+            endpoint = endpoint_name(scope)
+            query_stats.observe(endpoint, queries)
+            if is_slow(queries):
+                log_slow_request(
+                    endpoint=endpoint,
+                    status=status,
+                    duration=time.perf_counter() - started,
+                    queries=queries.count,
+                    db_seconds=queries.seconds,
+                    slowest_seconds=queries.slowest_seconds,
+                    slowest_statement=queries.slowest_statement
+                )
@@ -167,4 +167,24 @@ class AccessoryNotFound(AutoException):
 
 class AddressNotFoundError(AutoException):
     status_code = status.HTTP_400_BAD_REQUEST
-    detail = "Адрес не найден."
\ No newline at end of file
+    detail = "Адрес не найден."
+
+
+class PasswordServiceBusyException(AutoException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    detail = "Сервис временно перегружен, повторите попытку позже."
+
+
+class ExportJobNotFound(AutoException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Задача выгрузки не найдена."
+
+
+class ExportNotReady(AutoException):
+    status_code = status.HTTP_409_CONFLICT
+    detail = "Выгрузка еще не готова."
+
+
+class ExportTooLarge(AutoException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Слишком много проектов в одной выгрузке."
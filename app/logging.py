@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 from loguru import logger
 
@@ -21,6 +22,36 @@ class InterceptHandler(logging.Handler):
         logger_opt.log(self._get_level(record), record.getMessage())
 
 
+def _is_slow_request(record) -> bool:
+    return record["extra"].get("slow_request", False)
+
+
 async def setup():
     logging.basicConfig(handlers=[InterceptHandler()], level=logging.DEBUG)
     logger.add(settings.PATH_LOGS, rotation="5 MB")
+    # Медленные запросы — отдельным файлом, по записи JSON на строку
+    logger.add(settings.PATH_SLOW_LOGS, rotation="5 MB", serialize=True, filter=_is_slow_request)
+
+
+def log_slow_request(
+    endpoint: str,
+    status: int,
+    duration: float,
+    queries: int,
+    db_seconds: float,
+    slowest_seconds: float,
+    slowest_statement: Optional[str]
+) -> None:
+    """
+    Запись о медленном запросе: поля доступны в extra (slow_request=True) для структурированного лога.
+    """
+    logger.bind(
+        slow_request=True,
+        endpoint=endpoint,
+        status=status,
+        duration_ms=round(duration * 1000, 1),
+        queries=queries,
+        db_ms=round(db_seconds * 1000, 1),
+        slowest_ms=round(slowest_seconds * 1000, 1),
+        slowest_statement=slowest_statement
+    ).warning("Slow request {}: {} queries, {:.1f} ms in DB", endpoint, queries, db_seconds * 1000)
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import os
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+
+# Границы корзин в секундах: от миллисекунд (кэш, простые скаты) до десятков секунд (большие планы)
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+GEOMETRY_STAGE_SECONDS = Histogram(
+    "roof_geometry_stage_seconds",
+    "Duration of slope geometry stages",
+    ["stage", "mode"],
+    buckets=SECONDS_BUCKETS
+)
+GEOMETRY_WAIT_SECONDS = Histogram(
+    "roof_geometry_queue_wait_seconds",
+    "Time geometry tasks wait for a free worker process",
+    ["stage"],
+    buckets=SECONDS_BUCKETS
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "roof_db_pool_checkout_seconds",
+    "Time to get a connection from the SQLAlchemy pool",
+    buckets=SECONDS_BUCKETS
+)
+DB_POOL_TIMEOUTS = Counter(
+    "roof_db_pool_timeouts",
+    "Connection requests that waited longer than DB_POOL_TIMEOUT"
+)
+PLAN_RENDERS = Counter(
+    "roof_plan_renders",
+    "Plan cache misses: rendered, or joined to a render already in progress",
+    ["result"]
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "roof_redis_command_seconds",
+    "Latency of Redis commands issued by the application caches",
+    ["cache", "command"],
+    buckets=SECONDS_BUCKETS
+)
+
+# Значения, которые ведут сами объекты приложения. Под uvicorn --workers каждый воркер
+# пишет свои значения в PROMETHEUS_MULTIPROC_DIR, при сборе они объединяются:
+# livesum — сумма по живым воркерам, livemax — худший воркер, liveall — каждый с меткой pid
+CACHE_REQUESTS = Counter("roof_cache_requests", "Cache lookups by result", ["cache", "result"])
+CACHE_HIT_RATIO = Gauge(
+    "roof_cache_hit_ratio", "Share of cache lookups that hit", ["cache"], multiprocess_mode="liveall"
+)
+CACHE_LOCAL_ENTRIES = Gauge(
+    "roof_cache_local_entries", "Entries in the local LRU", ["cache"], multiprocess_mode="livesum"
+)
+CACHE_LOCAL_BYTES = Gauge("roof_cache_local_bytes", "Size of the local LRU", ["cache"], multiprocess_mode="livesum")
+GEOMETRY_PENDING = Gauge("roof_geometry_pending", "Geometry tasks submitted to the pool", multiprocess_mode="livesum")
+GEOMETRY_TASKS = Counter("roof_geometry_tasks", "Geometry tasks by execution mode", ["task", "mode"])
+PASSWORD_WAITING = Gauge(
+    "roof_password_waiting", "Password operations waiting for a thread", multiprocess_mode="livesum"
+)
+PASSWORD_IN_FLIGHT = Gauge("roof_password_in_flight", "Password operations running", multiprocess_mode="livesum")
+PASSWORD_CALLS = Counter("roof_password_calls", "Password operations executed")
+PASSWORD_REJECTED = Counter("roof_password_rejected", "Password operations rejected as busy")
+PASSWORD_AVG_WAIT_SECONDS = Gauge(
+    "roof_password_avg_wait_seconds", "Average wait for a password thread", multiprocess_mode="livemax"
+)
+# Ключи pool_snapshot -> метрики заполнения пула соединений БД
+DB_POOL_GAUGES = {
+    "size": Gauge("roof_db_pool_size", "Persistent connections of the pool", multiprocess_mode="livesum"),
+    "max_connections": Gauge(
+        "roof_db_pool_max_connections", "Pool size plus max overflow", multiprocess_mode="livesum"
+    ),
+    "checked_out": Gauge("roof_db_pool_checked_out", "Connections in use", multiprocess_mode="livesum"),
+    "checked_in": Gauge("roof_db_pool_checked_in", "Idle connections in the pool", multiprocess_mode="livesum"),
+    "overflow": Gauge("roof_db_pool_overflow", "Connections opened above the pool size", multiprocess_mode="livesum"),
+    "saturation": Gauge(
+        "roof_db_pool_saturation", "Share of max connections in use", multiprocess_mode="livemax"
+    ),
+}
+
+# Задачи geometry_executor -> этап геометрии в метриках
+GEOMETRY_TASK_STAGES = {
+    "find_slopes": "find_slope",
+    "rotate_lines": "rotate_slope",
+    "slope_figure": "create_figure",
+    "slope_is_left": "create_figure",
+    "slope_layout": "create_sheets",
+    "slope_plan": "draw_plan",
+}
+
+
+def observe_geometry_task(task: str, run: float, wait: float, inline: bool) -> None:
+    stage = GEOMETRY_TASK_STAGES.get(task, task)
+    mode = "inline" if inline else "pool"
+    GEOMETRY_STAGE_SECONDS.labels(stage=stage, mode=mode).observe(run)
+    GEOMETRY_TASKS.labels(task=task, mode=mode).inc()
+    if not inline:
+        GEOMETRY_WAIT_SECONDS.labels(stage=stage).observe(wait)
+
+
+def timed_stage(stage: str):
+    """
+    Декоратор: время вызова функции (обычной или async) в roof_geometry_stage_seconds{stage}.
+    """
+    histogram = GEOMETRY_STAGE_SECONDS.labels(stage=stage, mode="inline")
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time():
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class CacheMetrics:
+    """
+    Метрики одного TieredCache: запросы по результату и заполнение локального LRU.
+    """
+
+    def __init__(self, cache: str):
+        self.requests = {
+            result: CACHE_REQUESTS.labels(cache=cache, result=result)
+            for result in ("local_hit", "redis_hit", "miss")
+        }
+        self.hit_ratio = CACHE_HIT_RATIO.labels(cache=cache)
+        self.entries = CACHE_LOCAL_ENTRIES.labels(cache=cache)
+        self.bytes = CACHE_LOCAL_BYTES.labels(cache=cache)
+
+    def observe(self, stats: dict, result: Optional[str] = None) -> None:
+        if result is not None:
+            self.requests[result].inc()
+        self.hit_ratio.set(stats["hit_ratio"])
+        self.entries.set(stats["entries"])
+        self.bytes.set(stats["bytes"])
+
+
+class timed_redis:
+    """
+    Контекстный менеджер: время команды Redis в roof_redis_command_seconds (в том числе с ошибкой).
+    """
+
+    def __init__(self, cache: str, command: str):
+        self.histogram = REDIS_COMMAND_SECONDS.labels(cache=cache, command=command)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+def pool_snapshot(pool) -> dict:
+    """
+    Заполнение QueuePool: overflow() у SQLAlchemy отрицателен, пока не открыты все
+    pool_size соединений, поэтому здесь считается только превышение размера.
+    """
+    size = pool.size()
+    max_connections = size + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": size,
+        "max_connections": max_connections,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": checked_out / max_connections if max_connections else 0.0,
+    }
+
+
+def observe_pool(pool) -> None:
+    """
+    Записать заполнение пула соединений в roof_db_pool_* (после выдачи и возврата соединения).
+    """
+    for name, value in pool_snapshot(pool).items():
+        DB_POOL_GAUGES[name].set(value)
+
+
+def mark_process_dead() -> None:
+    """
+    Убрать live-метрики завершающегося воркера из PROMETHEUS_MULTIPROC_DIR.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,50 @@
+from typing import Tuple
+
+from app.cache import TieredCache, content_hash
+from app.config import settings
+from app.projects.executor import geo_lines, geometry_executor, input_size, roof_params, slope_layout
+
+# Меняется при изменении алгоритма раскладки, чтобы не отдавать старые результаты
+LAYOUT_VERSION = 1
+
+layout_cache = TieredCache(
+    prefix="layout",
+    max_bytes=settings.LAYOUT_CACHE_MAX_BYTES,
+    ttl=settings.LAYOUT_CACHE_TTL
+)
+
+
+def layout_key(lines, cutouts, roof, is_left, overhang) -> str:
+    """
+    Ключ раскладки: хэш упорядоченных координат линий ската, контуров вырезов,
+    параметров раскладки покрытия, направления и свеса.
+    """
+    return content_hash([
+        LAYOUT_VERSION,
+        [[line.start.x, line.start.y, line.end.x, line.end.y] for line in lines],
+        [[[x, y] for x, y in cutout] for cutout in cutouts],
+        [roof.overall_width, roof.useful_width, roof.overlap, roof.min_length, roof.max_length, roof.imp_sizes],
+        bool(is_left),
+        overhang
+    ])
+
+
+async def cached_slope_layout(lines, cutouts, roof, is_left, overhang) -> Tuple[float, list]:
+    """
+    Площадь ската и раскладка листов с учетом кэша.
+    При промахе расчет выполняется в geometry_executor, результат сохраняется в кэш.
+
+    :param lines: линии ската, отсортированные по номеру.
+    :return: (площадь ската, строки листов [x, y, length, area_overall, area_usefull]).
+    """
+    key = layout_key(lines, cutouts, roof, is_left, overhang)
+    cached = await layout_cache.get(key)
+    if cached is not None:
+        area, sheets = cached
+        return area, sheets
+    area, sheets = await geometry_executor.run(
+        slope_layout, geo_lines(lines), cutouts, roof_params(roof), is_left, overhang,
+        size=input_size(lines, cutouts)
+    )
+    await layout_cache.set(key, [area, sheets])
+    return area, sheets
@@ -0,0 +1,68 @@
+"""
+Проверка сохранённых смет проектов: каждая смета пересчитывается из листов,
+скатов и аксессуаров и сравнивается с сохранённой.
+
+    python -m app.projects.check_estimates [--fix] [project_id ...]
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.db import async_session_maker
+from app.projects.dao import ProjectEstimateDAO
+from app.projects.estimate import build_estimate, estimate_diff
+from app.projects.models import Projects
+
+
+async def check_estimates(project_ids: list, fix: bool) -> int:
+    """
+    :param project_ids: проекты для проверки (пустой список — все проекты).
+    :param fix: перезаписать расходящиеся и отсутствующие сметы.
+    :return: количество проектов с расхождениями.
+    """
+    mismatches = 0
+    async with async_session_maker() as session:
+        async with session.begin():
+            if not project_ids:
+                result = await session.execute(select(Projects.id))
+                project_ids = result.scalars().all()
+            for project_id in project_ids:
+                fresh = await build_estimate(session, project_id)
+                stored = await ProjectEstimateDAO.find_one_or_none(session, project_id=project_id)
+                if stored is None:
+                    diff = ["estimate is missing"]
+                else:
+                    diff = estimate_diff(
+                        {
+                            'slopes': stored.slopes,
+                            'sheets_amount': stored.sheets_amount,
+                            'accessories': stored.accessories
+                        },
+                        fresh
+                    )
+                if not diff:
+                    continue
+                mismatches += 1
+                for line in diff:
+                    logger.warning("Project {}: {}", project_id, line)
+                if fix:
+                    await ProjectEstimateDAO.upsert(session, project_id, **fresh)
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check stored project estimates against raw rows")
+    parser.add_argument("project_ids", nargs="*", type=uuid.UUID)
+    parser.add_argument("--fix", action="store_true", help="rewrite mismatching estimates")
+    args = parser.parse_args()
+    mismatches = asyncio.run(check_estimates(args.project_ids, args.fix))
+    logger.info("Estimates with mismatches: {}", mismatches)
+    sys.exit(1 if mismatches and not args.fix else 0)
+
+
+if __name__ == "__main__":
+    main()
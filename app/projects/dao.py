@@ -1,20 +1,198 @@
-from app.dao.base import BaseDAO
+from datetime import datetime
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from app.dao.base import GEOMETRY, SHEETS_ONLY, BaseDAO
 from app.projects.models import (Accessories, Cutouts, DeletedSheets, LengthSlope, Lines, LinesSlope,
-                                 Materials, Point, PointSlope, PointsCutout, Projects, Sheets, Slopes)
+                                 Materials, Point, PointSlope, PointsCutout, ProjectEstimate, Projects,
+                                 Sheets, Slopes)
+from app.users.models import Users
 
 
 class ProjectsDAO(BaseDAO):
 
     model = Projects
 
+    @classmethod
+    async def find_graph(cls, session: AsyncSession, project_id):
+        """
+        Загрузить проект целиком (покрытие, точки, линии, скаты со всеми дочерними
+        объектами, аксессуары с базой, удалённые листы) фиксированным числом запросов.
+
+        Каждая коллекция подгружается отдельным SELECT ... WHERE ... IN (...),
+        поэтому число запросов не зависит от количества скатов и линий.
+        Связи загруженных объектов, которые не нужны для сборки ответа,
+        помечены raiseload, чтобы случайное обращение не порождало N+1.
+        """
+        query = (
+            select(Projects)
+            .filter_by(id=project_id)
+            .options(
+                joinedload(Projects.roof).raiseload('*'),
+                selectinload(Projects.points).raiseload('*'),
+                selectinload(Projects.lines).raiseload('*'),
+                selectinload(Projects.slopes).options(
+                    selectinload(Slopes.points_slope).raiseload('*'),
+                    selectinload(Slopes.lines_slope).raiseload('*'),
+                    selectinload(Slopes.length_slope).raiseload('*'),
+                    selectinload(Slopes.cutouts).selectinload(Cutouts.points).raiseload('*'),
+                    selectinload(Slopes.sheets).raiseload('*'),
+                ),
+                selectinload(Projects.accessories).joinedload(Accessories.accessory_base).raiseload('*'),
+                selectinload(Projects.deleted_sheets).raiseload('*'),
+            )
+        )
+        result = await session.execute(query)
+        return result.unique().scalars().one_or_none()
+
+    @classmethod
+    async def find_company_ids(cls, session: AsyncSession, company_id, project_ids) -> set:
+        """
+        Id проектов из project_ids, принадлежащих пользователям компании, одним запросом.
+        """
+        query = (
+            select(Projects.id)
+            .join(Users, Users.id == Projects.user_id)
+            .where(Users.company_id == company_id, Projects.id.in_(project_ids))
+        )
+        result = await session.execute(query)
+        return set(result.scalars().all())
+
 
 class SlopesDAO(BaseDAO):
 
     model = Slopes
 
+    @classmethod
+    async def find_areas(cls, session: AsyncSession, project_id):
+        """
+        Скаты проекта с суммарными площадями листов, одним запросом.
+
+        :return: строки (id, name, area, area_overall, area_usefull);
+                 для ската без листов суммы равны 0, удалённые листы не учитываются.
+        """
+        query = (
+            select(
+                Slopes.id,
+                Slopes.name,
+                Slopes.area,
+                func.coalesce(func.sum(Sheets.area_overall), 0).label('area_overall'),
+                func.coalesce(func.sum(Sheets.area_usefull), 0).label('area_usefull')
+            )
+            .outerjoin(Sheets, and_(Sheets.slope_id == Slopes.id, Sheets.is_deleted.is_(False)))
+            .where(Slopes.project_id == project_id)
+            .group_by(Slopes.id)
+        )
+        result = await session.execute(query)
+        return result.all()
+
 
 class SheetsDAO(BaseDAO):
     model = Sheets
+    load_profiles = {
+        SHEETS_ONLY: (
+            selectinload(Sheets.deleted_sheets).raiseload('*'),
+            selectinload(Sheets.change_sheets).raiseload('*'),
+            raiseload('*'),
+        ),
+    }
+
+    @classmethod
+    async def length_histogram(cls, session: AsyncSession, project_id) -> dict:
+        """
+        Количество неудалённых листов каждой длины по всем скатам проекта (GROUP BY length).
+        """
+        query = (
+            select(Sheets.length, func.count())
+            .join(Slopes, Slopes.id == Sheets.slope_id)
+            .where(Slopes.project_id == project_id, Sheets.is_deleted.is_(False))
+            .group_by(Sheets.length)
+            .order_by(Sheets.length)
+        )
+        result = await session.execute(query)
+        return {length: count for length, count in result.all()}
+
+    @classmethod
+    async def delete_returning(cls, session: AsyncSession, *filters, **filter_by) -> list:
+        """
+        Удалить листы одним DELETE ... RETURNING.
+
+        :return: (length, area_overall, area_usefull) удалённых строк,
+                 кроме листов, помеченных is_deleted.
+        """
+        query = (
+            delete(Sheets)
+            .filter(*filters)
+            .filter_by(**filter_by)
+            .returning(Sheets.length, Sheets.area_overall, Sheets.area_usefull, Sheets.is_deleted)
+        )
+        result = await session.execute(query)
+        return [
+            (length, area_overall, area_usefull)
+            for length, area_overall, area_usefull, is_deleted in result.all()
+            if not is_deleted
+        ]
+
+    @classmethod
+    async def replace_for_slope(cls, session: AsyncSession, slope_id, sheets: list) -> list:
+        """
+        Заменить все листы ската: один DELETE по slope_id и один многострочный INSERT.
+
+        :param sheets: строки раскладки [x_start, y_start, length, area_overall, area_usefull].
+        :return: удалённые листы в формате delete_returning.
+        """
+        removed = await cls.delete_returning(session, slope_id=slope_id)
+        await cls.add_many(session, [
+            {
+                'x_start': sh[0],
+                'y_start': sh[1],
+                'length': sh[2],
+                'area_overall': sh[3],
+                'area_usefull': sh[4],
+                'slope_id': slope_id
+            }
+            for sh in sheets
+        ])
+        return removed
+
+
+class ProjectEstimateDAO(BaseDAO):
+    model = ProjectEstimate
+
+    @classmethod
+    async def find_for_update(cls, session: AsyncSession, project_id):
+        """
+        Смета проекта с блокировкой строки (SELECT ... FOR UPDATE) до конца транзакции.
+        """
+        query = (
+            select(ProjectEstimate)
+            .filter_by(project_id=project_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        result = await session.execute(query)
+        return result.scalars().one_or_none()
+
+    @classmethod
+    async def upsert(cls, session: AsyncSession, project_id, **data):
+        """
+        Записать смету проекта целиком (INSERT ... ON CONFLICT (project_id) DO UPDATE).
+        """
+        query = (
+            insert(ProjectEstimate)
+            .values(project_id=project_id, **data)
+            .on_conflict_do_update(
+                index_elements=[ProjectEstimate.project_id],
+                set_={**data, 'updated_at': datetime.utcnow()}
+            )
+            .returning(ProjectEstimate)
+            .execution_options(populate_existing=True)
+        )
+        result = await session.execute(query)
+        return result.scalars().one()
 
 
 class PointsDAO(BaseDAO):
@@ -27,14 +205,45 @@ class PointsSlopeDAO(BaseDAO):
 
 class LinesDAO(BaseDAO):
     model = Lines
+    load_profiles = {
+        GEOMETRY: (
+            selectinload(Lines.start).raiseload('*'),
+            selectinload(Lines.end).raiseload('*'),
+            raiseload('*'),
+        ),
+    }
 
 
 class LinesSlopeDAO(BaseDAO):
     model = LinesSlope
+    load_profiles = {
+        GEOMETRY: (
+            selectinload(LinesSlope.start).raiseload('*'),
+            selectinload(LinesSlope.end).raiseload('*'),
+            raiseload('*'),
+        ),
+    }
 
 
 class LengthSlopeDAO(BaseDAO):
     model = LengthSlope
+    load_profiles = {
+        GEOMETRY: (
+            selectinload(LengthSlope.point_1).raiseload('*'),
+            selectinload(LengthSlope.point_2).raiseload('*'),
+            selectinload(LengthSlope.line_slope_1).options(
+                selectinload(LinesSlope.start).raiseload('*'),
+                selectinload(LinesSlope.end).raiseload('*'),
+                raiseload('*'),
+            ),
+            selectinload(LengthSlope.line_slope_2).options(
+                selectinload(LinesSlope.start).raiseload('*'),
+                selectinload(LinesSlope.end).raiseload('*'),
+                raiseload('*'),
+            ),
+            raiseload('*'),
+        ),
+    }
 
 
 class CutoutsDAO(BaseDAO):
@@ -44,6 +253,32 @@ class CutoutsDAO(BaseDAO):
 class AccessoriesDAO(BaseDAO):
     model = Accessories
 
+    @classmethod
+    async def find_with_base(cls, session: AsyncSession, project_id):
+        """
+        Аксессуары проекта вместе с записями базы аксессуаров (JOIN, один запрос).
+        """
+        query = (
+            select(Accessories)
+            .filter_by(project_id=project_id)
+            .options(joinedload(Accessories.accessory_base).raiseload('*'))
+        )
+        result = await session.execute(query)
+        return result.unique().scalars().all()
+
+    @classmethod
+    async def find_by_base(cls, session: AsyncSession, accessory_base_id) -> list:
+        """
+        (id, project_id) аксессуаров, ссылающихся на запись базы аксессуаров.
+        """
+        query = (
+            select(Accessories.id, Accessories.project_id)
+            .filter_by(accessory_base_id=accessory_base_id)
+            .order_by(Accessories.project_id)
+        )
+        result = await session.execute(query)
+        return result.all()
+
 
 class MaterialsDAO(BaseDAO):
     model = Materials
@@ -1,153 +1,323 @@
-import base64
-import matplotlib.pyplot as plt
-from matplotlib import patches
-import openpyxl
-from openpyxl.styles import Alignment, Font, Border, Side
+import asyncio
+import tempfile
+from copy import copy
 from io import BytesIO
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, NamedTuple, Tuple
+from xml.sax.saxutils import escape
 
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.utils import get_column_letter
 
-def draw_plan(lines, sheets, width):
-    # Предварительное вычисление максимальных значений координат
-    x_values = [sheet.x_start + width for sheet in sheets] + [line.x_end for line in lines]
-    y_values = [sheet.y_start + sheet.length for sheet in sheets] + [line.y_end for line in lines]
-    x_max = max(x_values)
-    y_max = max(y_values)
+from app.metrics import timed_stage
 
-    fig, ax = plt.subplots()
+PLAN_FORMATS = ("svg", "png")
 
-    # Общие параметры для стилей текста и рамок
-    bbox_props = dict(facecolor='white', edgecolor='none', boxstyle='round,pad=0.3')
-    text_props = dict(ha='center', va='center', fontsize=6, color='black', bbox=bbox_props)
+# Единица SVG — сантиметр плана (100 на метр): при 96 dpi это 1 px на сантиметр
+SVG_UNITS_PER_METER = 100
+PNG_DPI = 150
+# PNG больше этого числа пикселей рисуется с уменьшенным dpi
+PNG_MAX_PIXELS = 25_000_000
+# Размер кусков, которыми отдается SVG
+SVG_CHUNK_BYTES = 64 * 1024
 
-    # Рисуем листы в виде прямоугольников
-    for sheet in sheets:
-        rectangle = patches.Rectangle(
-            (sheet.x_start, sheet.y_start),
-            width,
-            sheet.length,
-            linewidth=1,
-            edgecolor='gray',
-            facecolor='none'
-        )
-        ax.add_patch(rectangle)
-        ax.text(
-            sheet.x_start + width / 2,
-            sheet.y_start + sheet.length / 2,
-            f"{sheet.length:.2f}",
-            **text_props
-        )
+SVG_STYLE = (
+    "<style>"
+    ".grid{stroke:#808080;stroke-width:0.5;stroke-dasharray:4 3}"
+    ".sheet{fill:none;stroke:#808080;stroke-width:1}"
+    ".line{stroke:#000;stroke-width:3;stroke-linecap:round}"
+    "text{font-family:sans-serif;font-size:6px;text-anchor:middle;dominant-baseline:central;"
+    "paint-order:stroke;stroke:#fff;stroke-width:2px}"
+    ".line-label{font-weight:600}"
+    "</style>"
+)
+
+
+class PlanLine(NamedTuple):
+    x_start: float
+    y_start: float
+    x_end: float
+    y_end: float
+    name: str
+
+
+class PlanSheet(NamedTuple):
+    x_start: float
+    y_start: float
+    length: float
+
+
+def _num(value: float) -> str:
+    """
+    Координата с точностью 0.1 единицы без лишних нулей: одинаковые входные
+    данные всегда дают одинаковый текст.
+    """
+    text = f"{value:.1f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def plan_size(lines, sheets, width) -> Tuple[float, float]:
+    """
+    Размер поля плана в метрах: от нуля до максимальной координаты плюс метр.
+    """
+    x_values = [sheet.x_start + width for sheet in sheets] + [max(line.x_start, line.x_end) for line in lines]
+    y_values = [sheet.y_start + sheet.length for sheet in sheets] + [max(line.y_start, line.y_end) for line in lines]
+    return max(x_values, default=0) + 1, max(y_values, default=0) + 1
 
-    # Рисуем линии и их метки
+
+def _plan_elements(lines, sheets, width, labels: bool, scale: float) -> Iterator[tuple]:
+    """
+    Примитивы плана в координатах изображения (y вниз) в порядке отрисовки:
+    ("grid", x1, y1, x2, y2), ("sheet", x, y, w, h), ("line", x1, y1, x2, y2),
+    ("label", x, y, text, is_line).
+    """
+    x_limit, y_limit = plan_size(lines, sheets, width)
+
+    def point(x, y):
+        return x * scale, (y_limit - y) * scale
+
+    for x in range(int(x_limit) + 1):
+        yield ("grid", x * scale, 0, x * scale, y_limit * scale)
+    for y in range(int(y_limit) + 1):
+        yield ("grid", 0, (y_limit - y) * scale, x_limit * scale, (y_limit - y) * scale)
+    for sheet in sheets:
+        x, y = point(sheet.x_start, sheet.y_start + sheet.length)
+        yield ("sheet", x, y, width * scale, sheet.length * scale)
+    for line in lines:
+        yield ("line", *point(line.x_start, line.y_start), *point(line.x_end, line.y_end))
+    if not labels:
+        return
+    for sheet in sheets:
+        yield ("label", *point(sheet.x_start + width / 2, sheet.y_start + sheet.length / 2), f"{sheet.length:.2f}", False)
     for line in lines:
-        x1, y1, x2, y2 = line.x_start, line.y_start, line.x_end, line.y_end
-        ax.plot([x1, x2], [y1, y2], color='black', linewidth=3)
-        mid_x = (x1 + x2) / 2
-        mid_y = (y1 + y2) / 2
-        ax.text(
-            mid_x, mid_y,
-            line.name,
-            fontweight='semibold',
-            **text_props
+        yield (
+            "label",
+            *point((line.x_start + line.x_end) / 2, (line.y_start + line.y_end) / 2),
+            str(line.name),
+            True
         )
 
-    # Устанавливаем пределы осей
-    ax.set_xlim(0, x_max + 1)
-    ax.set_ylim(0, y_max + 1)
-
-    # Настраиваем сетку и пропорции
-    ax.set_xticks(range(0, int(x_max) + 2))
-    ax.set_yticks(range(0, int(y_max) + 2))
-    ax.grid(visible=True, color='grey', linestyle='--', linewidth=0.5)
-    ax.set_aspect('equal')
-
-    # Сохраняем изображение в буфер в формате PNG
-    buf = BytesIO()
-    plt.savefig(buf, format="png", dpi=300, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    image_bytes = buf.getvalue()
-
-    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-
-    return image_base64
-
-
-async def create_excel(data_dict):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Спецификация"
-    data = data_dict.dict()
-
-    # Настройки шрифта и стиля
-    header_font = Font(bold=True, size=12)
-    center_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    border = Border(
-        left=Side(border_style="thin"),
-        right=Side(border_style="thin"),
-        top=Side(border_style="thin"),
-        bottom=Side(border_style="thin"),
+
+def _svg_parts(lines, sheets, width, labels: bool) -> Iterator[str]:
+    x_limit, y_limit = plan_size(lines, sheets, width)
+    w, h = _num(x_limit * SVG_UNITS_PER_METER), _num(y_limit * SVG_UNITS_PER_METER)
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}">'
+        f"{SVG_STYLE}\n"
     )
+    for kind, *args in _plan_elements(lines, sheets, width, labels, SVG_UNITS_PER_METER):
+        if kind == "grid" or kind == "line":
+            x1, y1, x2, y2 = map(_num, args)
+            yield f'<line class="{kind}" x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}"/>\n'
+        elif kind == "sheet":
+            x, y, w, h = map(_num, args)
+            yield f'<rect class="sheet" x="{x}" y="{y}" width="{w}" height="{h}"/>\n'
+        else:
+            x, y, text, is_line = args
+            css = ' class="line-label"' if is_line else ""
+            yield f'<text{css} x="{_num(x)}" y="{_num(y)}">{escape(text)}</text>\n'
+    yield "</svg>\n"
+
+
+def iter_plan_svg(lines, sheets, width, labels: bool = True) -> Iterator[bytes]:
+    """
+    План ската в SVG кусками около SVG_CHUNK_BYTES (для StreamingResponse):
+    элементы пишутся по одному, документ целиком в памяти не собирается.
+
+    :param lines: линии с полями x_start, y_start, x_end, y_end, name.
+    :param sheets: листы с полями x_start, y_start, length.
+    :param width: ширина листа.
+    :param labels: подписывать длины листов и названия линий.
+    """
+    buffer: List[str] = []
+    size = 0
+    for part in _svg_parts(lines, sheets, width, labels):
+        buffer.append(part)
+        size += len(part)
+        if size >= SVG_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def render_plan_png(lines, sheets, width, dpi: int = PNG_DPI, labels: bool = True) -> bytes:
+    """
+    Растровый план из тех же примитивов, что и SVG. Pillow импортируется только здесь.
+    Масштаб: SVG_UNITS_PER_METER пикселей на метр при 96 dpi.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    x_limit, y_limit = plan_size(lines, sheets, width)
+    scale = SVG_UNITS_PER_METER * dpi / 96
+    pixels = x_limit * y_limit * scale * scale
+    if pixels > PNG_MAX_PIXELS:
+        scale *= (PNG_MAX_PIXELS / pixels) ** 0.5
+    ratio = scale / SVG_UNITS_PER_METER
+    image = Image.new("RGB", (max(round(x_limit * scale), 1), max(round(y_limit * scale), 1)), "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=max(6 * ratio, 1))
+
+    for kind, *args in _plan_elements(lines, sheets, width, labels, scale):
+        if kind == "grid":
+            draw.line(args, fill="#c0c0c0", width=max(round(0.5 * ratio), 1))
+        elif kind == "sheet":
+            x, y, w, h = args
+            draw.rectangle((x, y, x + w, y + h), outline="#808080", width=max(round(ratio), 1))
+        elif kind == "line":
+            draw.line(args, fill="black", width=max(round(3 * ratio), 1))
+        else:
+            x, y, text, _ = args
+            draw.text(
+                (x, y), text, fill="black", font=font, anchor="mm",
+                stroke_width=max(round(ratio), 1), stroke_fill="white"
+            )
 
-    # Ввод основной информации
-    ws.merge_cells("A1:F1")
-    ws["A1"] = f"Проект: {data['project_name']}, Адрес: {data['project_address']}"
-    ws["A1"].alignment = center_alignment
-    ws["A1"].font = Font(bold=True, size=14)
-
-    # Добавление метаинформации о кровле
-    roof_info = [
-        ["Тип покрытия", data["roof_base"]["roof_type"]],
-        ["Полезная ширина листа", data["roof_base"]["roof_useful_width"]],
-        ["Полная ширина листа", data["roof_base"]["roof_overall_width"]],
-        ["Длина волны", data["roof_base"]["roof_overlap"]],
-        ["Макс. реальная длина листа", data["roof_base"]["roof_max_length"]],
-    ]
-
-    ws.append([])
-    ws.append(["Метаинформация"])
-    for key, value in roof_info:
-        ws.append([key, value])
-
-    # Листы
-    ws.append([])
-    ws.append(["Длина листа (м)", "Количество (шт)"])
-    for length, count in data["sheets_amount"].items():
-        ws.append([length, count])
-
-    # Скатные крыши
-    ws.append([])
-    ws.append(["Скат", "Общая площадь (м2)", "Полезная площадь (м2)"])
-    for slope in data["slopes"]:
-        ws.append([slope["slope_name"], slope["area_overall"], slope["area_usefull"]])
-
-    # Доборные элементы
-    ws.append([])
-    ws.append(["Название", "Общая длина", "Количество", "Цена"])
-    for accessory in data["accessories"]:
-        ws.append([accessory["name"], accessory["overall_length"], accessory["amount"], accessory["price"]])
-
-    # Софиты и J-профили
-    ws.append([])
-    ws.append(["Название", "Общая длина", "Ширина", "Количество", "Цена"])
-    for soffit in data["sofits"]:
-        ws.append([soffit["name"], soffit["overall_length"], soffit["width"], soffit["amount"], soffit["price"]])
-
-    # Саморезы
-    ws.append([])
-    ws.append(["Название", "Количество", "Цена"])
-    for screw in data["screws"]:
-        ws.append([screw["name"], screw["amount"], screw["price"]])
-
-    # Применение стилей к заголовкам
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.border = border
-            if cell.row == 1:
-                cell.font = header_font
-                cell.alignment = center_alignment
-
-    # Сохранение в байтовый поток
     output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def render_plan(lines, sheets, width, fmt: str = "svg", dpi: int = PNG_DPI, labels: bool = True) -> bytes:
+    """
+    План ската: SVG или, по запросу, PNG. Одинаковые входные данные и параметры
+    дают побайтно одинаковый результат, поэтому его можно кэшировать.
+
+    :param fmt: "svg" или "png".
+    :param dpi: разрешение PNG (для SVG не используется).
+    :return: содержимое файла.
+    """
+    if fmt == "svg":
+        return b"".join(iter_plan_svg(lines, sheets, width, labels))
+    if fmt == "png":
+        return render_plan_png(lines, sheets, width, dpi, labels)
+    raise ValueError(f"Unknown plan format: {fmt}")
+
+
+@timed_stage("draw_plan")
+def draw_plan(lines, sheets, width, fmt: str = "svg", dpi: int = PNG_DPI, labels: bool = True) -> bytes:
+    """
+    render_plan с учетом времени в метрике стадии draw_plan.
+    """
+    return render_plan(lines, sheets, width, fmt=fmt, dpi=dpi, labels=labels)
+
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Файл спецификации держится в памяти до этого размера, дальше — на диске
+EXCEL_SPOOL_BYTES = 1024 * 1024
+EXCEL_CHUNK_BYTES = 256 * 1024
+
+_THIN = Side(border_style="thin")
+_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+# Стили регистрируются в книге один раз; ячейки ссылаются на них по имени
+SPEC_STYLES = (
+    NamedStyle("spec_title", font=Font(bold=True, size=14)),
+    NamedStyle("spec_section", font=Font(bold=True, size=12)),
+    NamedStyle(
+        "spec_header", font=Font(bold=True), border=_BORDER,
+        alignment=Alignment(horizontal="center", vertical="center", wrap_text=True)
+    ),
+    NamedStyle("spec_cell", border=_BORDER),
+)
+SPEC_COLUMN_WIDTHS = (40, 18, 18, 14, 14)
+
+
+def _sheet_title(name: str, used: set) -> str:
+    """
+    Название листа Excel: без запрещенных символов, не длиннее 31 символа, уникальное в книге.
+    """
+    base = "".join(" " if char in "[]:*?/\\" else char for char in name).strip()[:31] or "Проект"
+    title, number = base, 1
+    while title.lower() in used:
+        number += 1
+        suffix = f" ({number})"
+        title = base[:31 - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+
+def specification_rows(estimate) -> Iterator[list]:
+    """
+    Строки спецификации проекта из сметы (EstimateResponse): списки пар (значение, стиль).
+    """
+    def table(title, header, rows):
+        yield [(title, "spec_section")]
+        yield [(name, "spec_header") for name in header]
+        for row in rows:
+            yield [(value, "spec_cell") for value in row]
+        yield []
+
+    yield [(f"Проект: {estimate.name}, Адрес: {estimate.address}", "spec_title")]
+    yield []
+    roof = estimate.roof
+    yield from table("Метаинформация", ["Параметр", "Значение"], [
+        ["Тип покрытия", roof.type],
+        ["Полезная ширина листа", roof.useful_width],
+        ["Полная ширина листа", roof.overall_width],
+        ["Длина волны", roof.overlap],
+        ["Макс. реальная длина листа", roof.max_length],
+    ])
+    if estimate.materials:
+        material = estimate.materials
+        yield from table("Материал", ["Название", "Материал", "Цвет"], [[material.name, material.material, material.color]])
+    yield from table(
+        "Листы", ["Длина листа (м)", "Количество (шт)"],
+        ([length, count] for length, count in (estimate.sheets_amount or {}).items())
+    )
+    yield from table(
+        "Скаты", ["Скат", "Площадь (м2)", "Общая площадь (м2)", "Полезная площадь (м2)"],
+        ([slope.name, slope.area_full, slope.area_overall, slope.area_usefull] for slope in estimate.slopes or ())
+    )
+    yield from table(
+        "Доборные элементы", ["Название", "Общая длина", "Количество", "Цена"],
+        (
+            [accessory.accessory_base.name, accessory.lines_length, accessory.quantity, accessory.accessory_base.price]
+            for accessory in estimate.accessories or ()
+        )
+    )
+    yield from table(
+        "Саморезы", ["Название", "Количество", "Цена"],
+        ([screw.name, screw.amount, screw.price] for screw in estimate.screws or ())
+    )
+
+
+@timed_stage("create_excel")
+def write_specification(estimates: Iterable, file: BinaryIO) -> None:
+    """
+    Записать спецификацию (лист на проект) в файл книгой openpyxl в режиме write-only:
+    строки сразу уходят во временные файлы листов, книга в памяти не собирается.
+
+    :param estimates: EstimateResponse проектов (может быть генератором).
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    for style in SPEC_STYLES:
+        wb.add_named_style(copy(style))
+    used_titles = set()
+    for estimate in estimates:
+        ws = wb.create_sheet(_sheet_title(estimate.name, used_titles))
+        for column, width in enumerate(SPEC_COLUMN_WIDTHS, start=1):
+            ws.column_dimensions[get_column_letter(column)].width = width
+        for row in specification_rows(estimate):
+            cells = []
+            for value, style in row:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.style = style
+                cells.append(cell)
+            ws.append(cells)
+    if not wb.worksheets:
+        wb.create_sheet("Спецификация")
+    wb.save(file)
+
+
+async def create_excel(estimates: Iterable) -> AsyncIterator[bytes]:
+    """
+    Спецификация в формате xlsx частями по EXCEL_CHUNK_BYTES (для StreamingResponse).
+    Книга пишется в пуле потоков во временный файл, который удаляется после отправки.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_BYTES) as file:
+        await asyncio.to_thread(write_specification, estimates, file)
+        file.seek(0)
+        while chunk := await asyncio.to_thread(file.read, EXCEL_CHUNK_BYTES):
+            yield chunk
@@ -0,0 +1,319 @@
+from types import SimpleNamespace
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base.dao import Accessory_baseDAO, RoofsDAO
+from app.base.schemas import AccessoryBDResponse
+from app.projects.dao import AccessoriesDAO, MaterialsDAO, ProjectEstimateDAO, SheetsDAO, SlopesDAO
+from app.projects.models import ProjectEstimate
+from app.projects.schemas import (
+    AccessoriesResponse, EstimateResponse, MaterialEstimateResponse, RoofEstimateResponse, ScrewsEstimateResponse,
+    SlopeEstimateResponse
+)
+
+# Лист в смете: (length, area_overall, area_usefull)
+SheetRow = Tuple[float, float, float]
+
+# Точность хранения площадей в смете
+PRECISION = 6
+
+
+def length_key(length) -> str:
+    """
+    Ключ гистограммы длин в JSONB: repr длины как float ("3.5", "2.0").
+    """
+    return repr(float(length))
+
+
+def sheet_row(sheet) -> SheetRow:
+    return (sheet.length, sheet.area_overall, sheet.area_usefull)
+
+
+def accessory_response(accessory, accessory_base) -> AccessoriesResponse:
+    return AccessoriesResponse(
+        id=accessory.id,
+        accessory_base=AccessoryBDResponse(
+            id=accessory_base.id,
+            name=accessory_base.name,
+            type=accessory_base.type,
+            parent_type=accessory_base.parent_type,
+            material=accessory_base.material,
+            length=accessory_base.length,
+            overlap=accessory_base.overlap,
+            price=accessory_base.price,
+            modulo=accessory_base.modulo
+        ),
+        lines_id=accessory.lines_id,
+        lines_length=accessory.lines_length,
+        quantity=accessory.quantity,
+        color=accessory.color
+    )
+
+
+def apply_sheet_delta(
+    slopes: dict,
+    sheets_amount: dict,
+    slope_id: str,
+    removed: Iterable[SheetRow] = (),
+    added: Iterable[SheetRow] = (),
+    area: Optional[float] = None
+) -> Tuple[dict, dict]:
+    """
+    Применить изменение листов ската к данным сметы, не изменяя исходные словари.
+
+    :param slopes: {slope_id: {name, area, area_overall, area_usefull}}.
+    :param sheets_amount: {length_key: количество листов}.
+    :param removed: листы, которые были учтены в смете и исчезли (или изменились).
+    :param added: листы, которые появились (или новые значения изменённых).
+    :param area: новая площадь ската, если она пересчитана.
+    :return: новые (slopes, sheets_amount).
+    """
+    slopes = dict(slopes)
+    sheets_amount = dict(sheets_amount)
+    slope = dict(slopes[slope_id])
+    for sign, rows in ((-1, removed), (1, added)):
+        for length, area_overall, area_usefull in rows:
+            slope['area_overall'] += sign * area_overall
+            slope['area_usefull'] += sign * area_usefull
+            key = length_key(length)
+            count = sheets_amount.get(key, 0) + sign
+            if count > 0:
+                sheets_amount[key] = count
+            else:
+                sheets_amount.pop(key, None)
+    slope['area_overall'] = round(slope['area_overall'], PRECISION)
+    slope['area_usefull'] = round(slope['area_usefull'], PRECISION)
+    if area is not None:
+        slope['area'] = area
+    slopes[slope_id] = slope
+    return slopes, sheets_amount
+
+
+async def build_estimate(session: AsyncSession, project_id) -> dict:
+    """
+    Собрать данные сметы с нуля агрегирующими запросами (без записи в БД).
+    """
+    slopes = {
+        str(slope.id): {
+            'name': slope.name,
+            'area': slope.area,
+            'area_overall': round(slope.area_overall, PRECISION),
+            'area_usefull': round(slope.area_usefull, PRECISION)
+        }
+        for slope in await SlopesDAO.find_areas(session, project_id=project_id)
+    }
+    length_counts = await SheetsDAO.length_histogram(session, project_id=project_id)
+    accessories = await AccessoriesDAO.find_with_base(session, project_id=project_id)
+    return {
+        'slopes': slopes,
+        'sheets_amount': {length_key(length): count for length, count in length_counts.items()},
+        'accessories': {
+            str(accessory.id): accessory_response(accessory, accessory.accessory_base).model_dump(mode='json')
+            for accessory in accessories
+        }
+    }
+
+
+async def rebuild_estimate(session: AsyncSession, project_id) -> ProjectEstimate:
+    """
+    Полностью пересчитать и сохранить смету проекта (добавление/удаление скатов, проверка).
+    """
+    data = await build_estimate(session, project_id)
+    return await ProjectEstimateDAO.upsert(session, project_id, **data)
+
+
+async def get_estimate_data(session: AsyncSession, project_id, persist: bool = True) -> ProjectEstimate:
+    """
+    Сохранённая смета проекта; если её ещё нет — собрать и сохранить.
+
+    :param persist: False для сессии только на чтение: отсутствующая смета собирается
+        без сохранения (объект с полями slopes, sheets_amount, accessories), её сохранит
+        первое изменение проекта.
+    """
+    estimate = await ProjectEstimateDAO.find_one_or_none(session, project_id=project_id)
+    if estimate is None:
+        if not persist:
+            return SimpleNamespace(**await build_estimate(session, project_id))
+        estimate = await rebuild_estimate(session, project_id)
+    return estimate
+
+
+async def _locked_estimate(session: AsyncSession, project_id) -> Optional[ProjectEstimate]:
+    """
+    Смета с блокировкой строки. Если сметы нет, она собирается из текущего
+    состояния транзакции (изменение уже учтено) и возвращается None.
+    """
+    estimate = await ProjectEstimateDAO.find_for_update(session, project_id)
+    if estimate is None:
+        await rebuild_estimate(session, project_id)
+    return estimate
+
+
+async def apply_sheet_changes(
+    session: AsyncSession,
+    project_id,
+    slope_id,
+    removed: Iterable[SheetRow] = (),
+    added: Iterable[SheetRow] = (),
+    area: Optional[float] = None
+) -> None:
+    """
+    Обновить смету после изменения листов ската. Вызывается в той же транзакции,
+    что и изменение, после записи листов.
+    """
+    estimate = await _locked_estimate(session, project_id)
+    if estimate is None:
+        return
+    if str(slope_id) not in estimate.slopes:
+        await rebuild_estimate(session, project_id)
+        return
+    slopes, sheets_amount = apply_sheet_delta(
+        estimate.slopes, estimate.sheets_amount, str(slope_id), removed=removed, added=added, area=area
+    )
+    await ProjectEstimateDAO.update_(session, model_id=estimate.id, slopes=slopes, sheets_amount=sheets_amount)
+
+
+async def put_accessory(session: AsyncSession, project_id, accessory, accessory_base) -> None:
+    """
+    Добавить или заменить аксессуар в смете.
+
+    :param accessory: строка аксессуара, возвращённая AccessoriesDAO.add/update_.
+    """
+    accessory = SimpleNamespace(**accessory)
+    estimate = await _locked_estimate(session, project_id)
+    if estimate is None:
+        return
+    accessories = dict(estimate.accessories)
+    accessories[str(accessory.id)] = accessory_response(accessory, accessory_base).model_dump(mode='json')
+    await ProjectEstimateDAO.update_(session, model_id=estimate.id, accessories=accessories)
+
+
+async def remove_accessory(session: AsyncSession, project_id, accessory_id) -> None:
+    """
+    Убрать аксессуар из сметы.
+    """
+    estimate = await _locked_estimate(session, project_id)
+    if estimate is None:
+        return
+    accessories = dict(estimate.accessories)
+    accessories.pop(str(accessory_id), None)
+    await ProjectEstimateDAO.update_(session, model_id=estimate.id, accessories=accessories)
+
+
+async def remove_accessory_base(session: AsyncSession, accessory_base_id) -> None:
+    """
+    Удалить запись базы аксессуаров. Аксессуары проектов удаляются каскадом в БД,
+    минуя remove_accessory, поэтому они убираются из смет здесь же, в той же транзакции.
+    Сметы блокируются в порядке project_id.
+    """
+    accessories = await AccessoriesDAO.find_by_base(session, accessory_base_id)
+    await Accessory_baseDAO.delete_(session, model_id=accessory_base_id)
+    for accessory_id, project_id in accessories:
+        await remove_accessory(session, project_id, accessory_id)
+
+
+def estimate_diff(stored: dict, fresh: dict, tolerance: float = 1e-6) -> list:
+    """
+    Расхождения сохранённой сметы с пересчитанной заново.
+
+    :param stored: данные сохранённой сметы {slopes, sheets_amount, accessories}.
+    :param fresh: результат build_estimate.
+    :return: список описаний расхождений (пустой, если сметы совпадают).
+    """
+    diff = []
+    stored_slopes, fresh_slopes = stored['slopes'], fresh['slopes']
+    for slope_id in sorted(set(stored_slopes) | set(fresh_slopes)):
+        old, new = stored_slopes.get(slope_id), fresh_slopes.get(slope_id)
+        if old is None or new is None:
+            diff.append(f"slope {slope_id}: stored={old} rebuilt={new}")
+            continue
+        for field in ('area', 'area_overall', 'area_usefull'):
+            if old[field] is None or new[field] is None:
+                if old[field] != new[field]:
+                    diff.append(f"slope {slope_id} {field}: stored={old[field]} rebuilt={new[field]}")
+            elif abs(old[field] - new[field]) > tolerance:
+                diff.append(f"slope {slope_id} {field}: stored={old[field]} rebuilt={new[field]}")
+    if stored['sheets_amount'] != fresh['sheets_amount']:
+        diff.append(f"sheets_amount: stored={stored['sheets_amount']} rebuilt={fresh['sheets_amount']}")
+    if stored['accessories'] != fresh['accessories']:
+        diff.append("accessories differ")
+    return diff
+
+
+async def estimate_response(session: AsyncSession, project) -> EstimateResponse:
+    """
+    Смета проекта для ответа API и спецификации: площади скатов, листы по длинам,
+    аксессуары, крепеж и материал. Ничего не записывает в БД.
+
+    :param project: проект (Projects), доступ к которому уже проверен.
+    """
+    roof = await RoofsDAO.find_by_id(session, model_id=project.roof_id)
+    estimate = await get_estimate_data(session, project.id, persist=False)
+    overall = 0
+    if estimate.slopes:
+        slopes_estimate = []
+        for slope in estimate.slopes.values():
+            overall += slope['area_overall']
+            slopes_estimate.append(
+                SlopeEstimateResponse(
+                    name=slope['name'],
+                    area_full=slope['area'],
+                    area_overall=slope['area_overall'],
+                    area_usefull=slope['area_usefull']
+                )
+            )
+    else:
+        slopes_estimate = None
+    length_counts = {
+        float(length): count
+        for length, count in sorted(estimate.sheets_amount.items(), key=lambda item: float(item[0]))
+    }
+    if estimate.accessories:
+        accessories_estimate = [AccessoriesResponse(**accessory) for accessory in estimate.accessories.values()]
+    else:
+        accessories_estimate = None
+    screws_estimate = [
+        ScrewsEstimateResponse(
+            id="69ad6260-9310-4245-92bb-d0c8728954f2",
+            name='Саморез 4,8х35',
+            amount=int(overall * 6),
+            packege_amount=250,
+            price=1500,
+            ral=None
+        )
+    ]
+    material = await MaterialsDAO.find_one_or_none(session, project_id=project.id)
+    if material:
+        material_estimate = MaterialEstimateResponse(
+            name=material.name,
+            material=material.material,
+            color=material.color
+        )
+    else:
+        material_estimate = None
+    return EstimateResponse(
+        id=project.id,
+        name=project.name,
+        address=project.address,
+        step=project.step,
+        datetime_created=project.datetime_created,
+        roof=RoofEstimateResponse(
+            id=roof.id,
+            name=roof.name,
+            type=roof.type,
+            overall_width=roof.overall_width,
+            useful_width=roof.useful_width,
+            overlap=roof.overlap,
+            len_wave=roof.len_wave,
+            max_length=roof.max_length,
+            min_length=roof.min_length,
+            imp_sizes=roof.imp_sizes,
+            price=None
+        ),
+        sheets_amount=length_counts,
+        slopes=slopes_estimate,
+        accessories=accessories_estimate,
+        screws=screws_estimate,
+        materials=material_estimate
+    )
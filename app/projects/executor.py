@@ -0,0 +1,280 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from shapely import Point
+
+from app.config import settings
+from app.metrics import GEOMETRY_PENDING, observe_geometry_task
+from app.projects.draw import render_plan
+from app.projects.layout import layout_sheets
+from app.projects.rotate import rotate_slope
+from app.projects.slope import create_figure, find_slope
+
+
+# -------------------- Данные для передачи в процессы --------------------
+
+@dataclass
+class GeoPoint:
+    id: object
+    x: float
+    y: float
+
+
+@dataclass
+class GeoLine:
+    id: object
+    start_id: object
+    end_id: object
+    start: GeoPoint
+    end: GeoPoint
+    type: Optional[str] = None
+    name: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RoofParams:
+    overall_width: float
+    useful_width: float
+    max_length: float
+    min_length: float
+    overlap: float
+    imp_sizes: Optional[list] = None
+
+
+def geo_lines(lines) -> List[GeoLine]:
+    """
+    Копия линий (Lines или LinesSlope) в виде простых объектов.
+    Общие точки остаются общими объектами, как и у ORM-линий.
+    """
+    points = {}
+
+    def point(obj):
+        if obj.id not in points:
+            points[obj.id] = GeoPoint(id=obj.id, x=obj.x, y=obj.y)
+        return points[obj.id]
+
+    return [
+        GeoLine(
+            id=line.id,
+            start_id=line.start_id,
+            end_id=line.end_id,
+            start=point(line.start),
+            end=point(line.end),
+            type=line.type,
+            name=line.name
+        )
+        for line in lines
+    ]
+
+
+def slope_graph(rotated_lines: List[GeoLine]) -> Tuple[Dict[object, GeoPoint], List[GeoLine]]:
+    """
+    Точки и линии нового ската в памяти с новыми id (uuid4).
+    Общие концы линий проекта становятся одной точкой ската.
+
+    :return: ({id точки проекта: точка ската}, линии ската в порядке rotated_lines).
+    """
+    points = {}
+
+    def point(obj):
+        if obj.id not in points:
+            points[obj.id] = GeoPoint(id=uuid.uuid4(), x=obj.x, y=obj.y)
+        return points[obj.id]
+
+    lines = []
+    for line in rotated_lines:
+        start = point(line.start)
+        end = point(line.end)
+        lines.append(GeoLine(
+            id=uuid.uuid4(), start_id=start.id, end_id=end.id, start=start, end=end, type=line.type, name=line.name
+        ))
+    return points, lines
+
+
+def input_size(lines, cutouts=()) -> int:
+    """
+    Оценка объема геометрической задачи: число линий и точек вырезов.
+    """
+    return len(lines) + sum(len(cutout) for cutout in cutouts)
+
+
+def roof_params(roof) -> RoofParams:
+    return RoofParams(
+        overall_width=roof.overall_width,
+        useful_width=roof.useful_width,
+        max_length=roof.max_length,
+        min_length=roof.min_length,
+        overlap=roof.overlap,
+        imp_sizes=roof.imp_sizes
+    )
+
+
+# -------------------- Задачи --------------------
+
+def slope_layout(lines, cutouts, roof, is_left, overhang) -> Tuple[float, list]:
+    """
+    Фигура ската и раскладка листов.
+
+    :return: (площадь ската, строки листов [x, y, length, area_overall, area_usefull]).
+    """
+    figure = create_figure(lines, cutouts)
+    return figure.area, layout_sheets(figure=figure, roof=roof, is_left=is_left, overhang=overhang)
+
+
+def slope_figure(lines, cutouts):
+    return create_figure(lines, cutouts)
+
+
+def slope_is_left(lines) -> bool:
+    """
+    Направление раскладки по умолчанию: слева, если правый нижний угол габарита не лежит на скате.
+    """
+    figure = create_figure(lines, [])
+    x_min, y_min, x_max, y_max = figure.bounds
+    return not figure.covers(Point(x_max, 0))
+
+
+def find_slopes(lines) -> List[list]:
+    return find_slope(lines)
+
+
+def rotate_lines(lines) -> List[GeoLine]:
+    return rotate_slope(lines)
+
+
+def slope_plan(lines, sheets, width, fmt, dpi, labels) -> bytes:
+    """
+    План ската (PlanLine, PlanSheet). Время учитывает исполнитель,
+    поэтому вызывается render_plan, а не draw_plan с timed_stage.
+    """
+    return render_plan(lines, sheets, width, fmt=fmt, dpi=dpi, labels=labels)
+
+
+def _timed_call(func, args):
+    """
+    Выполняется в рабочем процессе: возвращает результат, время начала и длительность.
+    """
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time() - started
+
+
+# -------------------- Исполнитель --------------------
+
+@dataclass
+class TaskStats:
+    calls: int = 0
+    inline_calls: int = 0
+    run_seconds: float = 0.0
+    max_run_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def observe(self, run: float, wait: float, inline: bool) -> None:
+        self.calls += 1
+        if inline:
+            self.inline_calls += 1
+        self.run_seconds += run
+        self.max_run_seconds = max(self.max_run_seconds, run)
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+
+@dataclass
+class GeometryExecutor:
+    """
+    Пул процессов для CPU-тяжелой геометрии (shapely и циклы Python).
+
+    Задачи принимают и возвращают простые данные (GeoLine, RoofParams, координаты),
+    поэтому они сериализуются через pickle. Небольшие входные данные
+    (size < inline_threshold) выполняются в текущем процессе: передача в пул
+    стоила бы дороже самой работы. При max_workers == 0 пул не используется.
+    """
+    max_workers: int = 0
+    inline_threshold: int = 0
+    pending: int = 0
+    stats: Dict[str, TaskStats] = field(default_factory=dict)
+    _pool: Optional[ProcessPoolExecutor] = field(default=None, repr=False)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _observe(self, name: str, run: float, wait: float, inline: bool) -> None:
+        self.stats.setdefault(name, TaskStats()).observe(run, wait, inline)
+        observe_geometry_task(name, run, wait, inline)
+
+    def _run_inline(self, func, args):
+        result, _, run = _timed_call(func, args)
+        self._observe(func.__name__, run, 0.0, inline=True)
+        return result
+
+    async def run(self, func, *args, size: int = 0):
+        """
+        Выполнить задачу func(*args) вне цикла событий.
+
+        :param size: оценка объема входных данных (число линий и точек вырезов).
+        """
+        if not self.max_workers or size < self.inline_threshold:
+            return self._run_inline(func, args)
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        pool = self._get_pool()
+        self.pending += 1
+        GEOMETRY_PENDING.inc()
+        try:
+            result, started, run = await loop.run_in_executor(pool, _timed_call, func, args)
+        except BrokenProcessPool:
+            logger.warning("Geometry pool is broken, running {} inline", func.__name__)
+            # Задачи сломанного пула завершаются одновременно: пул сбрасывает только
+            # первая из них, замену, созданную после этого, трогать нельзя
+            if self._pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            return self._run_inline(func, args)
+        finally:
+            self.pending -= 1
+            GEOMETRY_PENDING.dec()
+        self._observe(func.__name__, run, max(started - submitted, 0.0), inline=False)
+        return result
+
+    def snapshot(self) -> dict:
+        """
+        Текущие метрики: глубина очереди и время по каждой задаче.
+        """
+        return {
+            "pending": self.pending,
+            "tasks": {
+                name: {
+                    "calls": s.calls,
+                    "inline_calls": s.inline_calls,
+                    "avg_run_seconds": s.run_seconds / s.calls if s.calls else 0.0,
+                    "max_run_seconds": s.max_run_seconds,
+                    "avg_wait_seconds": s.wait_seconds / (s.calls - s.inline_calls) if s.calls > s.inline_calls else 0.0,
+                    "max_wait_seconds": s.max_wait_seconds,
+                }
+                for name, s in self.stats.items()
+            }
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+geometry_executor = GeometryExecutor(
+    max_workers=settings.GEOMETRY_WORKERS,
+    inline_threshold=settings.GEOMETRY_INLINE_THRESHOLD
+)
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_session
+from app.exceptions import ExportJobNotFound, ExportNotReady, ProjectNotFound
+from app.projects.dao import ProjectsDAO
+from app.projects.exports import DONE, ExportJob, export_service
+from app.projects.schemas import ExportJobResponse, ExportRequest
+from app.users.dependencies import get_current_reader
+from app.users.models import Users
+
+router = APIRouter(prefix="/roofs/exports", tags=["Exports"])
+
+
+def job_response(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        id=job.id,
+        status=job.status,
+        total=len(job.project_ids),
+        done=job.done,
+        failed=job.failed,
+        error=job.error
+    )
+
+
+@router.post("/specifications", status_code=202, description="Start export of specifications")
+async def create_specifications_export(
+    data: ExportRequest,
+    user: Users = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
+) -> ExportJobResponse:
+    """
+    Запускает фоновую выгрузку спецификаций проектов компании в ZIP.
+    Прогресс — GET /roofs/exports/{job_id}, архив — GET /roofs/exports/{job_id}/download.
+    """
+    allowed = await ProjectsDAO.find_company_ids(session, user.company_id, data.project_ids)
+    if not data.project_ids or any(project_id not in allowed for project_id in data.project_ids):
+        raise ProjectNotFound
+    job = await export_service.submit(user.id, data.project_ids)
+    return job_response(job)
+
+
+@router.get("/{job_id}", description="Get export status")
+async def get_export(
+    job_id: str,
+    user: Users = Depends(get_current_reader)
+) -> ExportJobResponse:
+    return job_response(await export_service.get(job_id, user.id))
+
+
+@router.get("/{job_id}/download", description="Download exported specifications")
+async def download_export(
+    job_id: str,
+    user: Users = Depends(get_current_reader)
+) -> FileResponse:
+    job = await export_service.get(job_id, user.id)
+    if job.status != DONE:
+        raise ExportNotReady
+    path = export_service.archive_path(job.id)
+    if not path.exists():
+        raise ExportJobNotFound
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename=f"specifications-{job.id[:8]}.zip"
+    )
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+from contextlib import aclosing
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import settings
+from app.db import async_read_session_maker
+from app.exceptions import ExportJobNotFound, ExportTooLarge
+from app.metrics import timed_redis
+from app.projects.dao import ProjectsDAO
+from app.projects.draw import write_specification
+from app.projects.estimate import estimate_response
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class ExportJob:
+    """
+    Задача выгрузки спецификаций: проекты, прогресс и итог.
+    """
+    id: str
+    user_id: str
+    project_ids: List[str]
+    status: str = QUEUED
+    done: int = 0
+    failed: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, value: str) -> "ExportJob":
+        return cls(**json.loads(value))
+
+
+class LocalJobStore:
+    """
+    Состояние задач в памяти процесса: для тестов и запуска без Redis.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, str] = {}
+
+    async def save(self, job: ExportJob) -> None:
+        self._jobs[job.id] = job.to_json()
+
+    async def load(self, job_id: str) -> Optional[ExportJob]:
+        value = self._jobs.get(job_id)
+        return ExportJob.from_json(value) if value is not None else None
+
+
+class RedisJobStore:
+    """
+    Состояние задач в Redis: статус видят все процессы uvicorn, запись живет ttl секунд.
+    """
+
+    def __init__(self, redis, ttl: int, prefix: str = "export"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def save(self, job: ExportJob) -> None:
+        with timed_redis(self.prefix, "set"):
+            await self.redis.set(f"{self.prefix}:{job.id}", job.to_json(), ex=self.ttl)
+
+    async def load(self, job_id: str) -> Optional[ExportJob]:
+        with timed_redis(self.prefix, "get"):
+            value = await self.redis.get(f"{self.prefix}:{job_id}")
+        return ExportJob.from_json(value) if value is not None else None
+
+
+async def load_estimate(project_id):
+    """
+    Смета проекта в отдельной сессии только на чтение (None, если проект удален).
+    """
+    async with async_read_session_maker() as session:
+        async with session.begin():
+            project = await ProjectsDAO.find_by_id(session, model_id=project_id)
+            if project is None:
+                return None
+            return await estimate_response(session, project)
+
+
+def entry_name(index: int, estimate) -> str:
+    """
+    Имя файла проекта в архиве: порядковый номер и название без символов, недопустимых в путях.
+    """
+    name = re.sub(r'[\\/:*?"<>|\s]+', " ", estimate.name).strip()[:80] or "project"
+    return f"{index + 1:03d} {name}.xlsx"
+
+
+def write_entry(archive: zipfile.ZipFile, name: str, estimate) -> None:
+    with archive.open(name, "w") as entry:
+        write_specification([estimate], entry)
+
+
+class ExportService:
+    """
+    Фоновая выгрузка спецификаций многих проектов в ZIP (xlsx на проект).
+
+    Сметы загружаются параллельно, не больше concurrency одновременно, каждая в своей
+    сессии; xlsx пишутся в архив по мере готовности в пуле потоков, архив пишется
+    сразу на диск (directory/<id>.zip.part, после завершения переименовывается).
+    Задачи выполняются в процессе, который их принял; состояние хранится в store
+    (RedisJobStore после старта приложения, LocalJobStore без Redis и в тестах).
+
+    :param loader: async-функция project_id -> смета (EstimateResponse) или None.
+    """
+
+    def __init__(self, directory: str, concurrency: int, max_projects: int, ttl: int, loader=load_estimate):
+        self.directory = Path(directory)
+        self.concurrency = concurrency
+        self.max_projects = max_projects
+        self.ttl = ttl
+        self.loader = loader
+        self.store = LocalJobStore()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def archive_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.zip"
+
+    async def submit(self, user_id, project_ids) -> ExportJob:
+        """
+        Создать задачу и запустить ее в фоне.
+
+        :param project_ids: проекты, доступ к которым уже проверен (повторы убираются).
+        :raises ExportTooLarge: если проектов больше max_projects.
+        """
+        project_ids = list(dict.fromkeys(str(project_id) for project_id in project_ids))
+        if len(project_ids) > self.max_projects:
+            raise ExportTooLarge
+        job = ExportJob(id=uuid.uuid4().hex, user_id=str(user_id), project_ids=project_ids)
+        await self.store.save(job)
+        await asyncio.to_thread(self._remove_expired)
+        task = asyncio.create_task(self.run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    async def get(self, job_id: str, user_id) -> ExportJob:
+        """
+        :raises ExportJobNotFound: если задачи нет или она создана другим пользователем.
+        """
+        job = await self.store.load(job_id)
+        if job is None or job.user_id != str(user_id):
+            raise ExportJobNotFound
+        return job
+
+    async def _estimates(self, project_ids: List[str]) -> AsyncIterator[Tuple[int, str, object]]:
+        """
+        (номер, id проекта, смета или None) в порядке готовности.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def load(index, project_id):
+            async with semaphore:
+                try:
+                    return index, project_id, await self.loader(project_id)
+                except Exception as e:
+                    logger.warning("Export: estimate of project {} failed: {}", project_id, e)
+                    return index, project_id, None
+
+        tasks = [asyncio.create_task(load(index, project_id)) for index, project_id in enumerate(project_ids)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, job: ExportJob) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        part = self.directory / f"{job.id}.zip.part"
+        job.status = RUNNING
+        await self.store.save(job)
+        archive = None
+        try:
+            # xlsx уже сжаты, поэтому архив без сжатия
+            archive = await asyncio.to_thread(zipfile.ZipFile, part, "w", zipfile.ZIP_STORED)
+            async with aclosing(self._estimates(job.project_ids)) as estimates:
+                async for index, project_id, estimate in estimates:
+                    if estimate is None:
+                        job.failed.append(project_id)
+                    else:
+                        await asyncio.to_thread(write_entry, archive, entry_name(index, estimate), estimate)
+                    job.done += 1
+                    await self.store.save(job)
+            await asyncio.to_thread(archive.close)
+            os.replace(part, self.archive_path(job.id))
+            job.status = DONE
+        except BaseException as e:
+            logger.exception("Export job {} failed", job.id)
+            if archive is not None and archive.fp is not None:
+                # Каталог архива не дописывается: незаконченный файл удаляется
+                fp, archive.fp = archive.fp, None
+                fp.close()
+            part.unlink(missing_ok=True)
+            job.status = FAILED
+            job.error = "interrupted" if isinstance(e, asyncio.CancelledError) else str(e)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            job.finished = time.time()
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                logger.warning("Export job {} state was not saved: {}", job.id, e)
+
+    def _remove_expired(self) -> None:
+        """
+        Удалить архивы старше ttl (их задачи в store уже истекли).
+        """
+        if not self.directory.exists():
+            return
+        expired = time.time() - self.ttl
+        for path in self.directory.glob("*.zip*"):
+            if path.stat().st_mtime < expired:
+                path.unlink(missing_ok=True)
+
+    async def shutdown(self) -> None:
+        """
+        Прервать незавершенные задачи (они помечаются как failed).
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+export_service = ExportService(
+    directory=settings.EXPORT_DIR,
+    concurrency=settings.EXPORT_CONCURRENCY,
+    max_projects=settings.EXPORT_MAX_PROJECTS,
+    ttl=settings.EXPORT_TTL
+)
@@ -0,0 +1,195 @@
+import numpy as np
+import shapely
+
+from app.projects.slope import create_sheets, sheet_grid
+
+
+def _figure_edges(figure):
+    """
+    Все ребра фигуры (внешние контуры и вырезы всех частей) в виде
+    массивов начальных и конечных координат.
+    """
+    starts = []
+    ends = []
+    for part in shapely.get_parts(figure):
+        for ring in [part.exterior, *part.interiors]:
+            coords = np.asarray(ring.coords, dtype=float)
+            starts.append(coords[:-1])
+            ends.append(coords[1:])
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    return starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+
+def _points_inside(px, py, x0, y0, x1, y1):
+    """
+    Четно-нечетная проверка попадания точек в фигуру по всем ее ребрам.
+    Точки на границе могут попасть в любую сторону: такие точки
+    все равно являются концами отсеченных ребер.
+    """
+    px = px[..., None]
+    py = py[..., None]
+    crosses = (y0 > py) != (y1 > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(crosses & (px < x_cross), axis=-1) % 2 == 1
+
+
+def _clip_to_columns(x0, y0, x1, y1, x_lo, x_hi):
+    """
+    Отсечение ребер по колонкам [x_lo[k], x_hi[k]] (Лианг-Барски по X).
+
+    Точки пересечения считаются в расширенной точности и один раз округляются
+    до float64 — так же, как GEOS получает координаты пересечения ребер.
+
+    :return: концы отсеченных ребер и маска непустых отрезков, массивы формы (K, E).
+    """
+    ex0 = x0.astype(np.longdouble)
+    ey0 = y0.astype(np.longdouble)
+    dx = x1.astype(np.longdouble) - ex0
+    dy = y1.astype(np.longdouble) - ey0
+    a = x_lo[:, None]
+    b = x_hi[:, None]
+    t_in = np.zeros((len(x_lo), len(x0)), dtype=np.longdouble)
+    t_out = np.ones_like(t_in)
+    accepted = np.ones(t_in.shape, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-dx, ex0 - a), (dx, b - ex0)):
+            p = np.broadcast_to(p, t_in.shape)
+            r = q / p
+            accepted &= ~((p == 0) & (q < 0))
+            t_in = np.where(p < 0, np.maximum(t_in, r), t_in)
+            t_out = np.where(p > 0, np.minimum(t_out, r), t_out)
+    accepted &= t_in <= t_out
+    sx0 = np.clip((ex0 + t_in * dx).astype(float), a, b)
+    sx1 = np.clip((ex0 + t_out * dx).astype(float), a, b)
+    sy0 = (ey0 + t_in * dy).astype(float)
+    sy1 = (ey0 + t_out * dy).astype(float)
+    return sx0, sy0, sx1, sy1, accepted
+
+
+def _strip_bounds(figure, x_lo, x_hi, y_lo, y_hi):
+    """
+    Габариты пересечения фигуры с каждым прямоугольником раскладки.
+
+    Прямоугольник задается колонкой [x_lo[k], x_hi[k]] и окном [y_lo[m], y_hi[m]].
+    Граница пересечения состоит из частей ребер фигуры внутри прямоугольника
+    и частей сторон прямоугольника внутри фигуры, поэтому габариты равны
+    габаритам отсеченных ребер вместе с углами прямоугольника, лежащими
+    внутри фигуры. Ребра сначала отсекаются по колонке, затем по окну:
+    Y-габарит отрезка в окне — это просто его Y-диапазон, зажатый в окно.
+
+    :return: (min_x, min_y, max_x, max_y, non_empty) массивы формы (K, M).
+    """
+    x0, y0, x1, y1 = _figure_edges(figure)
+    sx0, sy0, sx1, sy1, in_column = _clip_to_columns(x0, y0, x1, y1, x_lo, x_hi)
+
+    # Отрезки внутри колонки: (K, 1, E); окна: (1, M, 1)
+    sx0, sy0, sx1, sy1 = (v[:, None, :] for v in (sx0, sy0, sx1, sy1))
+    c = y_lo[None, :, None]
+    d = y_hi[None, :, None]
+    seg_lo = np.minimum(sy0, sy1)
+    seg_hi = np.maximum(sy0, sy1)
+    accepted = in_column[:, None, :] & (seg_lo <= d) & (seg_hi >= c)
+
+    min_y = np.where(accepted, np.maximum(seg_lo, c), np.inf).min(axis=2)
+    max_y = np.where(accepted, np.minimum(seg_hi, d), -np.inf).max(axis=2)
+
+    # X-габарит нужен только для проверки ширины листа
+    dx = sx1 - sx0
+    dy = sy1 - sy0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_c = np.where(dy != 0, (c - sy0) / dy, 0)
+        t_d = np.where(dy != 0, (d - sy0) / dy, 0)
+    t_lo = np.clip(np.minimum(t_c, t_d), 0, 1)
+    t_hi = np.clip(np.maximum(t_c, t_d), 0, 1)
+    t_lo = np.where(dy != 0, t_lo, 0)
+    t_hi = np.where(dy != 0, t_hi, 1)
+    cx0 = sx0 + t_lo * dx
+    cx1 = sx0 + t_hi * dx
+    min_x = np.where(accepted, np.minimum(cx0, cx1), np.inf).min(axis=2)
+    max_x = np.where(accepted, np.maximum(cx0, cx1), -np.inf).max(axis=2)
+
+    corner_x = np.stack(np.broadcast_arrays(x_lo[:, None], x_hi[:, None], x_lo[:, None], x_hi[:, None]))
+    corner_x = np.broadcast_to(corner_x, (4, len(x_lo), len(y_lo)))
+    corner_y = np.stack(np.broadcast_arrays(y_lo[None, :], y_lo[None, :], y_hi[None, :], y_hi[None, :]))
+    corner_y = np.broadcast_to(corner_y, (4, len(x_lo), len(y_lo)))
+    inside = _points_inside(corner_x, corner_y, x0, y0, x1, y1)
+    min_x = np.minimum(min_x, np.where(inside, corner_x, np.inf).min(axis=0))
+    max_x = np.maximum(max_x, np.where(inside, corner_x, -np.inf).max(axis=0))
+    min_y = np.minimum(min_y, np.where(inside, corner_y, np.inf).min(axis=0))
+    max_y = np.maximum(max_y, np.where(inside, corner_y, -np.inf).max(axis=0))
+
+    non_empty = accepted.any(axis=2) | inside.any(axis=0)
+    return min_x, min_y, max_x, max_y, non_empty
+
+
+def create_sheets_strips(figure, roof, is_left, overhang):
+    """
+    Раскладка листов по вертикальным полосам.
+
+    Дает те же строки [x, y, length, area_overall, area_usefull], что и
+    create_sheets, но вместо построения Polygon и пересечения для каждого
+    листа считает габариты фигуры во всех колонках сразу на массивах NumPy,
+    а уровень нахлеста ищет бинарным поиском.
+    """
+    sheets = []
+    overall_width = roof.overall_width
+    delta_width = roof.overall_width - roof.useful_width
+    length_max = roof.max_length
+    overlap = roof.overlap
+    length_min = roof.min_length
+    sizes = roof.imp_sizes
+    x_positions, y_positions, y_levels, overhang = sheet_grid(figure, roof, is_left, overhang)
+    if not x_positions or not y_positions:
+        return sheets
+
+    x_start = np.asarray(x_positions, dtype=float)
+    y_start = np.asarray(y_positions, dtype=float)
+    min_x, min_y, max_x, max_y, non_empty = _strip_bounds(
+        figure,
+        x_start + delta_width,
+        x_start + roof.useful_width,
+        y_start,
+        y_start + length_max
+    )
+
+    ks, ms = np.nonzero(non_empty)
+    bottom = min_y[ks, ms]
+    top = max_y[ks, ms]
+    width = max_x[ks, ms] - min_x[ks, ms]
+    bottom = np.where(bottom == 0, bottom - overhang, bottom)
+    # Уровни идут с шагом нахлеста: подходящий — последний уровень не выше низа листа
+    levels = np.asarray(y_levels, dtype=float)
+    idx = np.searchsorted(levels, bottom, side='right') - 1
+    snap = (idx >= 0) & (bottom < levels[idx] + overlap)
+    bottom = np.where(snap, levels[idx], bottom)
+    keep = ~((top - bottom < overlap) | (width < delta_width))
+
+    x_rounded = [round(x, 2) for x in x_positions]
+    areas = {}
+    for k, y_bottom, y_top in zip(ks[keep].tolist(), bottom[keep].tolist(), top[keep].tolist()):
+        sheet_height = y_top - y_bottom
+        if sheet_height < length_min:
+            y_top = y_bottom + length_min
+        elif sizes:
+            for size in sizes:
+                if sheet_height > size[0] and sheet_height < size[1]:
+                    y_top = y_bottom + size[1]
+                    break
+        length = round(y_top - y_bottom, 2)
+        if length not in areas:
+            areas[length] = (round(overall_width*length, 2), round(roof.useful_width*length, 2))
+        sheets.append([x_rounded[k], round(y_bottom, 2), length, *areas[length]])
+
+    return sheets
+
+
+LAYOUT_ENGINES = {
+    'strips': create_sheets_strips,
+    'shapely': create_sheets,
+}
+
+
+def layout_sheets(figure, roof, is_left, overhang, engine: str = 'strips'):
+    return LAYOUT_ENGINES[engine](figure, roof, is_left, overhang)
@@ -1,6 +1,6 @@
 from datetime import datetime
 import uuid
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy import ARRAY, Boolean, DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -232,3 +232,22 @@ class Materials(Base):
 
     project = relationship("Projects", back_populates="materials")
 
+
+class ProjectEstimate(Base):
+    """
+    Сводка оценки проекта, поддерживаемая инкрементально эндпоинтами,
+    которые меняют листы и аксессуары (см. app/projects/estimate.py).
+
+    slopes: {slope_id: {name, area, area_overall, area_usefull}}
+    sheets_amount: {длина листа: количество}
+    accessories: {accessory_id: данные AccessoriesResponse}
+    """
+    __tablename__ = 'project_estimate'
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False)
+    slopes: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    sheets_amount: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    accessories: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey('project.id', ondelete='CASCADE'), nullable=False, unique=True)
@@ -0,0 +1,124 @@
+import asyncio
+import base64
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List
+
+from app.cache import TieredCache, content_hash
+from app.config import settings
+from app.metrics import PLAN_RENDERS
+from app.projects.draw import PlanLine, PlanSheet
+from app.projects.executor import geometry_executor, slope_plan
+
+# Меняется при изменении вида плана, чтобы не отдавать старые изображения
+PLAN_VERSION = 1
+
+PLAN_MEDIA_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+
+plan_cache = TieredCache(
+    prefix="plan",
+    max_bytes=settings.PLAN_CACHE_MAX_BYTES,
+    ttl=settings.PLAN_CACHE_TTL
+)
+
+
+@dataclass
+class PlanRequest:
+    """
+    Входные данные и параметры плана ската.
+
+    Ключ — хэш содержимого (координаты линий и листов, ширина листа) и параметров,
+    поэтому изменение геометрии или листов само дает новый ключ, а старые
+    изображения вытесняются из кэша по LRU и TTL.
+    """
+    lines: List[PlanLine]
+    sheets: List[PlanSheet]
+    width: float
+    fmt: str = "svg"
+    dpi: int = 150
+    labels: bool = True
+
+    @classmethod
+    def from_slope(cls, lines, sheets, width, **options) -> "PlanRequest":
+        """
+        :param lines: LinesSlope с точками start и end.
+        :param sheets: Sheets ската.
+        """
+        return cls(
+            lines=sorted(
+                PlanLine(line.start.x, line.start.y, line.end.x, line.end.y, line.name) for line in lines
+            ),
+            sheets=sorted(PlanSheet(sheet.x_start, sheet.y_start, sheet.length) for sheet in sheets),
+            width=width,
+            **options
+        )
+
+    @cached_property
+    def key(self) -> str:
+        return content_hash([
+            PLAN_VERSION,
+            [list(line) for line in self.lines],
+            [list(sheet) for sheet in self.sheets],
+            self.width,
+            self.fmt,
+            self.dpi if self.fmt == "png" else None,
+            self.labels
+        ])
+
+    @property
+    def media_type(self) -> str:
+        return PLAN_MEDIA_TYPES[self.fmt]
+
+
+def _encode(fmt: str, content: bytes) -> str:
+    return content.decode("utf-8") if fmt == "svg" else base64.b64encode(content).decode("ascii")
+
+
+def _decode(fmt: str, value: str) -> bytes:
+    return value.encode("utf-8") if fmt == "svg" else base64.b64decode(value)
+
+
+@dataclass
+class PlanRenderer:
+    """
+    Планы скатов с кэшем (plan_cache) и отрисовкой в geometry_executor.
+
+    Одинаковые запросы, пришедшие во время отрисовки, ждут ту же задачу
+    (в пределах процесса), поэтому всплеск просмотров дает одну отрисовку.
+    """
+    cache: TieredCache
+    executor: object
+    _in_flight: Dict[str, asyncio.Task] = field(default_factory=dict, repr=False)
+
+    async def render(self, request: PlanRequest) -> bytes:
+        key = request.key
+        task = self._in_flight.get(key)
+        if task is None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return _decode(request.fmt, cached)
+            # Пока шло обращение к кэшу, отрисовку мог начать другой запрос
+            task = self._in_flight.get(key)
+        if task is None:
+            PLAN_RENDERS.labels(result="rendered").inc()
+            task = asyncio.ensure_future(self._render(request))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            PLAN_RENDERS.labels(result="coalesced").inc()
+        # Отмена одного ожидающего запроса не должна прерывать отрисовку для остальных
+        return await asyncio.shield(task)
+
+    async def _render(self, request: PlanRequest) -> bytes:
+        content = await self.executor.run(
+            slope_plan, request.lines, request.sheets, request.width, request.fmt, request.dpi, request.labels,
+            size=len(request.lines) + len(request.sheets)
+        )
+        await self.cache.set(request.key, _encode(request.fmt, content))
+        return content
+
+
+plan_renderer = PlanRenderer(cache=plan_cache, executor=geometry_executor)
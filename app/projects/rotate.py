@@ -1,284 +1,201 @@
 import math
-from typing import List, Dict
-from shapely.geometry import LineString, Point as ShapelyPoint
-from shapely.affinity import rotate, translate, scale
-
-
-def line_angle_with_x(line: LineString) -> float:
-    x1, y1 = line.coords[0]
-    x2, y2 = line.coords[-1]
-    dx = x2 - x1
-    dy = y2 - y1
-    return math.degrees(math.atan2(dy, dx))
-
-
-def move_geometry_to_point(geom, point: ShapelyPoint):
-    return translate(geom, xoff=-point.x, yoff=-point.y)
-
-
-def up_line(line):
-    return LineString([(x, -y) for x, y in line.coords])
-
-
-def right_line(line):
-    return LineString([(-x, y) for x, y in line.coords])
-
-
-def rotate_geometry(geom, angle_degrees: float):
-    return rotate(geom, angle_degrees, origin=(0, 0))
-
-
-def find_intersection(line1: LineString, line2: LineString):
-    return line1.intersection(line2)
-
-
-def maybe_flip_in_first_quadrant(rotated_lines: List[LineString]) -> List[LineString]:
-    if not rotated_lines:
-        return rotated_lines
-    coords_all = []
-    for ln in rotated_lines:
-        coords_all.extend(ln.coords)
-    avg_x = sum(pt[0] for pt in coords_all) / len(coords_all)
-    avg_y = sum(pt[1] for pt in coords_all) / len(coords_all)
-    flip_x = (avg_x < 0)
-    flip_y = (avg_y < 0)
-    if flip_x or flip_y:
-        sx = -1 if flip_x else 1
-        sy = -1 if flip_y else 1
-        flipped = [scale(ln, xfact=sx, yfact=sy, origin=(0, 0)) for ln in rotated_lines]
-        return flipped
-    return rotated_lines
-
-
-def transform_roof(lines_dict: Dict[str, List[LineString]]) -> Dict[str, List[LineString]]:
-    eaves = lines_dict.get('карниз', [])
-    gables = lines_dict.get('фронтон', [])
-    valleys = lines_dict.get('ендова', [])
-    ridges = lines_dict.get('конёк', [])
-    dop_lines = lines_dict.get('примыкание', [])
-    print('eaves', eaves)
-    print('gables', gables)    
-    print('valleys', valleys)
-    print('ridges', ridges)
-    print('dop_lines', dop_lines)
-    all_lines = eaves + gables + valleys + ridges + dop_lines
-    x_max = 0
-    y_max = 0
-    for line in all_lines:
-        if line.coords[0][0] > x_max:
-            x_max = line.coords[0][0]
-        if line.coords[1][0] > x_max:
-            x_max = line.coords[1][0]
-        if line.coords[0][1] > y_max:
-            y_max = line.coords[0][1]
-        if line.coords[1][1] > y_max:
-            y_max = line.coords[1][1]
-    result = {'карниз': [], 'фронтон': [], 'ендова': [], 'конёк': [], 'примыкание': []}
-    if eaves:
-        main_eave = eaves[0]
-        angle = 0
-        for eave in eaves:
-            if eave.coords[0][0] == eave.coords[1][0]:
-                main_eave = eave
-                angle = 90
-            elif eave.coords[0][1] == eave.coords[1][1]:
-                main_eave = eave
-                angle = 0
-        if main_eave.coords[0][0] == main_eave.coords[1][0]:
-            if main_eave.coords[0][0] == x_max:
-                angle = -90
-                if main_eave.coords[0][1] > main_eave.coords[1][1]:
-                    anchor_x, anchor_y = main_eave.coords[0]
-                else:
-                    anchor_x, anchor_y = main_eave.coords[1]
-            else:
-                angle = 90
-                if main_eave.coords[0][1] > main_eave.coords[1][1]:
-                    anchor_x, anchor_y = main_eave.coords[1]
-                else:
-                    anchor_x, anchor_y = main_eave.coords[0]
-        else:
-            if main_eave.coords[0][1] == y_max:
-                if main_eave.coords[0][0] < main_eave.coords[1][0]:
-                    anchor_x, anchor_y = main_eave.coords[0]
-                else:
-                    anchor_x, anchor_y = main_eave.coords[1]
-            else:
-                if main_eave.coords[0][0] < main_eave.coords[1][0]:
-                    anchor_x, anchor_y = main_eave.coords[1]
-                else:
-                    anchor_x, anchor_y = main_eave.coords[0]
-        high = 1
-        if angle == 0:
-            for line in all_lines:
-                if anchor_y > line.coords[0][1] or anchor_y > line.coords[1][1]:
-                    angle = 180
-        anchor_point = ShapelyPoint(anchor_x, anchor_y)
-        moved_lines = [move_geometry_to_point(ln, anchor_point) for ln in all_lines]
-        process_lines = moved_lines
-        if angle == 0:
-            rotated_lines = process_lines
-        else:
-            rotated_lines = [rotate_geometry(ml, angle) for ml in process_lines]
-        rotated_lines = [right_line(ml) for ml in rotated_lines]
-        idx = 0
-        min_x = 10**9
-        min_y = 10**9
-        for line in rotated_lines:
-            if line.coords[0][0] < min_x:
-                min_x = line.coords[0][0]
-            if line.coords[1][0] < min_x:
-                min_x = line.coords[1][0]
-            if line.coords[0][1] < min_y:
-                min_y = line.coords[0][1]
-            if line.coords[1][1] < min_y:
-                min_y = line.coords[1][1]
-        min_point = ShapelyPoint(min_x, min_y)
-        rotated_lines = [move_geometry_to_point(ln, min_point) for ln in rotated_lines]
-        for t in ('карниз', 'фронтон', 'ендова', 'конёк', 'примыкание'):
-            n = len(lines_dict.get(t, []))
-            result[t] = rotated_lines[idx: idx + n]
-            idx += n
-        return result
-    elif gables and valleys:
-        target_list = gables
-        main_line = target_list[0]
-        for line in valleys:
-            if line.coords[0][0] == main_line.coords[0][0] and line.coords[0][1] == main_line.coords[0][1]:
-                anchor_x, anchor_y = main_line.coords[0]
-            if line.coords[1][0] == main_line.coords[0][0] and line.coords[1][1] == main_line.coords[0][1]:
-                anchor_x, anchor_y = main_line.coords[0]
-            if line.coords[0][0] == main_line.coords[1][0] and line.coords[0][1] == main_line.coords[1][1]:
-                anchor_x, anchor_y = main_line.coords[1]
-            if line.coords[1][0] == main_line.coords[1][0] and line.coords[1][1] == main_line.coords[1][1]:
-                anchor_x, anchor_y = main_line.coords[1]
-        if main_line.coords[0][0] == main_line.coords[1][0]:
-                angle = 90
-        elif main_line.coords[0][1] == main_line.coords[1][1]:
-            angle = 0
-        high = 1
-        right = 1
-        for line in all_lines:
-            if anchor_x > line.coords[0][0] or anchor_x > line.coords[1][0]:
-                right = 0
-            if anchor_y > line.coords[0][1] or anchor_y > line.coords[1][1]:
-                high = 0
-        anchor_point = ShapelyPoint(anchor_x, anchor_y)
-        moved_lines = [move_geometry_to_point(ln, anchor_point) for ln in all_lines]
-        process_lines = moved_lines
-        if high == 0:
-            process_lines = [up_line(ml) for ml in process_lines]
-        if right == 0:
-            process_lines = [right_line(ml) for ml in process_lines]
-        if angle == 90:
-            rotated_lines = process_lines
+from typing import Dict, List
+
+import numpy as np
+
+# Порядок типов линий при сборке массива отрезков ската
+LINE_TYPES = ('карниз', 'фронтон', 'ендова', 'конёк', 'примыкание')
+
+
+# -------------------- Аффинные матрицы 3x3 --------------------
+
+def translation(dx: float, dy: float) -> np.ndarray:
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+def rotation(angle_degrees: float) -> np.ndarray:
+    """
+    Поворот вокруг начала координат. Как и в shapely.affinity.rotate, синус и
+    косинус меньше 2.5e-16 обнуляются, поэтому повороты на 0/±90/180 точны.
+    """
+    angle = math.radians(angle_degrees)
+    cos, sin = math.cos(angle), math.sin(angle)
+    if abs(cos) < 2.5e-16:
+        cos = 0.0
+    if abs(sin) < 2.5e-16:
+        sin = 0.0
+    return np.array([[cos, -sin, 0.0], [sin, cos, 0.0], [0.0, 0.0, 1.0]])
+
+
+def scaling(sx: float, sy: float) -> np.ndarray:
+    return np.array([[sx, 0.0, 0.0], [0.0, sy, 0.0], [0.0, 0.0, 1.0]])
+
+
+def apply_affine(matrix: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """
+    Применить матрицу 3x3 к отрезкам формы (N, 2, 2) одним умножением.
+    """
+    points = segments.reshape(-1, 2)
+    homogeneous = np.hstack([points, np.ones((len(points), 1))])
+    return (homogeneous @ matrix.T)[:, :2].reshape(segments.shape)
+
+
+def bounds(segments: np.ndarray):
+    """
+    (min_x, min_y, max_x, max_y) всех концов отрезков.
+    """
+    points = segments.reshape(-1, 2)
+    (min_x, min_y), (max_x, max_y) = points.min(axis=0), points.max(axis=0)
+    return float(min_x), float(min_y), float(max_x), float(max_y)
+
+
+def _horizontal(segment) -> bool:
+    return segment[0, 1] == segment[1, 1]
+
+
+def _vertical(segment) -> bool:
+    return segment[0, 0] == segment[1, 0]
+
+
+# -------------------- Размещение ската --------------------
+
+def _eaves_placement(eaves: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """
+    Скат с карнизом: карниз ложится на ось X, скат зеркалится по X.
+    """
+    _, _, x_max, y_max = bounds(segments)
+    x_max, y_max = max(x_max, 0), max(y_max, 0)
+    main_eave = eaves[0]
+    angle = 0
+    for eave in eaves:
+        if _vertical(eave):
+            main_eave, angle = eave, 90
+        elif _horizontal(eave):
+            main_eave, angle = eave, 0
+    (x0, y0), (x1, y1) = main_eave
+    if x0 == x1:
+        if x0 == x_max:
+            angle = -90
+            anchor = main_eave[0] if y0 > y1 else main_eave[1]
         else:
-            rotated_lines = [rotate_geometry(ml, 90) for ml in process_lines]
-        idx = 0
-        min_x = 10**9
-        min_y = 10**9
-        for line in rotated_lines:
-            if line.coords[0][0] < min_x:
-                min_x = line.coords[0][0]
-            if line.coords[1][0] < min_x:
-                min_x = line.coords[1][0]
-            if line.coords[0][1] < min_y:
-                min_y = line.coords[0][1]
-            if line.coords[1][1] < min_y:
-                min_y = line.coords[1][1]
-        if min_x < 0:
-            min_point = ShapelyPoint(min_x, 0)
-            rotated_lines = [move_geometry_to_point(ln, min_point) for ln in rotated_lines]
-        if min_y < 0:
-            min_point = ShapelyPoint(0, min_y)
-            rotated_lines = [move_geometry_to_point(ln, min_point) for ln in rotated_lines]
-        for t in ('карниз', 'фронтон', 'ендова', 'конёк', 'примыкание'):
-            n = len(lines_dict.get(t, []))
-            result[t] = rotated_lines[idx: idx + n]
-            idx += n
-        return result
+            angle = 90
+            anchor = main_eave[1] if y0 > y1 else main_eave[0]
+    elif y0 == y_max:
+        anchor = main_eave[0] if x0 < x1 else main_eave[1]
     else:
-        main_ridge = ridges[0]
-        for ridge in ridges:
-            if ridge.coords[0][0] == ridge.coords[1][0]:
-                main_ridge = ridge
-                angle = 90
-            elif ridge.coords[0][1] == ridge.coords[1][1]:
-                main_ridge = ridge
-                angle = 0
-        if main_ridge.coords[0][0] == main_ridge.coords[1][0]:
-            if main_ridge.coords[0][1] < main_ridge.coords[1][1]:
-                anchor_x, anchor_y = main_ridge.coords[0]
-            else:
-                anchor_x, anchor_y = main_ridge.coords[1]
-        else:
-            if main_ridge.coords[0][0] > main_ridge.coords[1][0]:
-                anchor_x, anchor_y = main_ridge.coords[0]
-            else:
-                anchor_x, anchor_y = main_ridge.coords[1]
-        high = 0
-        right = 0
-        for line in all_lines:
-            if anchor_x < line.coords[0][0] or anchor_x < line.coords[1][0]:
-                right = 0
-            if anchor_y < line.coords[0][1] or anchor_y < line.coords[1][1]:
-                high = 0
-        anchor_point = ShapelyPoint(anchor_x, anchor_y)
-        moved_lines = [move_geometry_to_point(ln, anchor_point) for ln in all_lines]
-        process_lines = moved_lines
-        if high == 1:
-            process_lines = [up_line(ml) for ml in process_lines]
-        if right == 1:
-            process_lines = [right_line(ml) for ml in process_lines]
-        if angle == 0:
-            rotated_lines = process_lines
-        else:
-            rotated_lines = [rotate_geometry(ml, angle) for ml in process_lines]
-        idx = 0
-        min_x = 10**9
-        min_y = 10**9
-        for line in rotated_lines:
-            if line.coords[0][0] < min_x:
-                min_x = line.coords[0][0]
-            if line.coords[1][0] < min_x:
-                min_x = line.coords[1][0]
-            if line.coords[0][1] < min_y:
-                min_y = line.coords[0][1]
-            if line.coords[1][1] < min_y:
-                min_y = line.coords[1][1]
-        if min_x < 0:
-            min_point = ShapelyPoint(min_x, 0)
-            rotated_lines = [move_geometry_to_point(ln, min_point) for ln in rotated_lines]
-        if min_y < 0:
-            min_point = ShapelyPoint(0, min_y)
-            rotated_lines = [move_geometry_to_point(ln, min_point) for ln in rotated_lines]
-        for t in ('карниз', 'фронтон', 'ендова', 'конёк', 'примыкание'):
-            n = len(lines_dict.get(t, []))
-            result[t] = rotated_lines[idx: idx + n]
-            idx += n
-        return result
+        anchor = main_eave[1] if x0 < x1 else main_eave[0]
+    if angle == 0 and anchor[1] > segments[:, :, 1].min():
+        angle = 180
+    return scaling(-1, 1) @ rotation(angle) @ translation(-anchor[0], -anchor[1])
+
+
+def _gable_placement(gables: np.ndarray, valleys: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """
+    Скат без карниза с фронтоном и ендовой: фронтон ложится на ось Y.
+    """
+    main_line = gables[0]
+    anchor = None
+    for line in valleys:
+        for end in line:
+            if end[0] == main_line[0, 0] and end[1] == main_line[0, 1]:
+                anchor = main_line[0]
+        for end in line:
+            if end[0] == main_line[1, 0] and end[1] == main_line[1, 1]:
+                anchor = main_line[1]
+    if anchor is None:
+        raise ValueError("Gable has no common point with a valley")
+    if _vertical(main_line):
+        angle = 90
+    elif _horizontal(main_line):
+        angle = 0
+    else:
+        raise ValueError("Gable is not axis-aligned")
+    right = not (anchor[0] > segments[:, :, 0].min())
+    high = not (anchor[1] > segments[:, :, 1].min())
+    matrix = scaling(1 if right else -1, 1 if high else -1) @ translation(-anchor[0], -anchor[1])
+    if angle != 90:
+        matrix = rotation(90) @ matrix
+    return matrix
+
+
+def _ridge_placement(ridges: np.ndarray) -> np.ndarray:
+    """
+    Скат только с коньком: конёк поворачивается на ось X.
+    """
+    if not len(ridges):
+        raise ValueError("Slope has no eave, gable with valley or ridge")
+    main_ridge = ridges[0]
+    angle = None
+    for ridge in ridges:
+        if _vertical(ridge):
+            main_ridge, angle = ridge, 90
+        elif _horizontal(ridge):
+            main_ridge, angle = ridge, 0
+    if angle is None:
+        raise ValueError("Ridge is not axis-aligned")
+    (x0, y0), (x1, y1) = main_ridge
+    if x0 == x1:
+        anchor = main_ridge[0] if y0 < y1 else main_ridge[1]
+    else:
+        anchor = main_ridge[0] if x0 > x1 else main_ridge[1]
+    return rotation(angle) @ translation(-anchor[0], -anchor[1])
+
+
+def transform_roof(lines_dict: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Привести скат к стандартному положению.
+
+    :param lines_dict: {тип линии: отрезки формы (N, 2, 2)} для типов LINE_TYPES.
+    :return: словарь той же структуры с преобразованными отрезками.
+
+    Положение выбирается по карнизу, иначе по фронтону с ендовой, иначе по коньку.
+    Сдвиг/поворот/отражение собираются в одну матрицу, затем скат отдельным шагом
+    сдвигается к осям по минимальным координатам.
+    """
+    groups = [np.asarray(lines_dict.get(t, np.empty((0, 2, 2))), dtype=float).reshape(-1, 2, 2) for t in LINE_TYPES]
+    eaves, gables, valleys, ridges, _ = groups
+    segments = np.concatenate(groups)
+    if len(eaves):
+        matrix = _eaves_placement(eaves, segments)
+    elif len(gables) and len(valleys):
+        matrix = _gable_placement(gables, valleys, segments)
+    else:
+        matrix = _ridge_placement(ridges)
+    segments = apply_affine(matrix, segments)
+    min_x, min_y, _, _ = bounds(segments)
+    if len(eaves):
+        segments = segments - (min_x, min_y)
+    else:
+        segments = segments - (min(min_x, 0), min(min_y, 0))
+    result, idx = {}, 0
+    for t, group in zip(LINE_TYPES, groups):
+        result[t] = segments[idx: idx + len(group)]
+        idx += len(group)
+    return result
 
 
 def rotate_roof_lines_in_memory(lines_list):
-    lines_dict = {'карниз': [], 'фронтон': [], 'ендова': [], 'конёк': [], 'примыкание': []}
-    lines_map = {'карниз': [], 'фронтон': [], 'ендова': [], 'конёк': [], 'примыкание': []}
-    for l in lines_list:
-        ls = LineString([(l.start.x, l.start.y), (l.end.x, l.end.y)])
-        if l.type in lines_dict:
-            lines_dict[l.type].append(ls)
-            lines_map[l.type].append(l)
-    transformed_lines_dict = transform_roof(lines_dict)
-    for t, new_lines in transformed_lines_dict.items():
-        old_objs = lines_map[t]
-        for geom, old_line in zip(new_lines, old_objs):
-            (x1, y1), (x2, y2) = geom.coords
+    """
+    Преобразовать линии ската на месте (меняются координаты точек start/end).
+    Линии с типами вне LINE_TYPES не участвуют в выборе положения.
+    """
+    lines_map = {t: [] for t in LINE_TYPES}
+    for line in lines_list:
+        if line.type in lines_map:
+            lines_map[line.type].append(line)
+    lines_dict = {
+        t: np.array([[(l.start.x, l.start.y), (l.end.x, l.end.y)] for l in lines], dtype=float).reshape(-1, 2, 2)
+        for t, lines in lines_map.items()
+    }
+    transformed = transform_roof(lines_dict)
+    for t, old_lines in lines_map.items():
+        for ((x1, y1), (x2, y2)), old_line in zip(transformed[t].tolist(), old_lines):
             old_line.start.x = x1
             old_line.start.y = y1
             old_line.end.x = x2
             old_line.end.y = y2
 
 
-def rotate_slope(lines):
-
+def rotate_slope(lines: List) -> List:
     rotate_roof_lines_in_memory(lines)
     return lines
@@ -281,3 +281,19 @@ class EstimateRequest(BaseModel):
     accessories: list[AccessoriesEstimateResponse]
     sofits: list[SofitsEstimateResponce]
     screws: list[ScrewsEstimateResponse]
+
+
+# Export
+
+
+class ExportRequest(BaseModel):
+    project_ids: List[UUID4]
+
+
+class ExportJobResponse(BaseModel):
+    id: str
+    status: str
+    total: int
+    done: int
+    failed: List[UUID4] = []
+    error: Optional[str] = None
@@ -0,0 +1,257 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+
+@dataclass
+class SizePoint:
+    id: object
+    x: float
+    y: float
+
+
+@dataclass
+class SizeLine:
+    id: object
+    start_id: object
+    end_id: object
+    parent_id: object
+    type: Optional[str]
+    angle: Optional[int]
+    length: Optional[float]
+
+
+@dataclass
+class SizeLength:
+    id: object
+    type: int
+    length: Optional[float]
+    point_1_id: object = None
+    point_2_id: object = None
+    line_slope_1_id: object = None
+    line_slope_2_id: object = None
+
+
+@dataclass
+class SizesDiff:
+    """
+    Изменения, найденные решателем размеров ската.
+
+    points: {point_slope_id: (x, y)} — только сдвинутые точки.
+    lines: {line_slope_id: length} — линии ската с изменившейся длиной.
+    parents: {line_id: length} — длины родительских линий (повторяют длины всех линий ската).
+    lengths: {length_slope_id: length} — измерения с изменившейся длиной.
+    """
+    points: Dict[object, tuple] = field(default_factory=dict)
+    lines: Dict[object, float] = field(default_factory=dict)
+    parents: Dict[object, float] = field(default_factory=dict)
+    lengths: Dict[object, float] = field(default_factory=dict)
+
+
+def measure_length(length: SizeLength, points: Dict[object, SizePoint], lines: Dict[object, SizeLine]) -> Optional[float]:
+    """
+    Длина измерительной линии по текущим координатам (как в update_line_slope).
+    Возвращает None, если измерение ссылается на отсутствующие точки или линии.
+    """
+    try:
+        if length.type == 0:
+            line_1 = lines[length.line_slope_1_id]
+            line_2 = lines[length.line_slope_2_id]
+            return round(abs(points[line_2.start_id].y - points[line_1.start_id].y), 2)
+        if length.type == 1:
+            line = lines[length.line_slope_1_id]
+            return round(abs(points[line.start_id].y - points[length.point_1_id].y), 2)
+        return round(abs(points[length.point_1_id].y - points[length.point_2_id].y), 2)
+    except KeyError:
+        return None
+
+
+def solve_sizes(
+    points: Iterable[SizePoint],
+    lines: Iterable[SizeLine],
+    lengths: Iterable[SizeLength],
+    line_sizes: Dict[object, float],
+    length_sizes: Dict[object, float]
+) -> SizesDiff:
+    """
+    Расставить размеры ската в памяти.
+
+    Повторяет порядок шагов add_sizes: высоты из измерений, вертикальные сдвиги,
+    горизонтальные и диагональные сдвиги по X, выравнивание конька, пересчёт длин.
+
+    :param points: точки ската (порядок как в БД; влияет на порядок обхода при равных координатах).
+    :param lines: линии ската.
+    :param lengths: измерительные линии ската.
+    :param line_sizes: {line_slope_id: новая длина} из запроса.
+    :param length_sizes: {length_slope_id: новая длина} из запроса.
+    """
+    points = [SizePoint(p.id, p.x, p.y) for p in points]
+    by_id = {p.id: p for p in points}
+    original = {p.id: (p.x, p.y) for p in points}
+    lines = {ln.id: ln for ln in lines}
+    lengths = {ls.id: ls for ls in lengths}
+    lines_data = dict(line_sizes)
+    lines_data_or = dict(line_sizes)
+
+    def set_x(pid, x):
+        by_id[pid].x = x
+
+    def set_y(pid, y):
+        by_id[pid].y = y
+
+    # 1) Высоты из измерительных линий
+    for length_id, length in length_sizes.items():
+        ls = lengths.get(length_id)
+        if ls is None:
+            continue
+        if ls.type == 0:
+            line = lines[ls.line_slope_2_id]
+            set_y(line.start_id, length)
+            set_y(line.end_id, length)
+        elif ls.type == 1:
+            set_y(ls.point_1_id, length)
+        else:
+            set_y(ls.point_2_id, length)
+
+    # 2) Классификация линий по текущим координатам
+    points_y_id = [p.id for p in sorted(points, key=lambda p: p.y)]
+    points_id = [p.id for p in sorted(points, key=lambda p: p.x)]
+    lines_on_point, lines_v_on_point, lines_g_on_point, lines_n_on_point = {}, {}, {}, {}
+    for ln in lines.values():
+        start, end = by_id[ln.start_id], by_id[ln.end_id]
+        if start.x == end.x:
+            groups = lines_v_on_point
+        elif start.y == end.y:
+            groups = lines_g_on_point
+        else:
+            groups = lines_n_on_point
+        for target in (groups, lines_on_point):
+            target.setdefault(ln.start_id, []).append(ln.id)
+            target.setdefault(ln.end_id, []).append(ln.id)
+    lines_n = 0
+
+    # 3) Вертикальные сдвиги
+    for pt_id in points_y_id:
+        for line_id in lines_v_on_point.get(pt_id, []):
+            if line_id not in lines_data:
+                continue
+            length = lines_data.pop(line_id)
+            line = lines[line_id]
+            start, end = by_id[line.start_id], by_id[line.end_id]
+            base_y = min(start.y, end.y)
+            point_n_id = line.end_id if start.y < end.y else line.start_id
+            # Горизонтальные смежные
+            if point_n_id in lines_g_on_point:
+                line_g = lines[lines_g_on_point[point_n_id][0]]
+                for pid in (line_g.start_id, line_g.end_id):
+                    set_y(pid, round(base_y + length, 3))
+            # Диагональные смежные
+            if point_n_id in lines_n_on_point:
+                line_n = lines[lines_n_on_point[point_n_id][0]]
+                target = line_n.end_id if line_n.end_id < line_n.start_id else line_n.start_id
+                set_y(target, round(base_y + length, 3))
+
+    # 4) Горизонтальные и диагональные сдвиги по X
+    point_max = None
+    for pt_id in points_id:
+        for line_id in lines_on_point.get(pt_id, []):
+            if line_id not in lines_data:
+                continue
+            length = lines_data.pop(line_id)
+            ln = lines[line_id]
+            pt = by_id[pt_id]
+            if ln.angle == 2:
+                # Горизонталь
+                p = ln.end_id if pt.id == ln.start_id else ln.start_id
+                set_x(p, round(pt.x + length, 3))
+            elif ln.angle == 1:
+                continue
+            else:
+                # Диагональ
+                lines_n += 1
+                if pt.id == ln.start_id:
+                    h = abs(pt.y - by_id[ln.end_id].y)
+                    dx = (length**2 - h**2)**0.5
+                    p = ln.end_id
+                    set_x(p, round(pt.x + dx, 3))
+                if pt.id == ln.end_id:
+                    h = abs(pt.y - by_id[ln.start_id].y)
+                    dx = (length**2 - h**2)**0.5
+                    p = ln.start_id
+                    set_x(p, round(pt.x + dx, 3))
+            if lines_v_on_point.get(p):
+                line_v = lines[lines_v_on_point[p][0]]
+                other = line_v.end_id if p == line_v.start_id else line_v.start_id
+                set_x(other, by_id[p].x)
+                p = other
+            point_max = p
+
+    # 5) Выравнивание конька
+    if point_max is not None:
+        for line_id in lines_on_point.get(point_max, []):
+            orig_len = lines_data_or.get(line_id)
+            line = lines[line_id]
+            if line.angle != 2 or orig_len is None:
+                continue
+            start, end = by_id[line.start_id], by_id[line.end_id]
+            line_length = abs(start.x - end.x)
+            if abs(line_length - orig_len) < 1e-6:
+                continue
+            point_stack = []
+            if lines_n == 0:
+                break
+            div_x = round((line_length - orig_len) / lines_n, 3)
+            # Базовая точка конька
+            if start.x < end.x:
+                ridge_pt, base_x = line.end_id, start.x
+            else:
+                ridge_pt, base_x = line.start_id, end.x
+            for lid in lines_on_point.get(ridge_pt, []):
+                if lid == line_id:
+                    continue
+                adjacent = lines[lid]
+                if adjacent.angle == 1:
+                    set_x(adjacent.start_id, round(base_x + orig_len, 3))
+                    set_x(adjacent.end_id, round(base_x + orig_len, 3))
+                    point_stack.extend([adjacent.start_id, adjacent.end_id])
+                else:
+                    set_x(ridge_pt, round(base_x + orig_len, 3))
+                    point_stack.append(ridge_pt)
+            # Смещаем остальные точки
+            for pid in points_id:
+                if pid in point_stack:
+                    continue
+                pt = by_id[pid]
+                q = 0
+                shifted = False
+                for lid in lines_on_point.get(pid, []):
+                    adjacent = lines[lid]
+                    if adjacent.type in ('ендова', 'карниз'):
+                        q += 1
+                    if adjacent.angle == 2:
+                        actual = abs(by_id[adjacent.start_id].x - by_id[adjacent.end_id].x)
+                        target = lines_data_or.get(adjacent.id)
+                        if target is not None and abs(actual - target) > 1e-6:
+                            shifted = True
+                if not shifted and (pt.y == 0 or q == 2 or pt.x == 0):
+                    point_stack.append(pid)
+                    continue
+                set_x(pid, round(pt.x - div_x, 3))
+                point_stack.append(pid)
+            break
+
+    # 6) Длины линий и измерений по новым координатам
+    diff = SizesDiff()
+    for p in points:
+        if (p.x, p.y) != original[p.id]:
+            diff.points[p.id] = (p.x, p.y)
+    for ln in lines.values():
+        start, end = by_id[ln.start_id], by_id[ln.end_id]
+        new_len = round(((start.x - end.x)**2 + (start.y - end.y)**2)**0.5, 3)
+        if new_len != ln.length:
+            diff.lines[ln.id] = new_len
+        diff.parents[ln.parent_id] = new_len
+    for ls in lengths.values():
+        new_len = length_sizes[ls.id] if ls.id in length_sizes else measure_length(ls, by_id, lines)
+        if new_len is not None and new_len != ls.length:
+            diff.lengths[ls.id] = new_len
+    return diff
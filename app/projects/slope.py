@@ -12,17 +12,17 @@ from app.base.models import AccessoriesBD
 from app.projects.models import  LinesSlope, PointSlope
 
 
-def create_sheets(figure, roof, is_left, overhang):
-    sheets = []
+def sheet_grid(figure, roof, is_left, overhang):
+    """
+    Сетка раскладки: позиции колонок по X, стартовые позиции листов по Y
+    и уровни привязки нижнего края листа (шаг — нахлест).
+    """
     overall_width = roof.overall_width
     delta_width = roof.overall_width - roof.useful_width
     length_max = roof.max_length
     overlap = roof.overlap
-    length_min = roof.min_length
-    sizes = roof.imp_sizes
     left = is_left
     x_min, y_min, x_max, y_max = figure.bounds
-    prepared_figure = prep(figure)
     x_positions = []
     x = x_min
     if abs(x) >= overall_width:
@@ -51,6 +51,19 @@ def create_sheets(figure, roof, is_left, overhang):
         y_positions.append(y)
         y += length_max
         y -= overlap
+    return x_positions, y_positions, y_levels, overhang
+
+
+def create_sheets(figure, roof, is_left, overhang):
+    sheets = []
+    overall_width = roof.overall_width
+    delta_width = roof.overall_width - roof.useful_width
+    length_max = roof.max_length
+    overlap = roof.overlap
+    length_min = roof.min_length
+    sizes = roof.imp_sizes
+    prepared_figure = prep(figure)
+    x_positions, y_positions, y_levels, overhang = sheet_grid(figure, roof, is_left, overhang)
 
     for x_start in x_positions:
         x_start_use = x_start + delta_width
@@ -326,14 +339,118 @@ class GraphBuilder:
         return line_cycles
 
 
-def find_slope(lines):
+class PlanarFaceBuilder:
+    """
+    Поиск скатов как минимальных граней планарного графа линий.
+
+    Для каждой вершины соседи сортируются по углу, после чего каждое
+    полуребро (u -> v) продолжается полуребром (v -> w), где w — ближайший
+    по часовой стрелке сосед v после u. Такой обход оставляет грань слева,
+    поэтому ограниченные грани получаются с положительной площадью,
+    а внешняя грань каждой компоненты — с отрицательной.
+    Сложность O(E log E) вместо перебора всех простых циклов.
+    """
+
+    def __init__(self, lines, point_coords):
+        self.lines = lines
+        self.point_coords = point_coords
+        self.line_map = {}
+        self.line_order = {}
+        for idx, line in enumerate(lines):
+            e = tuple(sorted((line.start_id, line.end_id)))
+            self.line_map[e] = line.id
+            self.line_order[line.id] = idx
+
+    def _build_adjacency(self):
+        adjacency = defaultdict(set)
+        for start_id, end_id in self.line_map:
+            if start_id == end_id:
+                continue
+            adjacency[start_id].add(end_id)
+            adjacency[end_id].add(start_id)
+        # Висячие вершины не могут ограничивать грань — убираем их цепочками
+        stack = [v for v, neighbors in adjacency.items() if len(neighbors) < 2]
+        while stack:
+            v = stack.pop()
+            for u in adjacency.pop(v, ()):
+                adjacency[u].discard(v)
+                if len(adjacency[u]) == 1:
+                    stack.append(u)
+        return adjacency
+
+    def _sort_neighbors(self, adjacency):
+        ordered = {}
+        position = {}
+        for v, neighbors in adjacency.items():
+            vx, vy = self.point_coords[v]
+            around = sorted(
+                neighbors,
+                key=lambda u: math.atan2(self.point_coords[u][1] - vy, self.point_coords[u][0] - vx)
+            )
+            ordered[v] = around
+            for idx, u in enumerate(around):
+                position[(v, u)] = idx
+        return ordered, position
+
+    def _signed_area(self, face):
+        area = 0.0
+        for i in range(len(face)):
+            x1, y1 = self.point_coords[face[i]]
+            x2, y2 = self.point_coords[face[(i + 1) % len(face)]]
+            area += x1 * y2 - x2 * y1
+        return area / 2
+
+    def find_faces(self):
+        adjacency = self._build_adjacency()
+        ordered, position = self._sort_neighbors(adjacency)
+        visited = set()
+        faces = []
+        for v, around in ordered.items():
+            for u in around:
+                if (v, u) in visited:
+                    continue
+                face = []
+                a, b = v, u
+                while (a, b) not in visited:
+                    visited.add((a, b))
+                    face.append(a)
+                    neighbors = ordered[b]
+                    c = neighbors[(position[(b, a)] - 1) % len(neighbors)]
+                    a, b = b, c
+                if self._signed_area(face) > 0:
+                    faces.append(face)
+        return faces
+
+    def find_minimal_cycles_by_geometry(self):
+        line_cycles = []
+        for face in self.find_faces():
+            ids = []
+            for i in range(len(face)):
+                e = tuple(sorted((face[i], face[(i + 1) % len(face)])))
+                ids.append(self.line_map[e])
+            # Грань, проходящая ребро дважды (мост), скатом не является
+            if len(set(ids)) != len(ids):
+                continue
+            first = min(range(len(ids)), key=lambda i: self.line_order[ids[i]])
+            line_cycles.append(ids[first:] + ids[:first])
+        line_cycles.sort(key=lambda ids: self.line_order[ids[0]])
+        return line_cycles
+
+
+SLOPE_FINDERS = {
+    'faces': PlanarFaceBuilder,
+    'cycles': GraphBuilder,
+}
+
+
+def find_slope(lines, method: str = 'faces'):
     points = {}
     for line in lines:
         if line.start_id not in points:
             points[line.start_id] = (line.start.x, line.start.y)
         if line.end_id not in points:
             points[line.end_id] = (line.end.x, line.end.y)
-    builder = GraphBuilder(lines, points)
+    builder = SLOPE_FINDERS[method](lines, points)
     minimal_cycles = builder.find_minimal_cycles_by_geometry()
     return minimal_cycles
 
@@ -360,31 +477,40 @@ def create_figure(lines, cutouts):
 
 
 def generate_slopes_length(lines: List[LinesSlope], points: List[PointSlope]):
-    dif_y = []
-    points_on_y: Dict[float, List[UUID4]] = {}
+    """
+    Измерительные линии ската: [type, a, b], где
+      0 — от нижней горизонтальной линии a до горизонтальной линии b,
+      1 — от горизонтальной линии a до точки b,
+      2 — от нижней точки a до точки b.
+
+    Измерения, которые совпадают с вертикальной линией ската, не создаются.
+    Все поиски идут по словарям (линии по id, точки по уровню y, измерения по точкам),
+    поэтому время линейно по числу линий и точек.
+    """
+    # Точки и горизонтальные линии по уровням y (в порядке первого появления уровня)
+    points_on_y: Dict[float, Dict[UUID4, None]] = {}
     lines_on_y: Dict[float, List[UUID4]] = {}
-    slope_lines = []
     for point in points:
-        if point.y not in dif_y:
-            dif_y.append(point.y)
-            points_on_y[point.y] = []
+        if point.y not in points_on_y:
+            points_on_y[point.y] = {}
             lines_on_y[point.y] = []
-        points_on_y[point.y].append(point.id)
+        points_on_y[point.y][point.id] = None
     for line in lines:
         if line.start.y == line.end.y:
             lines_on_y[line.start.y].append(line.id)
-            if line.start_id in points_on_y[line.start.y]:
-                points_on_y[line.start.y].remove(line.start_id)
-            if line.end_id in points_on_y[line.start.y]:
-                points_on_y[line.start.y].remove(line.end_id)
+            points_on_y[line.start.y].pop(line.start_id, None)
+            points_on_y[line.start.y].pop(line.end_id, None)
+    points_on_y = {y: list(ids) for y, ids in points_on_y.items()}
     if len(lines_on_y[0]) == 0:
         point_o = points_on_y[0][0]
         k = 0
     else:
         line_o = lines_on_y[0][0]
         k = 1
-    dif_y.remove(0)
-    for y in dif_y:
+    slope_lines = []
+    for y in points_on_y:
+        if y == 0:
+            continue
         if k == 1:
             if len(points_on_y[y]) == 1:
                 slope_lines.append([1, line_o, points_on_y[y][0]])
@@ -397,48 +523,43 @@ def generate_slopes_length(lines: List[LinesSlope], points: List[PointSlope]):
             else:
                 for line in lines_on_y[y]:
                     slope_lines.append([1, line, point_o])
+
+    # Индекс измерений по точкам, через которые они могут совпасть с вертикальной линией
+    ends = {line.id: (line.start_id, line.end_id) for line in lines}
+    by_point: Dict[UUID4, List[int]] = {}
+    for idx, s_line in enumerate(slope_lines):
+        if s_line[0] == 2:
+            related = (s_line[1], s_line[2])
+        elif s_line[0] == 1:
+            related = (s_line[2],)
+        else:
+            related = ends[s_line[1]]
+        for point_id in set(related):
+            by_point.setdefault(point_id, []).append(idx)
+
+    def covers(line, s_line) -> bool:
+        if s_line[0] == 2:
+            return line.start_id in (s_line[1], s_line[2]) and line.end_id in (s_line[1], s_line[2])
+        if s_line[0] == 1:
+            n_line = ends[s_line[1]]
+            if line.start_id == s_line[2]:
+                return line.end_id in n_line
+            return line.end_id == s_line[2] and line.start_id in n_line
+        line_1, line_2 = ends[s_line[1]], ends[s_line[2]]
+        if line.end_id in line_1:
+            return line.start_id in line_2
+        return line.start_id in line_1 and line.end_id in line_2
+
+    # Каждая вертикальная линия убирает первое ещё не убранное совпадающее измерение
+    removed = set()
     for line in lines:
         if line.start.x == line.end.x:
-            for s_line in slope_lines:
-                c = 0
-                if s_line[0] == 2:
-                    if line.start_id == s_line[1] or line.start_id == s_line[2]:
-                        c += 1
-                    if line.end_id == s_line[1] or line.end_id == s_line[2]:
-                         c += 1
-                elif s_line[0] == 1:
-                    n_line = None
-                    for l in lines:
-                        if s_line[1] == l.id:
-                            n_line = l
-                    if line.start_id == s_line[2]:
-                        c += 1
-                        if line.end_id == n_line.start_id or line.end_id == n_line.end_id:
-                            c += 1
-                    elif line.end_id == s_line[2]:
-                        c += 1
-                        if line.start_id == n_line.start_id or line.start_id == n_line.end_id:
-                            c += 1
-                else:
-                    line_1 = None
-                    line_2 = None
-                    for l in lines:
-                        if s_line[1] == l.id:
-                            line_1 = l
-                        if s_line[2] == l.id:
-                            line_2 = l
-                    if line.end_id == line_1.start_id or line.end_id == line_1.end_id:
-                        c += 1
-                        if line.start_id == line_2.start_id or line.start_id == line_2.end_id:
-                            c += 1
-                    elif line.start_id == line_1.start_id or line.start_id == line_1.end_id:
-                        c += 1
-                        if line.end_id == line_2.start_id or line.end_id == line_2.end_id:
-                            c += 1
-                if c == 2:
-                    slope_lines.remove(s_line)
+            candidates = set(by_point.get(line.start_id, ())) | set(by_point.get(line.end_id, ()))
+            for idx in sorted(candidates - removed):
+                if covers(line, slope_lines[idx]):
+                    removed.add(idx)
                     break
-    return slope_lines
+    return [s_line for idx, s_line in enumerate(slope_lines) if idx not in removed]
 
 
 def calculate_count_accessory(length: float, accessory: AccessoriesBD) -> int:
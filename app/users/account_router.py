@@ -6,10 +6,11 @@ from pydantic import UUID4
 from ..exceptions import (ChangePasswordException, CompanyNotFound, IncorrectCurrentPasswordException, PermissionDeniedException,
                           UserAlreadyExistsException, UserNotFound)
 from ..projects.dao import ProjectsDAO
-from .auth import get_password_hash, verify_password
+from .cache import invalidate_tokens, invalidate_user
 from .dao import CompanyDAO, SessionsDAO, UsersDAO
 from .dependencies import generate_random_password, generate_unique_login, get_current_user, get_session
 from .models import Users
+from .passwords import password_service
 from .schemas import ChangePasswordRequest, CompanyProjectResponse, CompanyRequest, CompanyResponse, NewUserResponse, SUserRegister, UserResponse, UserSessionsRespnse
 from app.db import async_session_maker
 
@@ -58,6 +59,8 @@ async def delete_company(
         raise CompanyNotFound
     if not user.is_admin:
         raise PermissionDeniedException
+    for company_user in await UsersDAO.find_all(session, company_id=company.id):
+        await invalidate_user(session, company_user.id)
     await CompanyDAO.delete_(session, model_id=company.id)
 
 
@@ -96,7 +99,7 @@ async def register_user(
     if not company:
         raise CompanyNotFound
     raw_password = generate_random_password()
-    hashed_password = get_password_hash(raw_password)
+    hashed_password = await password_service.hash(raw_password)
     login = await generate_unique_login(
         full_name=user_data.name,
         session=session
@@ -133,6 +136,7 @@ async def delete_user(
     if not user_delete:
         raise UserNotFound
 
+    await invalidate_user(session, user_id)
     await UsersDAO.delete_(session, model_id=user_id)
 
 
@@ -152,6 +156,7 @@ async def update_user(
     existing_user = await UsersDAO.find_one_or_none(session, email=user_data.email)
     if existing_user:
         raise UserAlreadyExistsException
+    await invalidate_user(session, user_update.id)
     await UsersDAO.update_(
         session,
         model_id=user_update.id,
@@ -225,6 +230,7 @@ async def delete_session(
         raise UserNotFound
     sessions_data = []
     await SessionsDAO.delete_(session, model_id=user_session.id)
+    await invalidate_tokens([user_session.jwt_token], session)
 
 
 @router.patch("/users/password", description="Change password")
@@ -233,13 +239,18 @@ async def change_password(
       user: Users = Depends(get_current_user),
       session: AsyncSession = Depends(get_session)
 ) -> None:
-    if not verify_password(change_password.current_password, user.hashed_password):
+    # Хэш пароля не кэшируется вместе с пользователем, читаем его из базы
+    db_user = await UsersDAO.find_by_id(session, user.id)
+    if not db_user:
+        raise UserNotFound
+    if not await password_service.verify(change_password.current_password, db_user.hashed_password):
         raise IncorrectCurrentPasswordException
     if change_password.new_password == change_password.current_password:
         raise ChangePasswordException
-    hashed_password = get_password_hash(change_password.new_password)
+    hashed_password = await password_service.hash(change_password.new_password)
     await UsersDAO.update_(
         session,
         model_id=user.id,
         hashed_password=hashed_password
-    )
\ No newline at end of file
+    )
+    await invalidate_user(session, user.id)
\ No newline at end of file
@@ -2,21 +2,18 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.exceptions import TokenExpiredException
 from app.users.dao import UsersDAO
 from app.users.models import Users
-
-# Создаем контекст для хэширования паролей с использованием алгоритма bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.users.passwords import password_service, pwd_context
 
 
 def get_password_hash(password: str) -> str:
     """
-    Возвращает хэш пароля.
+    Возвращает хэш пароля (синхронно; в обработчиках используйте password_service.hash).
 
     :param password: Открытый текст пароля.
     :return: Хэш пароля.
@@ -26,7 +23,8 @@ def get_password_hash(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Проверяет, соответствует ли открытый пароль его хэшу.
+    Проверяет, соответствует ли открытый пароль его хэшу
+    (синхронно; в обработчиках используйте password_service.verify).
 
     :param plain_password: Открытый текст пароля.
     :param hashed_password: Хэш пароля.
@@ -65,7 +63,7 @@ async def authenticate_user(
     :return: Объект пользователя, если аутентификация успешна, иначе None.
     """
     user = await UsersDAO.find_one_or_none(session, login=login)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await password_service.verify(password, user.hashed_password):
         return None
     return user
 
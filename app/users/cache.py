@@ -0,0 +1,92 @@
+import hashlib
+import uuid
+from typing import Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TieredCache
+from app.config import settings
+from app.db import after_commit
+from app.users.dao import SessionsDAO
+from app.users.models import Users
+
+# Поля пользователя, которые кэшируются вместе с токеном (без хэша пароля)
+USER_FIELDS = ("id", "name", "email", "login", "is_admin", "company_id")
+
+auth_cache = TieredCache(
+    prefix="auth",
+    max_bytes=settings.AUTH_CACHE_MAX_BYTES,
+    ttl=settings.AUTH_CACHE_TTL,
+    local_ttl=settings.AUTH_CACHE_LOCAL_TTL
+)
+
+
+def token_key(token: str) -> str:
+    """
+    В кэше хранится только sha256 токена, сам токен не сохраняется.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def user_snapshot(user: Users) -> dict:
+    return {field: str(getattr(user, field)) if field in ("id", "company_id") else getattr(user, field) for field in USER_FIELDS}
+
+
+def user_from_snapshot(snapshot: dict) -> Users:
+    """
+    Несвязанный с сессией объект Users из снимка: доступны только поля USER_FIELDS.
+    """
+    data = dict(snapshot)
+    data["id"] = uuid.UUID(data["id"])
+    data["company_id"] = uuid.UUID(data["company_id"])
+    return Users(**data)
+
+
+# Значение записи токена после сброса: до истечения AUTH_CACHE_TTL токен не кэшируется
+REVOKED = {"revoked": True}
+
+
+async def get_cached_user(token: str, user_id: str) -> Optional[Users]:
+    cached = await auth_cache.get(token_key(token))
+    if cached is None or "user" not in cached or cached["user"]["id"] != user_id:
+        return None
+    return user_from_snapshot(cached["user"])
+
+
+async def cache_user(token: str, user: Users, session_id) -> None:
+    """
+    Закэшировать пользователя токена, если для токена нет записи (в том числе отметки REVOKED).
+
+    Запрос, прочитавший сессию до фиксации ее удаления, может дойти до кэша уже
+    после сброса: запись без перезаписи не дает ему вернуть отозванный токен в кэш.
+    """
+    await auth_cache.add(token_key(token), {"user": user_snapshot(user), "session_id": str(session_id)})
+
+
+async def invalidate_tokens(tokens: Iterable[str], session: Optional[AsyncSession] = None) -> None:
+    """
+    Сбросить кэш токенов: запись заменяется отметкой REVOKED на AUTH_CACHE_TTL.
+
+    :param session: сессия, в транзакции которой удаляются сессии пользователя;
+        отметка записывается после ее фиксации, чтобы срок отметки отсчитывался
+        от момента, когда удаление видно другим запросам. Без сессии — сразу.
+    """
+    keys = [token_key(token) for token in tokens]
+
+    async def revoke() -> None:
+        for key in keys:
+            await auth_cache.set(key, REVOKED)
+
+    if session is None:
+        await revoke()
+    else:
+        after_commit(session, revoke)
+
+
+async def invalidate_user(session: AsyncSession, user_id) -> None:
+    """
+    Сбросить кэш всех активных сессий пользователя (смена пароля, изменение или удаление пользователя).
+    Сессии читаются сразу, кэш сбрасывается после фиксации транзакции session.
+    """
+    user_sessions = await SessionsDAO.find_all(session, user_id=user_id)
+    await invalidate_tokens((user_session.jwt_token for user_session in user_sessions), session)
@@ -8,13 +8,14 @@ from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.db import get_session
+from app.db import get_read_session, get_session
 from app.exceptions import (
     IncorrectTokenFormatException,
     TokenAbsentException,
     TokenExpiredException,
     UserIsNotPresentException
 )
+from app.users.cache import cache_user, get_cached_user
 from app.users.dao import SessionsDAO, UsersDAO
 
 
@@ -45,6 +46,10 @@ async def get_current_user(
     """
     Получает текущего пользователя на основе JWT-токена.
 
+    Пара (пользователь, сессия) кэшируется по хэшу токена в auth_cache, поэтому
+    повторные запросы с тем же токеном не обращаются к базе. Из кэша возвращается
+    несвязанный с сессией объект Users с полями из USER_FIELDS.
+
     :param token: JWT-токен, извлеченный с помощью зависимости get_token.
     :param session: Асинхронная сессия для работы с базой данных.
     :return: Объект пользователя.
@@ -53,6 +58,25 @@ async def get_current_user(
     :raises UserIsNotPresentException: Если пользователь не найден в базе.
     :raises HTTPException: Если не найдена сессия для данного токена.
     """
+    return await _resolve_user(token, session)
+
+
+async def get_current_reader(
+    token: str = Depends(get_token),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    То же, что get_current_user, но через сессию только на чтение: эндпоинты
+    с get_read_session используют одно соединение на запрос, а не два.
+
+    :param token: JWT-токен, извлеченный с помощью зависимости get_token.
+    :param session: Сессия только на чтение (та же, что у обработчика).
+    :return: Объект пользователя.
+    """
+    return await _resolve_user(token, session)
+
+
+async def _resolve_user(token: str, session: AsyncSession):
     try:
         # Декодирование токена с указанием алгоритма в виде списка.
         payload = jwt.decode(
@@ -72,6 +96,10 @@ async def get_current_user(
     if not user_id:
         raise UserIsNotPresentException
 
+    cached_user = await get_cached_user(token, user_id)
+    if cached_user:
+        return cached_user
+
     # Получаем пользователя из базы, передавая открытый сеанс.
     user = await UsersDAO.find_by_id(session, user_id)
     if not user:
@@ -82,6 +110,7 @@ async def get_current_user(
     if not session_obj:
         raise HTTPException(status_code=401, detail="Token mismatch")
 
+    await cache_user(token, user, session_obj.id)
     return user
 
 
@@ -0,0 +1,76 @@
+import asyncio
+import ipaddress
+import os
+import threading
+from typing import Optional
+
+import geoip2.database
+import geoip2.errors
+from loguru import logger
+from maxminddb import MODE_MMAP
+
+from app.cache import LRUCache
+from app.config import settings
+
+UNKNOWN_CITY = "unknown"
+
+
+class GeoIPResolver:
+    """
+    Определение города по IP для сессий пользователей.
+
+    База MaxMind открывается лениво при первом запросе в режиме mmap,
+    поиск выполняется в пуле потоков, результаты запоминаются в LRU.
+    Если файла базы нет, все адреса определяются как "unknown".
+    """
+
+    def __init__(self, path: str, cache_bytes: int):
+        self.path = path
+        self.cache = LRUCache(cache_bytes)
+        self._reader: Optional[geoip2.database.Reader] = None
+        self._unavailable = False
+        self._lock = threading.Lock()
+
+    def _get_reader(self) -> Optional[geoip2.database.Reader]:
+        if self._reader is None and not self._unavailable:
+            with self._lock:
+                if self._reader is None and not self._unavailable:
+                    if not os.path.exists(self.path):
+                        logger.warning("GeoIP database {} not found, cities will be unknown", self.path)
+                        self._unavailable = True
+                    else:
+                        self._reader = geoip2.database.Reader(self.path, mode=MODE_MMAP)
+        return self._reader
+
+    def _lookup(self, ip: str) -> str:
+        reader = self._get_reader()
+        if reader is None:
+            return UNKNOWN_CITY
+        try:
+            return reader.city(ip).city.name or UNKNOWN_CITY
+        except geoip2.errors.AddressNotFoundError:
+            return UNKNOWN_CITY
+
+    async def city(self, client_ip: str) -> str:
+        """
+        Город по IP-адресу клиента; для локальных и некорректных адресов — "unknown".
+        """
+        try:
+            ip = ipaddress.ip_address(client_ip)
+        except ValueError:
+            return UNKNOWN_CITY
+        if ip.is_private or ip.is_loopback or ip.is_reserved:
+            return UNKNOWN_CITY
+        city = self.cache.get(client_ip)
+        if city is None:
+            city = await asyncio.to_thread(self._lookup, client_ip)
+            self.cache.set(client_ip, city)
+        return city
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+geoip_resolver = GeoIPResolver(settings.GEOIP_DB_PATH, settings.GEOIP_CACHE_BYTES)
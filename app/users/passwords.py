@@ -0,0 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.exceptions import PasswordServiceBusyException
+from app.metrics import (
+    PASSWORD_AVG_WAIT_SECONDS, PASSWORD_CALLS, PASSWORD_IN_FLIGHT, PASSWORD_REJECTED, PASSWORD_WAITING
+)
+
+# Создаем контекст для хэширования паролей с использованием алгоритма bcrypt
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordService:
+    """
+    Асинхронное хэширование и проверка паролей bcrypt.
+
+    Вызовы выполняются в отдельном пуле из max_workers потоков, чтобы не
+    блокировать цикл событий. Одновременно выполняется не больше max_workers
+    операций, остальные ждут своей очереди; если ожидающих больше max_waiting,
+    запрос отклоняется с PasswordServiceBusyException.
+    """
+
+    def __init__(self, max_workers: int, max_waiting: int):
+        self.max_workers = max_workers
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    async def _run(self, func, *args):
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            PASSWORD_REJECTED.inc()
+            raise PasswordServiceBusyException
+        queued = time.perf_counter()
+        self.waiting += 1
+        PASSWORD_WAITING.inc()
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self.waiting -= 1
+            PASSWORD_WAITING.dec()
+        try:
+            started = time.perf_counter()
+            wait = started - queued
+            self.calls += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            self.in_flight += 1
+            PASSWORD_CALLS.inc()
+            PASSWORD_AVG_WAIT_SECONDS.set(self.wait_seconds / self.calls)
+            PASSWORD_IN_FLIGHT.inc()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            PASSWORD_IN_FLIGHT.dec()
+            self.run_seconds += time.perf_counter() - started
+            self._get_semaphore().release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    def snapshot(self) -> dict:
+        """
+        Метрики пула: очередь, выполняемые операции, время ожидания и выполнения.
+        """
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.wait_seconds / self.calls if self.calls else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_run_seconds": self.run_seconds / self.calls if self.calls else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_service = PasswordService(
+    max_workers=settings.PASSWORD_WORKERS,
+    max_waiting=settings.PASSWORD_MAX_WAITING
+)
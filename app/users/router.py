@@ -1,28 +1,26 @@
-import ipaddress
 from fastapi import APIRouter, Depends, Request, Response, HTTPException
-import geoip2.database
 from user_agents import parse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.exceptions import (
-    AddressNotFoundError,
     CompanyAlreadyExistsException,
     IncorrectEmailOrPasswordException,
     UserAlreadyExistsException
 )
 from app.users.auth import (
     authenticate_user,
-    create_access_token,
-    get_password_hash
+    create_access_token
 )
+from app.users.cache import invalidate_tokens
 from app.users.dao import CompanyDAO, UsersDAO, SessionsDAO
+from app.users.geoip import geoip_resolver
+from app.users.passwords import password_service
 from app.users.dependencies import get_current_user  # Получение текущего пользователя из токена
 from app.users.models import Users
 from app.users.schemas import SAdminRegister, SUserAuth, TokenResponse
-from app.db import async_session_maker  # Функция для создания AsyncSession
+from app.db import async_session_maker, run_after_commit  # Функция для создания AsyncSession
 
 router = APIRouter(prefix="/auth", tags=["Auth & Пользователи"])
-reader = geoip2.database.Reader('/auto_app/service/GeoLite2-City.mmdb')
 
 
 @router.post("/register")
@@ -61,7 +59,7 @@ async def register_admin(user_data: SAdminRegister) -> dict:
                 raise UserAlreadyExistsException
 
             # Хэшируем пароль и создаем нового администратора
-            hashed_password = get_password_hash(user_data.password)
+            hashed_password = await password_service.hash(user_data.password)
             await UsersDAO.add(
                 session,
                 name=user_data.name,
@@ -113,23 +111,12 @@ async def login_user(
             else:
                 device_type = "desktop"
             name_device = user_agent.device.model if user_agent.device else "unknown"
-            client_ip = request.client.host
-            try:
-                ip = ipaddress.ip_address(client_ip)
-                if ip.is_private or ip.is_loopback or ip.is_reserved:
-                    city = "unknown"
-                else:
-                    try:
-                        geo = reader.city(client_ip)
-                        city = geo.city.name
-                    except AddressNotFoundError:
-                        city = "unknown"
-            except ValueError:
-                city = "unknown"
+            city = await geoip_resolver.city(request.client.host)
             # Если для данного устройства уже существует сессия, удаляем её
             existing_session = await SessionsDAO.find_one_or_none(session, user_id=user.id, device=device_type)
             if existing_session:
                 await SessionsDAO.delete_(session, model_id=existing_session.id)
+                await invalidate_tokens([existing_session.jwt_token], session)
 
             # Создаем новый токен доступа
             access_token = create_access_token({"sub": str(user.id)})
@@ -142,10 +129,11 @@ async def login_user(
                 name_device=name_device,
                 city=city
             )
+        await run_after_commit(session)
 
-            # Устанавливаем токен в cookie с параметром httponly
-            response.set_cookie("access_token", access_token, httponly=True)
-            return TokenResponse(access_token=access_token)
+        # Устанавливаем токен в cookie с параметром httponly
+        response.set_cookie("access_token", access_token, httponly=True)
+        return TokenResponse(access_token=access_token)
 
 
 @router.post("/logout")
@@ -182,6 +170,8 @@ async def logout_user(
             existing_session = await SessionsDAO.find_one_or_none(session, user_id=user.id, device=device_type)
             if existing_session:
                 await SessionsDAO.delete_(session, model_id=existing_session.id)
+                await invalidate_tokens([existing_session.jwt_token], session)
+        await run_after_commit(session)
 
-            # Удаляем cookie с access_token
-            response.delete_cookie("access_token")
+        # Удаляем cookie с access_token
+        response.delete_cookie("access_token")
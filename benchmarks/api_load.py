@@ -0,0 +1,473 @@
+"""
+Нагрузочный прогон API в одном процессе.
+
+    python -m benchmarks.api_load [--companies 2] [--users 2] [--projects 3] [--kinds hip l-shape]
+                                  [--roof-lines 30] [--concurrency 8] [--requests 400]
+                                  [--mix get_project=4,add_sizes=2] [--fake-redis] [--keep] [--out FILE]
+
+Синтетические компании, пользователи и проекты с планами крыш из benchmarks.roofs
+создаются через DAO, скаты строятся запросом add_slope. Затем приложение (main.app,
+со своим lifespan) вызывается напрямую как ASGI-приложение заданным числом
+параллельных клиентов. По каждой операции считаются p50/p95/p99, пропускная
+способность, число SQL-запросов и время в БД на запрос (по данным QueryStatsMiddleware).
+
+Нужен локальный Postgres (переменные DB_* из окружения, таблицы создает lifespan).
+Redis — локальный (REDIS_HOST) или fakeredis (--fake-redis, пакет fakeredis).
+Созданные данные удаляются после прогона, если не указан --keep.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.base.dao import RoofsDAO
+from app.db import async_session_maker
+from app.projects.dao import LinesDAO, PointsDAO, ProjectsDAO
+from app.users.auth import create_access_token
+from app.users.dao import CompanyDAO, SessionsDAO, UsersDAO
+from benchmarks.common import RESULTS_DIR, base_metadata, percentile, save_report
+from benchmarks.roofs import ROOF_KIND_NAMES, make_roof
+
+# Веса операций по умолчанию: чтения преобладают, как в работе редактора
+DEFAULT_MIX = {
+    'get_projects': 1,
+    'get_project': 4,
+    'get_lines': 2,
+    'get_estimate': 3,
+    'add_sizes': 2,
+    'add_slope': 1,
+}
+
+
+# -------------------- ASGI-клиент --------------------
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    state: dict = field(default_factory=dict)
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    """
+    Минимальный HTTP-клиент, вызывающий ASGI-приложение в текущем процессе (без сети).
+    """
+
+    def __init__(self, app, headers: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.headers = headers or {}
+
+    async def request(self, method: str, path: str, json_body=None, headers: Optional[Dict[str, str]] = None) -> Response:
+        body = json.dumps(json_body).encode() if json_body is not None else b''
+        request_headers = {'host': 'loadtest', 'content-type': 'application/json', **self.headers, **(headers or {})}
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(k.lower().encode(), v.encode()) for k, v in request_headers.items()],
+            'client': ('127.0.0.1', 0),
+            'server': ('loadtest', 80),
+            'state': {},
+        }
+        sent = False
+        finished = asyncio.Event()
+        status, response_headers, chunks = 500, {}, []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status, response_headers
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                response_headers = {k.decode(): v.decode() for k, v in message.get('headers', [])}
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    finished.set()
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # ServerErrorMiddleware уже отправил 500 и пробросил исключение дальше
+            status = 500
+        finally:
+            finished.set()
+        return Response(status=status, headers=response_headers, body=b''.join(chunks), state=scope['state'])
+
+
+# -------------------- Данные --------------------
+
+@dataclass
+class SeededProject:
+    id: uuid.UUID
+    user: 'SeededUser'
+    sizes: List[dict] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+@dataclass
+class SeededUser:
+    id: uuid.UUID
+    token: str
+    projects: List[SeededProject] = field(default_factory=list)
+
+
+@dataclass
+class Seed:
+    run_id: str
+    roof_id: uuid.UUID
+    company_ids: List[uuid.UUID]
+    users: List[SeededUser]
+
+    @property
+    def projects(self) -> List[SeededProject]:
+        return [project for user in self.users for project in user.projects]
+
+
+async def seed(companies: int, users: int, projects: int, kinds: List[str], roof_lines: int) -> Seed:
+    """
+    Создать компании, пользователей с сессиями и проекты с линиями плана одним блоком транзакции.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    async with async_session_maker() as session:
+        async with session.begin():
+            roof = await RoofsDAO.add(
+                session, name=f"load-{run_id}", type="metal", overall_width=1.19, useful_width=1.1,
+                overlap=0.35, max_length=8, len_wave=0.35, min_length=0.5, imp_sizes=[]
+            )
+            result = Seed(run_id=run_id, roof_id=roof['id'], company_ids=[], users=[])
+            for c in range(companies):
+                company = await CompanyDAO.add(
+                    session, name=f"Load {run_id} {c}", INN=f"{c:010d}", OGRN=f"{c:013d}"
+                )
+                result.company_ids.append(company['id'])
+                for u in range(users):
+                    login = f"load-{run_id}-{c}-{u}"
+                    user = await UsersDAO.add(
+                        session, name=login, email=f"{login}@load.test", login=login,
+                        hashed_password="!", is_admin=False, company_id=company['id']
+                    )
+                    token = create_access_token({"sub": str(user['id'])})
+                    await SessionsDAO.add(
+                        session, jwt_token=token, device="load-test", name_device="load-test",
+                        city="local", user_id=user['id']
+                    )
+                    seeded_user = SeededUser(id=user['id'], token=token)
+                    for p in range(projects):
+                        kind = kinds[(c + u + p) % len(kinds)]
+                        project = await ProjectsDAO.add(
+                            session, name=f"{kind} {p}", address="load test",
+                            roof_id=roof['id'], user_id=user['id']
+                        )
+                        await _add_plan(session, project['id'], kind, roof_lines)
+                        seeded_user.projects.append(SeededProject(id=project['id'], user=seeded_user))
+                    result.users.append(seeded_user)
+    return result
+
+
+async def _add_plan(session, project_id, kind: str, roof_lines: int) -> None:
+    case = make_roof(kind, roof_lines)
+    point_ids = {}
+    point_rows, line_rows = [], []
+    for line in case.lines:
+        for point in (line.start, line.end):
+            if point.id not in point_ids:
+                point_ids[point.id] = uuid.uuid4()
+                point_rows.append({'id': point_ids[point.id], 'x': point.x, 'y': point.y, 'project_id': project_id})
+        line_rows.append({
+            'id': uuid.uuid4(),
+            'name': line.name,
+            'type': line.type,
+            'length': round(math.dist((line.start.x, line.start.y), (line.end.x, line.end.y)), 3),
+            'is_perimeter': line.type in ('карниз', 'фронтон'),
+            'start_id': point_ids[line.start_id],
+            'end_id': point_ids[line.end_id],
+            'project_id': project_id,
+        })
+    await PointsDAO.add_many(session, point_rows)
+    await LinesDAO.add_many(session, line_rows)
+
+
+async def cleanup(data: Seed) -> None:
+    """
+    Удалить созданные данные: компании (каскадом пользователи, сессии, проекты) и покрытие.
+    """
+    async with async_session_maker() as session:
+        async with session.begin():
+            for company_id in data.company_ids:
+                await CompanyDAO.delete_(session, model_id=company_id)
+            await RoofsDAO.delete_(session, model_id=data.roof_id)
+
+
+def sizes_payload(project: dict) -> List[dict]:
+    """
+    Запросы add_sizes для каждого ската: текущие длины линий и измерений
+    (решатель проходит весь путь, геометрия сохраняется).
+    """
+    payloads = []
+    for slope in project.get('slopes') or []:
+        lines = [
+            {'id': line['id'], 'length': round(math.dist(
+                (line['start']['x'], line['start']['y']), (line['end']['x'], line['end']['y'])
+            ), 3)}
+            for line in slope.get('lines') or []
+        ]
+        lengths = [
+            {'id': length['id'], 'length': round(abs(length['end']['y'] - length['start']['y']), 2)}
+            for length in slope.get('length_line') or []
+        ]
+        payloads.append({'slope_id': slope['id'], 'body': {'lines': lines, 'length_line': lengths}})
+    return payloads
+
+
+# -------------------- Нагрузка --------------------
+
+@dataclass
+class Sample:
+    operation: str
+    status: int
+    seconds: float
+    queries: int
+    db_seconds: float
+
+
+async def timed(client: ASGIClient, operation: str, method: str, path: str, token: str, json_body=None) -> Sample:
+    started = time.perf_counter()
+    response = await client.request(method, path, json_body, headers={'Authorization': f"Bearer {token}"})
+    seconds = time.perf_counter() - started
+    # Запросы к БД считает QueryStatsMiddleware приложения (request.state.db_queries)
+    queries = response.state.get('db_queries')
+    return Sample(
+        operation, response.status, seconds,
+        queries.count if queries is not None else 0,
+        queries.seconds if queries is not None else 0.0
+    )
+
+
+async def prepare_projects(client: ASGIClient, data: Seed) -> None:
+    """
+    Построить скаты всех проектов (add_slope) и запомнить запросы add_sizes.
+    """
+    for project in data.projects:
+        path = f"/roofs/projects/{project.id}"
+        headers = {'Authorization': f"Bearer {project.user.token}"}
+        response = await client.request('POST', f"{path}/slopes", headers=headers)
+        if response.status >= 400:
+            raise RuntimeError(f"add_slope failed for {project.id}: {response.status} {response.body[:200]!r}")
+        response = await client.request('GET', path, headers=headers)
+        project.sizes = sizes_payload(response.json())
+
+
+async def operation(client: ASGIClient, name: str, project: SeededProject, rng: random.Random) -> List[Sample]:
+    token = project.user.token
+    path = f"/roofs/projects/{project.id}"
+    if name == 'get_projects':
+        return [await timed(client, name, 'GET', "/roofs/projects", token)]
+    if name == 'get_project':
+        return [await timed(client, name, 'GET', path, token)]
+    if name == 'get_lines':
+        return [await timed(client, name, 'GET', f"{path}/get_lines", token)]
+    if name == 'get_estimate':
+        return [await timed(client, name, 'GET', f"{path}/estimate", token)]
+    # Изменения одного проекта не пересекаются, как у одного пользователя в редакторе
+    async with project.lock:
+        if name == 'add_sizes':
+            if not project.sizes:
+                return []
+            payload = rng.choice(project.sizes)
+            return [await timed(
+                client, name, 'PATCH', f"{path}/slopes/{payload['slope_id']}/add_sizes", token, payload['body']
+            )]
+        if name == 'add_slope':
+            samples = [
+                await timed(client, 'delete_slope', 'DELETE', f"{path}/slopes", token),
+                await timed(client, name, 'POST', f"{path}/slopes", token),
+            ]
+            response = await client.request('GET', path, headers={'Authorization': f"Bearer {token}"})
+            project.sizes = sizes_payload(response.json())
+            return samples
+    raise ValueError(f"Unknown operation: {name}")
+
+
+async def drive(client: ASGIClient, data: Seed, mix: Dict[str, int], requests: int, concurrency: int,
+                rng_seed: int = 0) -> tuple:
+    """
+    Выполнить requests операций concurrency параллельными клиентами.
+
+    :return: (замеры, длительность прогона в секундах).
+    """
+    names, weights = list(mix), list(mix.values())
+    projects = data.projects
+    remaining = requests
+    samples: List[Sample] = []
+
+    async def worker(index: int):
+        nonlocal remaining
+        rng = random.Random(rng_seed * 1000 + index)
+        while remaining > 0:
+            remaining -= 1
+            name = rng.choices(names, weights)[0]
+            samples.extend(await operation(client, name, rng.choice(projects), rng))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, dict]:
+    by_operation: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_operation.setdefault(sample.operation, []).append(sample)
+    summary = {}
+    for name, group in sorted(by_operation.items()):
+        latencies = sorted(s.seconds for s in group)
+        queries = [s.queries for s in group]
+        db_seconds = [s.db_seconds for s in group]
+        summary[name] = {
+            'requests': len(group),
+            'errors': sum(1 for s in group if s.status >= 400),
+            'throughput': len(group) / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': statistics.fmean(latencies),
+            'max': latencies[-1],
+            'queries_mean': statistics.fmean(queries),
+            'queries_max': max(queries),
+            'db_mean': statistics.fmean(db_seconds),
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, dict], elapsed: float, log=print) -> None:
+    log(
+        f"{'operation':<14} {'req':>6} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'queries':>8} {'db ms':>8}"
+    )
+    for name, s in summary.items():
+        log(
+            f"{name:<14} {s['requests']:>6} {s['errors']:>5} {s['throughput']:>8.1f} {s['p50'] * 1000:>9.1f} "
+            f"{s['p95'] * 1000:>9.1f} {s['p99'] * 1000:>9.1f} {s['queries_mean']:>8.1f} {s['db_mean'] * 1000:>8.1f}"
+        )
+    total = sum(s['requests'] for s in summary.values())
+    log(f"{total} requests in {elapsed:.2f} s, {total / elapsed if elapsed else 0:.1f} req/s")
+
+
+def use_fake_redis(app) -> None:
+    """
+    Подменить Redis приложения на fakeredis (после старта lifespan).
+    """
+    try:
+        from fakeredis import aioredis as fake_aioredis
+    except ImportError:
+        raise SystemExit("--fake-redis requires the fakeredis package")
+    from fastapi_cache import FastAPICache
+    from fastapi_cache.backends.redis import RedisBackend
+
+    from app.config import settings
+    from app.projects.cache import layout_cache
+    from app.projects.exports import RedisJobStore, export_service
+    from app.projects.plans import plan_cache
+    from app.users.cache import auth_cache
+
+    redis = fake_aioredis.FakeRedis(decode_responses=True)
+    app.state.redis = redis
+    layout_cache.redis = redis
+    plan_cache.redis = redis
+    export_service.store = RedisJobStore(redis, ttl=settings.EXPORT_TTL)
+    auth_cache.redis = redis
+    FastAPICache.init(RedisBackend(redis), prefix="cache")
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def main_async(args) -> dict:
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        if args.fake_redis:
+            use_fake_redis(app)
+        data = await seed(args.companies, args.users, args.projects, args.kinds, args.roof_lines)
+        try:
+            client = ASGIClient(app)
+            await prepare_projects(client, data)
+            samples, elapsed = await drive(client, data, args.mix, args.requests, args.concurrency, args.seed)
+        finally:
+            if not args.keep:
+                await cleanup(data)
+    summary = summarize(samples, elapsed)
+    print_summary(summary, elapsed)
+    return {
+        'meta': {
+            **base_metadata(),
+            'companies': args.companies,
+            'users': args.users,
+            'projects': args.projects,
+            'kinds': args.kinds,
+            'roof_lines': args.roof_lines,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'mix': args.mix,
+            'redis': 'fakeredis' if args.fake_redis else 'redis',
+            'elapsed': elapsed,
+        },
+        'results': summary,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="In-process API load test")
+    parser.add_argument('--companies', type=int, default=2)
+    parser.add_argument('--users', type=int, default=2, help="users per company")
+    parser.add_argument('--projects', type=int, default=3, help="projects per user")
+    parser.add_argument('--kinds', nargs='+', choices=ROOF_KIND_NAMES, default=['gable', 'hip', 'l-shape', 'multi-valley'])
+    parser.add_argument('--roof-lines', type=int, default=30, help="target line count of each roof plan")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help="operations in total")
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX), help="e.g. get_project=4,add_sizes=1")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the operation sequence")
+    parser.add_argument('--fake-redis', action='store_true')
+    parser.add_argument('--keep', action='store_true', help="keep seeded rows after the run")
+    parser.add_argument('--out', type=Path, help="results file (default: benchmarks/results/api-<commit>.json)")
+    args = parser.parse_args(argv)
+    report = asyncio.run(main_async(args))
+    out = args.out or RESULTS_DIR / f"api-{report['meta']['commit']}.json"
+    print(f"saved {save_report(report, out)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Микро-бенчмарки геометрии скатов.
+
+    python -m benchmarks.geometry run [--kinds gable hip ...] [--sizes 4 50 200] [--repeat 5] [--out FILE]
+                                     [--baseline FILE] [--threshold 1.25]
+    python -m benchmarks.geometry compare BASE.json NEW.json [--threshold 1.25]
+
+Для каждой сгенерированной крыши (benchmarks.roofs) замеряются этапы обработки
+в том же порядке, что и в роутере: поиск скатов, поворот, фигура, раскладка
+листов, сдвиг листов и измерительные линии. Результат сохраняется в JSON,
+ключ результата — "<крыша>/<этап>", поэтому файлы разных коммитов сравниваются
+напрямую. compare и run --baseline завершаются с кодом 1, если какой-то этап
+стал медленнее порога.
+
+Модули приложения читают настройки из окружения, поэтому переменные из .env
+должны быть заданы (БД и Redis не нужны).
+"""
+import argparse
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import shapely
+
+from app.projects.executor import RoofParams, geo_lines, slope_is_left
+from app.projects.layout import create_sheets_strips
+from app.projects.rotate import LINE_TYPES, rotate_slope, transform_roof
+from app.projects.slope import (GraphBuilder, create_figure, create_sheets, find_slope, generate_slopes_length,
+                                sheet_offset)
+from benchmarks.common import RESULTS_DIR, base_metadata, format_time, load_report, save_report
+from benchmarks.roofs import ROOF_KIND_NAMES, RoofCase, make_roof, place_cutouts
+
+ROOF = RoofParams(overall_width=1.19, useful_width=1.1, max_length=8, min_length=0.5, overlap=0.35, imp_sizes=[])
+OVERHANG = 0.3
+
+# Перебор всех простых циклов экспоненциален на многопролетных планах
+CYCLES_MAX_LINES = 40
+
+
+@dataclass
+class PreparedSlope:
+    lines: list
+    points: list
+    segments: Dict[str, np.ndarray]
+    cutouts: list
+    figure: object
+    is_left: bool
+    sheets: list
+    y_levels: list
+
+
+def prepare_slopes(case: RoofCase) -> List[PreparedSlope]:
+    """
+    Скаты крыши, доведенные до входных данных каждого этапа (вне замеров).
+    """
+    by_id = {line.id: line for line in case.lines}
+    prepared = []
+    for ids in find_slope(case.lines):
+        lines = geo_lines([by_id[line_id] for line_id in ids])
+        segments = {t: [] for t in LINE_TYPES}
+        for line in lines:
+            if line.type in segments:
+                segments[line.type].append([(line.start.x, line.start.y), (line.end.x, line.end.y)])
+        segments = {t: np.array(s, dtype=float).reshape(-1, 2, 2) for t, s in segments.items()}
+        rotate_slope(lines)
+        points = {}
+        for line in lines:
+            points[line.start_id] = line.start
+            points[line.end_id] = line.end
+        cutouts = place_cutouts(create_figure(lines, []), case.cutouts_per_slope)
+        figure = create_figure(lines, cutouts)
+        is_left = slope_is_left(lines)
+        y_levels = []
+        y_min, y_max = figure.bounds[1], figure.bounds[3]
+        y_level = y_min - OVERHANG
+        while y_level <= y_max:
+            y_levels.append(y_level)
+            y_level += ROOF.overlap
+        prepared.append(PreparedSlope(
+            lines=lines,
+            points=list(points.values()),
+            segments=segments,
+            cutouts=cutouts,
+            figure=figure,
+            is_left=is_left,
+            sheets=create_sheets(figure, ROOF, is_left, OVERHANG),
+            y_levels=y_levels
+        ))
+    return prepared
+
+
+def stages(case: RoofCase, slopes: List[PreparedSlope]) -> Dict[str, Optional[Callable[[], object]]]:
+    """
+    Этапы для замера: функция без аргументов или None, если этап пропускается.
+    """
+    point_coords = {}
+    for line in case.lines:
+        point_coords[line.start_id] = (line.start.x, line.start.y)
+        point_coords[line.end_id] = (line.end.x, line.end.y)
+
+    def find_cycles():
+        return GraphBuilder(case.lines, point_coords).find_minimal_cycles_by_geometry()
+
+    def offset_all():
+        for slope in slopes:
+            for x, y, length, *_ in slope.sheets:
+                sheet_offset(x, round(y - ROOF.overlap, 3), length, slope.figure, ROOF, slope.y_levels, OVERHANG)
+
+    return {
+        'find_slope': lambda: find_slope(case.lines),
+        'find_minimal_cycles_by_geometry': find_cycles if case.size <= CYCLES_MAX_LINES else None,
+        'transform_roof': lambda: [transform_roof(s.segments) for s in slopes],
+        'create_figure': lambda: [create_figure(s.lines, s.cutouts) for s in slopes],
+        'create_sheets': lambda: [create_sheets(s.figure, ROOF, s.is_left, OVERHANG) for s in slopes],
+        'create_sheets_strips': lambda: [create_sheets_strips(s.figure, ROOF, s.is_left, OVERHANG) for s in slopes],
+        'sheet_offset': offset_all,
+        'generate_slopes_length': lambda: [generate_slopes_length(s.lines, s.points) for s in slopes],
+    }
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """
+    Время одного вызова: число вызовов в замере подбирается так, чтобы замер
+    длился не меньше min_time, затем делается repeat замеров.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 >= min_time else 10
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def run(kinds, sizes, repeat: int = 5, min_time: float = 0.05, log=print) -> dict:
+    results = {}
+    for kind in kinds:
+        for target in sizes:
+            case = make_roof(kind, target)
+            slopes = prepare_slopes(case)
+            info = {
+                'kind': kind,
+                'lines': case.size,
+                'slopes': len(slopes),
+                'sheets': sum(len(s.sheets) for s in slopes),
+            }
+            for stage, func in stages(case, slopes).items():
+                key = f"{case.name}/{stage}"
+                if key in results:
+                    continue
+                if func is None:
+                    results[key] = {**info, 'stage': stage, 'skipped': f"more than {CYCLES_MAX_LINES} lines"}
+                    continue
+                results[key] = {**info, 'stage': stage, **measure(func, repeat, min_time)}
+                log(f"{key:<60} {format_time(results[key]['median']):>10}")
+    return {'meta': metadata(repeat, min_time), 'results': results}
+
+
+def metadata(repeat: int, min_time: float) -> dict:
+    return {
+        **base_metadata(),
+        'numpy': np.__version__,
+        'shapely': shapely.__version__,
+        'repeat': repeat,
+        'min_time': min_time,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float = 1.25) -> List[dict]:
+    """
+    Сравнить медианы общих замеров.
+
+    :return: строки {key, base, new, ratio, status}; status — 'slower', 'faster' или 'same'.
+    """
+    rows = []
+    for key, result in new['results'].items():
+        old = base['results'].get(key)
+        if old is None or 'median' not in old or 'median' not in result:
+            continue
+        ratio = result['median'] / old['median'] if old['median'] else float('inf')
+        if ratio > threshold:
+            status = 'slower'
+        elif ratio < 1 / threshold:
+            status = 'faster'
+        else:
+            status = 'same'
+        rows.append({'key': key, 'base': old['median'], 'new': result['median'], 'ratio': ratio, 'status': status})
+    return rows
+
+
+def print_comparison(base: dict, new: dict, rows: List[dict], log=print) -> int:
+    log(f"base {base['meta'].get('commit')} -> new {new['meta'].get('commit')}")
+    for row in rows:
+        mark = {'slower': '!!', 'faster': '++'}.get(row['status'], '')
+        log(
+            f"{row['key']:<60} {format_time(row['base']):>10} {format_time(row['new']):>10} "
+            f"{row['ratio']:>6.2f}x {mark}"
+        )
+    regressions = [row for row in rows if row['status'] == 'slower']
+    log(f"{len(rows)} compared, {len(regressions)} slower")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Slope geometry micro-benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run benchmarks and save JSON results")
+    run_parser.add_argument('--kinds', nargs='+', choices=ROOF_KIND_NAMES, default=list(ROOF_KIND_NAMES))
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=[4, 50, 200], help="target line counts")
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--min-time', type=float, default=0.05, help="minimal duration of one sample, s")
+    run_parser.add_argument('--out', type=Path, help="results file (default: benchmarks/results/<commit>.json)")
+    run_parser.add_argument('--baseline', type=Path, help="compare with earlier results")
+    run_parser.add_argument('--threshold', type=float, default=1.25)
+    compare_parser = commands.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('base', type=Path)
+    compare_parser.add_argument('new', type=Path)
+    compare_parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        base, new = load_report(args.base), load_report(args.new)
+        return print_comparison(base, new, compare(base, new, args.threshold))
+
+    report = run(args.kinds, args.sizes, repeat=args.repeat, min_time=args.min_time)
+    out = args.out or RESULTS_DIR / f"geometry-{report['meta']['commit']}.json"
+    print(f"saved {save_report(report, out)}")
+    if args.baseline:
+        base = load_report(args.baseline)
+        return print_comparison(base, report, compare(base, report, args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Параметрический генератор планов крыш для бенчмарков геометрии.
+
+План — список линий GeoLine с типами, как у линий проекта. Скаты находятся
+обычным find_slope, вырезы задаются уже в координатах повернутого ската.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+from app.projects.executor import GeoLine, GeoPoint
+
+EAVE, GABLE, VALLEY, RIDGE = 'карниз', 'фронтон', 'ендова', 'конёк'
+
+
+@dataclass
+class RoofCase:
+    kind: str
+    n: int
+    lines: List[GeoLine]
+    slopes: int
+    cutouts_per_slope: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.kind}-{self.size}"
+
+    @property
+    def size(self) -> int:
+        """
+        Число линий плана вместе с ребрами вырезов.
+        """
+        return len(self.lines) + 4 * self.cutouts_per_slope * self.slopes
+
+
+@dataclass
+class PlanBuilder:
+    """
+    Собирает линии плана; точки с одинаковыми координатами переиспользуются.
+    """
+    points: Dict[Tuple[float, float], GeoPoint] = field(default_factory=dict)
+    lines: List[GeoLine] = field(default_factory=list)
+
+    def point(self, x: float, y: float) -> GeoPoint:
+        key = (round(x, 6), round(y, 6))
+        if key not in self.points:
+            self.points[key] = GeoPoint(id=f"p{len(self.points)}", x=key[0], y=key[1])
+        return self.points[key]
+
+    def line(self, start, end, line_type: str, parts: int = 1) -> None:
+        """
+        Отрезок start-end, разбитый на parts равных линий (точки на карнизе, как в реальных планах).
+        """
+        (x0, y0), (x1, y1) = start, end
+        for i in range(parts):
+            a = self.point(x0 + (x1 - x0) * i / parts, y0 + (y1 - y0) * i / parts)
+            b = self.point(x0 + (x1 - x0) * (i + 1) / parts, y0 + (y1 - y0) * (i + 1) / parts)
+            self.lines.append(GeoLine(
+                id=f"l{len(self.lines)}", start_id=a.id, end_id=b.id, start=a, end=b,
+                type=line_type, name=f"L{len(self.lines)}"
+            ))
+
+
+def gable(n: int) -> Tuple[List[GeoLine], int]:
+    """
+    Двускатная крыша 12x8, карнизы разбиты на n линий.
+    """
+    w, d = 12.0, 8.0
+    plan = PlanBuilder()
+    plan.line((0, 0), (w, 0), EAVE, n)
+    plan.line((w, d), (0, d), EAVE, n)
+    plan.line((w, 0), (w, d / 2), GABLE)
+    plan.line((w, d / 2), (w, d), GABLE)
+    plan.line((0, d), (0, d / 2), GABLE)
+    plan.line((0, d / 2), (0, 0), GABLE)
+    plan.line((0, d / 2), (w, d / 2), RIDGE)
+    return plan.lines, 2
+
+
+def hip(n: int) -> Tuple[List[GeoLine], int]:
+    """
+    Вальмовая крыша 14x8: два трапециевидных ската и две вальмы, длинные карнизы разбиты на n линий.
+    """
+    w, d = 14.0, 8.0
+    plan = PlanBuilder()
+    plan.line((0, 0), (w, 0), EAVE, n)
+    plan.line((w, 0), (w, d), EAVE)
+    plan.line((w, d), (0, d), EAVE, n)
+    plan.line((0, d), (0, 0), EAVE)
+    left, right = (d / 2, d / 2), (w - d / 2, d / 2)
+    plan.line(left, right, RIDGE)
+    plan.line((0, 0), left, RIDGE)
+    plan.line((0, d), left, RIDGE)
+    plan.line((w, 0), right, RIDGE)
+    plan.line((w, d), right, RIDGE)
+    return plan.lines, 4
+
+
+def l_shape(n: int) -> Tuple[List[GeoLine], int]:
+    """
+    Г-образная крыша из двух двускатных крыльев глубиной 6 с ендовой во внутреннем углу.
+    Карнизы разбиты на n линий.
+    """
+    w, h, d = 16.0, 14.0, 6.0
+    plan = PlanBuilder()
+    joint = (w - d / 2, d / 2)
+    plan.line((0, 0), (w, 0), EAVE, n)
+    plan.line((w, 0), (w, h), EAVE, n)
+    plan.line((w, h), (w - d / 2, h), GABLE)
+    plan.line((w - d / 2, h), (w - d, h), GABLE)
+    plan.line((w - d, h), (w - d, d), EAVE, n)
+    plan.line((w - d, d), (0, d), EAVE, n)
+    plan.line((0, d), (0, d / 2), GABLE)
+    plan.line((0, d / 2), (0, 0), GABLE)
+    plan.line((0, d / 2), joint, RIDGE)
+    plan.line(joint, (w - d / 2, h), RIDGE)
+    plan.line((w, 0), joint, RIDGE)
+    plan.line((w - d, d), joint, VALLEY)
+    return plan.lines, 4
+
+
+def multi_valley(n: int) -> Tuple[List[GeoLine], int]:
+    """
+    n параллельных двускатных пролетов шириной 6 с ендовами между ними (пилообразная крыша).
+    """
+    w, d = 6.0, 10.0
+    plan = PlanBuilder()
+    for i in range(2 * n):
+        x0, x1 = i * w / 2, (i + 1) * w / 2
+        plan.line((x0, 0), (x1, 0), GABLE)
+        plan.line((x1, d), (x0, d), GABLE)
+    for i in range(2 * n + 1):
+        x = i * w / 2
+        if i in (0, 2 * n):
+            line_type = EAVE
+        else:
+            line_type = RIDGE if i % 2 else VALLEY
+        plan.line((x, 0), (x, d), line_type)
+    return plan.lines, 2 * n
+
+
+def stepped(n: int) -> Tuple[List[GeoLine], int]:
+    """
+    Односкатная крыша с примыканием лестницей из n ступеней (много уровней для измерительных линий).
+    """
+    plan = PlanBuilder()
+    x = 2.0 * n
+    plan.line((0, 0), (x, 0), EAVE)
+    for step in range(n):
+        plan.line((x, step), (x, step + 1), 'примыкание')
+        plan.line((x, step + 1), (x - 2, step + 1), 'примыкание')
+        x -= 2
+    plan.line((0, n), (0, 0), GABLE)
+    return plan.lines, 1
+
+
+ROOF_KINDS: Dict[str, Callable[[int], Tuple[List[GeoLine], int]]] = {
+    'gable': gable,
+    'hip': hip,
+    'l-shape': l_shape,
+    'multi-valley': multi_valley,
+    'stepped': stepped,
+}
+
+
+def make_roof(kind: str, target_lines: int) -> RoofCase:
+    """
+    Наименьшая крыша вида kind, в которой не меньше target_lines линий.
+
+    Вид 'cutout-heavy' — вальмовая крыша, у каждого ската которой вырезы
+    добавляются до нужного числа ребер.
+    """
+    if kind == 'cutout-heavy':
+        lines, slopes = hip(1)
+        cutouts = max(0, -(-(target_lines - len(lines)) // (4 * slopes)))
+        return RoofCase(kind=kind, n=cutouts, lines=lines, slopes=slopes, cutouts_per_slope=cutouts)
+    make = ROOF_KINDS[kind]
+    n = 1
+    lines, slopes = make(n)
+    while len(lines) < target_lines:
+        n += 1
+        lines, slopes = make(n)
+    return RoofCase(kind=kind, n=n, lines=lines, slopes=slopes)
+
+
+def place_cutouts(figure, count: int, size: float = 0.4) -> List[List[Tuple[float, float]]]:
+    """
+    До count квадратных вырезов (дымоходы, окна) по сетке внутри фигуры ската.
+    """
+    if not count:
+        return []
+    from shapely.geometry import box
+
+    x_min, y_min, x_max, y_max = figure.bounds
+    cols = 1
+    while cols * cols < count * 4:
+        cols += 1
+    step_x, step_y = (x_max - x_min) / (cols + 1), (y_max - y_min) / (cols + 1)
+    shrunk = figure.buffer(-size)
+    cutouts = []
+    for i in range(1, cols + 1):
+        for j in range(1, cols + 1):
+            x, y = x_min + i * step_x, y_min + j * step_y
+            hole = box(x, y, x + min(size, step_x / 2), y + min(size, step_y / 2))
+            if shrunk.contains(hole):
+                cutouts.append(list(hole.exterior.coords)[:-1])
+                if len(cutouts) == count:
+                    return cutouts
+    return cutouts
+
+
+ROOF_KIND_NAMES = (*ROOF_KINDS, 'cutout-heavy')
@@ -1,4 +1,10 @@
 #!/bin/bash
 
+# Файлы метрик воркеров от прошлого запуска: pid могут повториться, а счетчики — задвоиться
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo "Starting application..."
-uvicorn main:app --host 0.0.0.0 --port 8001 --workers 4
\ No newline at end of file
+uvicorn main:app --host 0.0.0.0 --port 8001 --workers 4
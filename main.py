@@ -6,15 +6,26 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi_cache.backends.redis import RedisBackend
 from fastapi_cache import FastAPICache
 
-# from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_fastapi_instrumentator import Instrumentator
 
 from redis import asyncio as aioredis
 
-from app.db import delete_tables, create_tables
+from app.db import delete_tables, create_tables, engine
+from app.db_stats import QueryStatsMiddleware
+from app.logging import setup as setup_logging
+from app.metrics import mark_process_dead
+from app.users.cache import auth_cache
+from app.users.geoip import geoip_resolver
+from app.users.passwords import password_service
 from app.users.router import router as user_router
 from app.users.payment_router import router as payment_router
 from app.users.account_router import router as account_router
 from app.projects.router import router as roof_router
+from app.projects.export_router import router as export_router
+from app.projects.exports import RedisJobStore, export_service
+from app.projects.cache import layout_cache
+from app.projects.plans import plan_cache
+from app.projects.executor import geometry_executor
 from app.base.router import router as base_router
 
 from app.config import settings
@@ -22,6 +33,7 @@ from app.config import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await setup_logging()
     await create_tables()
 
     try:
@@ -31,6 +43,10 @@ async def lifespan(app: FastAPI):
             decode_responses=True
         )
         app.state.redis = redis
+        layout_cache.redis = redis
+        plan_cache.redis = redis
+        export_service.store = RedisJobStore(redis, ttl=settings.EXPORT_TTL)
+        auth_cache.redis = redis
         FastAPICache.init(RedisBackend(redis), prefix="cache")
     except Exception as e:
         print(f"Error initializing Redis: {e}")
@@ -38,14 +54,23 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    # Незавершенные выгрузки помечаются failed, пока Redis еще доступен
+    await export_service.shutdown()
+
     # Закрываем Redis соединение
     if app.state.redis:
         await app.state.redis.close()
 
+    geometry_executor.shutdown()
+    geoip_resolver.close()
+    password_service.shutdown()
+    mark_process_dead()
+
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(user_router)
 app.include_router(roof_router)
+app.include_router(export_router)
 app.include_router(base_router)
 app.include_router(account_router)
 app.include_router(payment_router)
@@ -63,14 +88,20 @@ app.add_middleware(
     allow_methods=["GET", "POST", "OPTIONS", "DELETE", "PATCH", "PUT"],
     allow_headers=["Content-Type", "Set-Cookie",
                    "Access-Control-Allow-Headers",
-                   "Access-Control-Allow-Origin", "Authorization"],
+                   "Access-Control-Allow-Origin", "Authorization", "If-None-Match"],
+    expose_headers=["X-DB-Queries", "X-DB-Time-Ms", "X-DB-Slowest-Ms", "ETag"],
 )
 
+app.add_middleware(QueryStatsMiddleware)
 
-# Подключаем эндпоинт для сбора метрик
-# instrumentator = Instrumentator(
-#     should_group_status_codes=False,
-#     excluded_handlers=[".*admin.*", "/metrics"]
-# )
 
-# instrumentator.instrument(app).expose(app)
+# Подключаем эндпоинт для сбора метрик: задержки HTTP по шаблону маршрута.
+# При заданном PROMETHEUS_MULTIPROC_DIR /metrics собирает значения всех воркеров
+# uvicorn через MultiProcessCollector; кэши, пул геометрии, пул паролей и пул
+# соединений БД пишут свои метрики сами (app.metrics)
+instrumentator = Instrumentator(
+    should_group_status_codes=False,
+    excluded_handlers=[".*admin.*", "/metrics"]
+)
+
+instrumentator.instrument(app).expose(app, include_in_schema=False)
@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+from fastapi import FastAPI, Request
+
+from benchmarks.api_load import (ASGIClient, Seed, SeededProject, SeededUser, drive, parse_mix, sizes_payload,
+                                 summarize)
+from benchmarks.common import percentile
+
+
+def stub_app():
+    app = FastAPI()
+    calls = []
+
+    @app.api_route("/roofs/projects{rest:path}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def any_route(rest: str, request: Request):
+        calls.append((request.method, rest, request.headers.get("authorization")))
+        if request.method == "PATCH":
+            return await request.json()
+        if rest.endswith("/estimate"):
+            return {"detail": "missing"}
+        return {"slopes": []}
+
+    app.state.calls = calls
+    return app
+
+
+@pytest.mark.asyncio
+async def test_asgi_client_round_trip():
+    client = ASGIClient(stub_app(), headers={"Authorization": "Bearer t"})
+    response = await client.request("PATCH", "/roofs/projects/1/slopes/2/add_sizes", {"lines": [1]})
+    assert response.status == 200
+    assert response.json() == {"lines": [1]}
+    assert response.headers["content-type"] == "application/json"
+    assert (await client.request("GET", "/unknown")).status == 404
+
+
+@pytest.mark.asyncio
+async def test_drive_runs_requested_operations():
+    app = stub_app()
+    user = SeededUser(id=uuid.uuid4(), token="token")
+    user.projects = [SeededProject(id=uuid.uuid4(), user=user) for _ in range(3)]
+    user.projects[0].sizes = [{"slope_id": "s", "body": {"lines": [], "length_line": []}}]
+    data = Seed(run_id="x", roof_id=uuid.uuid4(), company_ids=[], users=[user])
+    mix = {"get_project": 3, "get_estimate": 1, "add_slope": 1}
+    samples, elapsed = await drive(ASGIClient(app), data, mix, requests=40, concurrency=4)
+    summary = summarize(samples, elapsed)
+    # add_slope записывает и удаление, и добавление скатов
+    assert sum(s["requests"] for name, s in summary.items() if name != "delete_slope") == 40
+    assert summary["delete_slope"]["requests"] == summary["add_slope"]["requests"]
+    assert all(call[2] == "Bearer token" for call in app.state.calls)
+    assert summary["get_project"]["p50"] <= summary["get_project"]["p99"]
+
+
+def test_sizes_payload_uses_current_geometry():
+    project = {"slopes": [{
+        "id": "s1",
+        "lines": [{"id": "l1", "start": {"x": 0, "y": 0}, "end": {"x": 3, "y": 4}}],
+        "length_line": [{"id": "m1", "start": {"x": 0, "y": 0}, "end": {"x": 0, "y": 2.5}}],
+    }]}
+    assert sizes_payload(project) == [{
+        "slope_id": "s1",
+        "body": {"lines": [{"id": "l1", "length": 5.0}], "length_line": [{"id": "m1", "length": 2.5}]},
+    }]
+
+
+def test_parse_mix_and_percentile():
+    assert parse_mix("get_project=4,add_sizes") == {"get_project": 4, "add_sizes": 1}
+    with pytest.raises(Exception):
+        parse_mix("unknown=1")
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2], 95) == pytest.approx(1.95)
@@ -0,0 +1,164 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.users.auth import create_access_token
+from app.users.cache import auth_cache, cache_user, get_cached_user, invalidate_tokens
+from app.users import dependencies
+from app.users.dependencies import get_current_user
+from app.users.models import Users
+from tests.test_cache import DictRedis
+
+
+def make_user():
+    return Users(
+        id=uuid.uuid4(),
+        name="Иванов Иван",
+        email="ivanov@example.com",
+        login="iivanov1",
+        hashed_password="hash",
+        is_admin=True,
+        company_id=uuid.uuid4()
+    )
+
+
+@pytest.mark.asyncio
+async def test_cached_user_snapshot():
+    auth_cache.local.clear()
+    user = make_user()
+    token = create_access_token({"sub": str(user.id)})
+    await cache_user(token, user, uuid.uuid4())
+
+    cached = await get_cached_user(token, str(user.id))
+    assert cached.id == user.id
+    assert cached.company_id == user.company_id
+    assert cached.is_admin is True
+    assert cached.hashed_password is None
+    assert await get_cached_user(token, str(uuid.uuid4())) is None
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_cache_until_invalidated():
+    auth_cache.local.clear()
+    user = make_user()
+    token = create_access_token({"sub": str(user.id)})
+    await cache_user(token, user, uuid.uuid4())
+
+    # При попадании в кэш сессия БД не используется
+    current = await get_current_user(token=token, session=None)
+    assert current.id == user.id
+
+    await invalidate_tokens([token])
+    assert await get_cached_user(token, str(user.id)) is None
+
+
+class FakeSession:
+    """
+    Сессия без базы: транзакция фиксируется при выходе из begin(), если не было исключения.
+    """
+
+    def __init__(self):
+        self.info = {}
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def begin(self):
+        return self.Transaction(self)
+
+    class Transaction:
+        def __init__(self, session):
+            self.session = session
+
+        async def __aenter__(self):
+            return self.session
+
+        async def __aexit__(self, exc_type, *exc):
+            self.session.committed = exc_type is None
+            return False
+
+
+@pytest.mark.asyncio
+async def test_invalidation_waits_for_commit(monkeypatch):
+    auth_cache.local.clear()
+    user = make_user()
+    token = create_access_token({"sub": str(user.id)})
+    await cache_user(token, user, uuid.uuid4())
+    session = FakeSession()
+    monkeypatch.setattr(db, "async_session_maker", lambda: session)
+
+    dependency = db.get_session()
+    assert await dependency.__anext__() is session
+    await invalidate_tokens([token], session)
+    # До фиксации удаление сессии не видно другим запросам, кэш еще не сброшен
+    assert await get_cached_user(token, str(user.id)) is not None
+
+    with pytest.raises(StopAsyncIteration):
+        await dependency.__anext__()
+    assert session.committed
+    assert await get_cached_user(token, str(user.id)) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_is_dropped_on_rollback(monkeypatch):
+    auth_cache.local.clear()
+    user = make_user()
+    token = create_access_token({"sub": str(user.id)})
+    await cache_user(token, user, uuid.uuid4())
+    session = FakeSession()
+    monkeypatch.setattr(db, "async_session_maker", lambda: session)
+
+    dependency = db.get_session()
+    await dependency.__anext__()
+    await invalidate_tokens([token], session)
+    with pytest.raises(RuntimeError):
+        await dependency.athrow(RuntimeError("handler failed"))
+    assert not session.committed
+    assert await get_cached_user(token, str(user.id)) is not None
+
+
+@pytest.mark.asyncio
+async def test_request_started_before_revocation_does_not_recache(monkeypatch):
+    auth_cache.local.clear()
+    auth_cache.redis = DictRedis()
+    user = make_user()
+    token = create_access_token({"sub": str(user.id)})
+    session_read = asyncio.Event()
+    revoked = asyncio.Event()
+    lookups = []
+
+    async def find_user(session, user_id):
+        return user
+
+    async def find_session(session, jwt_token):
+        # Снимок транзакции чтения еще содержит сессию, удаленную параллельным logout
+        lookups.append(jwt_token)
+        session_read.set()
+        await revoked.wait()
+        return SimpleNamespace(id=uuid.uuid4())
+
+    monkeypatch.setattr(dependencies.UsersDAO, "find_by_id", find_user)
+    monkeypatch.setattr(dependencies.SessionsDAO, "find_one_or_none", find_session)
+    try:
+        resolving = asyncio.ensure_future(get_current_user(token=token, session=None))
+        await session_read.wait()
+        await invalidate_tokens([token])
+        revoked.set()
+        assert (await resolving).id == user.id
+
+        # Отозванный токен не вернулся в кэш ни локально, ни в Redis
+        assert await get_cached_user(token, str(user.id)) is None
+        auth_cache.local.clear()
+        assert await get_cached_user(token, str(user.id)) is None
+        await get_current_user(token=token, session=None)
+        assert len(lookups) == 2
+    finally:
+        auth_cache.redis = None
+        auth_cache.local.clear()
@@ -0,0 +1,31 @@
+import copy
+
+import pytest
+
+from app.projects.slope import find_slope
+from benchmarks.geometry import compare, prepare_slopes, run
+from benchmarks.roofs import ROOF_KIND_NAMES, make_roof
+
+
+@pytest.mark.parametrize("kind", ROOF_KIND_NAMES)
+@pytest.mark.parametrize("target", [4, 60])
+def test_generated_roofs_are_valid(kind, target):
+    case = make_roof(kind, target)
+    assert case.size >= target
+    assert len(find_slope(case.lines)) == case.slopes
+    slopes = prepare_slopes(case)
+    assert all(len(s.cutouts) == case.cutouts_per_slope for s in slopes)
+    assert all(s.figure.is_valid and s.figure.area > 0 for s in slopes)
+
+
+def test_run_and_compare():
+    report = run(["hip", "multi-valley"], [4], repeat=1, min_time=0, log=lambda *args: None)
+    results = report["results"]
+    assert results["hip-9/create_sheets"]["median"] > 0
+    assert set(results["hip-9/find_minimal_cycles_by_geometry"]) >= {"median", "number"}
+
+    slower = copy.deepcopy(report)
+    slower["results"]["hip-9/create_sheets"]["median"] *= 2
+    rows = {row["key"]: row["status"] for row in compare(report, slower, threshold=1.25)}
+    assert rows["hip-9/create_sheets"] == "slower"
+    assert rows["hip-9/find_slope"] == "same"
@@ -0,0 +1,83 @@
+import pytest
+
+from app.cache import LRUCache, TieredCache
+from app.projects.cache import cached_slope_layout, layout_cache, layout_key
+from app.projects.executor import RoofParams, slope_layout
+from tests.test_executor import CUTOUTS, ROOF, TRAPEZOID
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_lru_evicts_by_size():
+    cache = LRUCache(max_bytes=10)
+    cache.set("a", "1234")
+    cache.set("b", "1234")
+    cache.get("a")
+    cache.set("c", "1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1234"
+    assert cache.size == 8
+    cache.set("big", "x" * 11)
+    assert cache.get("big") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_uses_redis():
+    cache = TieredCache(prefix="test", max_bytes=1024, ttl=60)
+    cache.redis = DictRedis()
+    assert await cache.get("k") is None
+    await cache.set("k", [1.5, [[1, 2]]])
+    cache.local.clear()
+    assert await cache.get("k") == [1.5, [[1, 2]]]
+    assert await cache.get("k") == [1.5, [[1, 2]]]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["redis_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_add_keeps_existing_value():
+    cache = TieredCache(prefix="test", max_bytes=1024, ttl=60)
+    cache.redis = DictRedis()
+    assert await cache.add("k", 1)
+    assert not await cache.add("k", 2)
+    # Значение, записанное другим процессом, видно только в Redis
+    cache.local.clear()
+    assert not await cache.add("k", 3)
+    assert cache.local.get("k") is None
+    assert await cache.get("k") == 1
+
+
+def test_layout_key_depends_on_parameters():
+    key = layout_key(TRAPEZOID, CUTOUTS, ROOF, False, 0)
+    assert key == layout_key(TRAPEZOID, [list(c) for c in CUTOUTS], ROOF, False, 0)
+    assert key != layout_key(TRAPEZOID, CUTOUTS, ROOF, True, 0)
+    assert key != layout_key(TRAPEZOID, CUTOUTS, ROOF, False, 0.3)
+    assert key != layout_key(TRAPEZOID, [], ROOF, False, 0)
+    other_roof = RoofParams(**{**ROOF.__dict__, "overlap": 0.2})
+    assert key != layout_key(TRAPEZOID, CUTOUTS, other_roof, False, 0)
+
+
+@pytest.mark.asyncio
+async def test_cached_slope_layout():
+    layout_cache.local.clear()
+    misses = layout_cache.misses
+    first = await cached_slope_layout(TRAPEZOID, CUTOUTS, ROOF, False, 0.3)
+    second = await cached_slope_layout(TRAPEZOID, CUTOUTS, ROOF, False, 0.3)
+    assert first == second == slope_layout(TRAPEZOID, CUTOUTS, ROOF, False, 0.3)
+    assert layout_cache.misses == misses + 1
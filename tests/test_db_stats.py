@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+from app import db_stats
+from app.config import settings
+from app.db_stats import QueryStats, QueryStatsMiddleware, RequestQueries, current_queries
+from benchmarks.api_load import ASGIClient
+
+
+def execute(statement: str) -> None:
+    """
+    Имитация выполнения запроса драйвером: те же события, что шлет SQLAlchemy.
+    """
+    context = SimpleNamespace()
+    db_stats._before_cursor_execute(None, None, statement, (), context, False)
+    db_stats._after_cursor_execute(None, None, statement, (), context, False)
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/projects/{project_id}")
+    async def get_project(project_id: int):
+        for _ in range(project_id):
+            execute(f"SELECT {project_id}")
+        return {}
+
+    app.add_middleware(QueryStatsMiddleware)
+    return app
+
+
+def test_request_queries_keep_slowest():
+    queries = RequestQueries()
+    queries.observe("SELECT 1", 0.01)
+    queries.observe("SELECT 2", 0.03)
+    queries.observe("SELECT 3", 0.02)
+    assert queries.count == 3
+    assert queries.seconds == pytest.approx(0.06)
+    assert queries.slowest_statement == "SELECT 2"
+
+
+def test_engine_events_feed_current_request():
+    engine = create_engine("sqlite://")
+    db_stats.instrument_engine(engine)
+    db_stats.instrument_engine(engine)
+    queries = RequestQueries()
+    token = current_queries.set(queries)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        current_queries.reset(token)
+    assert queries.count == 2
+    assert queries.slowest_statement in ("SELECT 1", "SELECT 2")
+
+
+def test_queries_outside_request_are_ignored():
+    assert current_queries.get() is None
+    execute("SELECT 1")
+
+
+@pytest.mark.asyncio
+async def test_middleware_counts_per_endpoint(monkeypatch):
+    stats = QueryStats()
+    monkeypatch.setattr(db_stats, "query_stats", stats)
+    monkeypatch.setattr(settings, "DEBUG", 1)
+    client = ASGIClient(make_app())
+    response = await client.request("GET", "/projects/3")
+    await client.request("GET", "/projects/1")
+    assert response.headers["x-db-queries"] == "3"
+    assert "x-db-time-ms" in response.headers
+    assert response.state["db_queries"].count == 3
+    snapshot = stats.snapshot()["GET /projects/{project_id}"]
+    assert snapshot["requests"] == 2
+    assert snapshot["avg_queries"] == 2
+    assert snapshot["max_queries"] == 3
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_are_logged(monkeypatch):
+    monkeypatch.setattr(db_stats, "query_stats", QueryStats())
+    monkeypatch.setattr(settings, "DEBUG", 0)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_QUERIES", 2)
+    records = []
+    sink = logger.add(records.append, filter=lambda record: record["extra"].get("slow_request", False))
+    try:
+        client = ASGIClient(make_app())
+        fast = await client.request("GET", "/projects/2")
+        await client.request("GET", "/projects/5")
+    finally:
+        logger.remove(sink)
+    assert "x-db-queries" not in fast.headers
+    assert len(records) == 1
+    extra = records[0].record["extra"]
+    assert extra["endpoint"] == "GET /projects/{project_id}"
+    assert extra["queries"] == 5
+    assert extra["slowest_statement"] == "SELECT 5"
+
+
+def test_read_engine_shares_pool_in_read_only_mode():
+    from app.db import engine, read_engine
+
+    assert read_engine.pool is engine.pool
+    assert read_engine.get_execution_options() == {"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+    assert engine.pool.size() == settings.DB_POOL_SIZE
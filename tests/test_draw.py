@@ -0,0 +1,61 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import pytest
+
+from app.projects import draw
+from app.projects.draw import draw_plan, iter_plan_svg
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def make_plan(columns=3, rows=2):
+    sheets = [
+        SimpleNamespace(x_start=i * 1.1, y_start=j * 3.0, length=3.35)
+        for i in range(columns) for j in range(rows)
+    ]
+    lines = [
+        SimpleNamespace(x_start=0, y_start=0, x_end=columns * 1.1, y_end=0, name="A"),
+        SimpleNamespace(x_start=0, y_start=0, x_end=0, y_end=rows * 3.0, name="B<1>"),
+    ]
+    return lines, sheets
+
+
+def test_svg_contains_sheets_lines_and_labels():
+    lines, sheets = make_plan()
+    root = ElementTree.fromstring(draw_plan(lines, sheets, 1.19))
+    assert len(root.findall(f"{SVG}rect")) == len(sheets)
+    assert len(root.findall(f"{SVG}line[@class='line']")) == len(lines)
+    texts = [text.text for text in root.findall(f"{SVG}text")]
+    assert texts.count("3.35") == len(sheets)
+    assert "B<1>" in texts
+    # y вверх на плане -> y вниз в SVG: линия на y=0 у нижнего края
+    line = root.find(f"{SVG}line[@class='line']")
+    assert line.get("y1") == root.get("height")
+
+    unlabeled = ElementTree.fromstring(draw_plan(lines, sheets, 1.19, labels=False))
+    assert unlabeled.findall(f"{SVG}text") == []
+
+
+def test_output_is_deterministic_and_streamed(monkeypatch):
+    lines, sheets = make_plan(columns=40, rows=10)
+    svg = draw_plan(lines, sheets, 1.19)
+    assert svg == draw_plan(lines, sheets, 1.19)
+    monkeypatch.setattr(draw, "SVG_CHUNK_BYTES", 1024)
+    chunks = list(iter_plan_svg(lines, sheets, 1.19))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == svg
+
+    png = draw_plan(lines, sheets, 1.19, fmt="png", dpi=72)
+    assert png.startswith(b"\x89PNG")
+    assert png == draw_plan(lines, sheets, 1.19, fmt="png", dpi=72)
+    with pytest.raises(ValueError):
+        draw_plan(lines, sheets, 1.19, fmt="pdf")
+
+
+def test_module_does_not_import_matplotlib():
+    code = "import sys, app.projects.draw; print('matplotlib' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
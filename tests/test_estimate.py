@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.projects import estimate as estimate_module
+from app.projects.estimate import apply_sheet_delta, estimate_diff, length_key, remove_accessory_base
+
+SLOPES = {
+    "s1": {"name": "A", "area": 20.0, "area_overall": 11.8, "area_usefull": 11.0},
+    "s2": {"name": "B", "area": 8.0, "area_overall": 0, "area_usefull": 0},
+}
+SHEETS_AMOUNT = {"5.0": 1, "3.5": 2}
+
+
+def test_delta_replaces_sheets_of_slope():
+    slopes, sheets_amount = apply_sheet_delta(
+        SLOPES, SHEETS_AMOUNT, "s1",
+        removed=[(5.0, 5.9, 5.5), (3.5, 2.95, 2.75)],
+        added=[(4, 4.72, 4.4)],
+        area=21.0
+    )
+    assert slopes["s1"] == {"name": "A", "area": 21.0, "area_overall": 7.67, "area_usefull": 7.15}
+    assert slopes["s2"] == SLOPES["s2"]
+    assert sheets_amount == {"3.5": 1, "4.0": 1}
+    # исходные данные не меняются
+    assert SLOPES["s1"]["area_overall"] == 11.8
+    assert SHEETS_AMOUNT == {"5.0": 1, "3.5": 2}
+
+
+def test_delete_and_return_sheet_cancel_out():
+    row = (3.5, 2.95, 2.75)
+    slopes, sheets_amount = apply_sheet_delta(SLOPES, SHEETS_AMOUNT, "s1", removed=[row])
+    slopes, sheets_amount = apply_sheet_delta(slopes, sheets_amount, "s1", added=[row])
+    assert estimate_diff(
+        {"slopes": slopes, "sheets_amount": sheets_amount, "accessories": {}},
+        {"slopes": SLOPES, "sheets_amount": SHEETS_AMOUNT, "accessories": {}}
+    ) == []
+
+
+def test_diff_reports_mismatches():
+    stored = {"slopes": SLOPES, "sheets_amount": SHEETS_AMOUNT, "accessories": {}}
+    fresh = {
+        "slopes": {"s1": dict(SLOPES["s1"], area_overall=12.0)},
+        "sheets_amount": {"5.0": 1},
+        "accessories": {},
+    }
+    diff = estimate_diff(stored, fresh)
+    assert len(diff) == 3
+    assert diff[0].startswith("slope s1 area_overall")
+
+
+def test_length_key_normalizes_numbers():
+    assert length_key(4) == length_key(4.0) == "4.0"
+
+
+@pytest.mark.asyncio
+async def test_deleting_accessory_base_removes_it_from_stored_estimates(monkeypatch):
+    stored = {
+        "p1": SimpleNamespace(id="e1", accessories={"a1": {"name": "Конек"}, "a2": {"name": "Ендова"}}),
+        "p2": SimpleNamespace(id="e2", accessories={"a3": {"name": "Конек"}}),
+    }
+    calls = []
+
+    async def find_by_base(session, accessory_base_id):
+        calls.append(("select", accessory_base_id))
+        return [("a1", "p1"), ("a3", "p2")]
+
+    async def delete_(session, model_id):
+        calls.append(("delete", model_id))
+
+    async def find_for_update(session, project_id):
+        return stored[project_id]
+
+    async def update_(session, model_id, accessories):
+        estimate = next(e for e in stored.values() if e.id == model_id)
+        estimate.accessories = accessories
+
+    monkeypatch.setattr(estimate_module.AccessoriesDAO, "find_by_base", find_by_base)
+    monkeypatch.setattr(estimate_module.Accessory_baseDAO, "delete_", delete_)
+    monkeypatch.setattr(estimate_module.ProjectEstimateDAO, "find_for_update", find_for_update)
+    monkeypatch.setattr(estimate_module.ProjectEstimateDAO, "update_", update_)
+
+    await remove_accessory_base(None, "base-1")
+    assert calls == [("select", "base-1"), ("delete", "base-1")]
+    assert stored["p1"].accessories == {"a2": {"name": "Ендова"}}
+    assert stored["p2"].accessories == {}
@@ -0,0 +1,59 @@
+import io
+from types import SimpleNamespace
+
+import openpyxl
+import pytest
+
+from app.projects import draw
+from app.projects.draw import _sheet_title, create_excel, write_specification
+
+
+def make_estimate(name="Дом", sheets=3):
+    return SimpleNamespace(
+        name=name,
+        address="Москва",
+        roof=SimpleNamespace(type="Металлочерепица", useful_width=1.1, overall_width=1.19, overlap=0.35, max_length=8),
+        materials=SimpleNamespace(name="Монтеррей", material="Сталь", color="RAL 3005"),
+        sheets_amount={round(2 + i * 0.35, 2): i + 1 for i in range(sheets)},
+        slopes=[SimpleNamespace(name="A", area_full=20.5, area_overall=23.1, area_usefull=21.0)],
+        accessories=[
+            SimpleNamespace(
+                accessory_base=SimpleNamespace(name="Конек", price=900), lines_length=12.5, quantity=6
+            )
+        ],
+        screws=[SimpleNamespace(name="Саморез 4,8х35", amount=138, price=1500)],
+    )
+
+
+def test_sheet_titles_are_valid_and_unique():
+    used = set()
+    assert _sheet_title("Дом: [старый]/новый", used) == "Дом   старый  новый"
+    assert _sheet_title("x" * 40, used) == "x" * 31
+    assert _sheet_title("X" * 40, used) == "X" * 27 + " (2)"
+
+
+def test_workbook_has_sheet_per_project_with_styles():
+    output = io.BytesIO()
+    write_specification((make_estimate(name) for name in ("Дом", "Дом", "Баня")), output)
+    output.seek(0)
+    wb = openpyxl.load_workbook(output)
+    assert wb.sheetnames == ["Дом", "Дом (2)", "Баня"]
+    ws = wb["Баня"]
+    rows = [[value for value in row if value is not None] for row in ws.iter_rows(values_only=True)]
+    assert rows[0][0] == "Проект: Баня, Адрес: Москва"
+    assert ws["A1"].style == "spec_title"
+    assert ["Длина листа (м)", "Количество (шт)"] in rows
+    assert [2.35, 2] in rows
+    assert ["Конек", 12.5, 6, 900] in rows
+    header = next(row for row in ws.iter_rows() if row[0].value == "Скат")
+    assert header[0].style == "spec_header" and header[0].border.left.style == "thin"
+
+
+@pytest.mark.asyncio
+async def test_create_excel_streams_chunks(monkeypatch):
+    monkeypatch.setattr(draw, "EXCEL_CHUNK_BYTES", 1024)
+    monkeypatch.setattr(draw, "EXCEL_SPOOL_BYTES", 2048)
+    chunks = [chunk async for chunk in create_excel([make_estimate(sheets=500)])]
+    assert len(chunks) > 1
+    wb = openpyxl.load_workbook(io.BytesIO(b"".join(chunks)))
+    assert wb.sheetnames == ["Дом"]
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.projects import executor as executor_module
+from app.projects.executor import (
+    GeoLine, GeoPoint, GeometryExecutor, RoofParams, find_slopes, slope_graph, slope_layout
+)
+from app.projects.layout import layout_sheets
+from app.projects.slope import create_figure, generate_slopes_length
+
+
+def make_lines(coords):
+    points = {}
+    lines = []
+    for number, ((x1, y1), (x2, y2)) in enumerate(coords, start=1):
+        start = points.setdefault((x1, y1), GeoPoint(id=f"p{len(points)}", x=x1, y=y1))
+        end = points.setdefault((x2, y2), GeoPoint(id=f"p{len(points)}", x=x2, y=y2))
+        lines.append(GeoLine(id=f"l{number}", start_id=start.id, end_id=end.id, start=start, end=end))
+    return lines
+
+
+TRAPEZOID = make_lines([((0, 0), (12.3, 0)), ((12.3, 0), (9.1, 4.7)), ((9.1, 4.7), (3.2, 4.7)), ((3.2, 4.7), (0, 0))])
+CUTOUTS = [[(2, 1), (3, 1), (3, 2), (2, 2)]]
+ROOF = RoofParams(overall_width=1.19, useful_width=1.1, max_length=8, min_length=0.5, overlap=0.35, imp_sizes=[])
+
+
+@pytest.mark.asyncio
+async def test_inline_for_small_inputs():
+    executor = GeometryExecutor(max_workers=2, inline_threshold=100)
+    area, sheets = await executor.run(slope_layout, TRAPEZOID, CUTOUTS, ROOF, False, 0, size=8)
+    figure = create_figure(TRAPEZOID, CUTOUTS)
+    assert area == figure.area
+    assert sheets == layout_sheets(figure, ROOF, False, 0)
+    assert executor._pool is None
+    assert executor.snapshot()["tasks"]["slope_layout"]["inline_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_matches_inline():
+    executor = GeometryExecutor(max_workers=1, inline_threshold=0)
+    try:
+        area, sheets = await executor.run(slope_layout, TRAPEZOID, CUTOUTS, ROOF, True, 0.3, size=8)
+        slopes = await executor.run(find_slopes, TRAPEZOID, size=4)
+    finally:
+        executor.shutdown()
+    assert (area, sheets) == slope_layout(TRAPEZOID, CUTOUTS, ROOF, True, 0.3)
+    assert slopes == [["l1", "l2", "l3", "l4"]]
+    snapshot = executor.snapshot()
+    assert snapshot["pending"] == 0
+    assert snapshot["tasks"]["slope_layout"]["calls"] == 1
+    assert snapshot["tasks"]["slope_layout"]["inline_calls"] == 0
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_replaced_once(monkeypatch):
+    pools = []
+
+    class CountingPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(executor_module, "ProcessPoolExecutor", CountingPool)
+    executor = GeometryExecutor(max_workers=1, inline_threshold=0)
+    try:
+        worker_pid = await executor.run(os.getpid, size=1)
+        in_flight = asyncio.ensure_future(executor.run(time.sleep, 0.2, size=1))
+        await asyncio.sleep(0)
+        os.kill(worker_pid, signal.SIGKILL)
+        # Цикл событий не отпускается, пока пул не обнаружит гибель процесса:
+        # ошибка задачи in_flight приходит после того, как restart создаст новый пул
+        deadline = time.monotonic() + 10
+        while not pools[0]._broken and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+
+        async def restart():
+            assert await executor.run(os.getpid, size=1) == os.getpid()
+            return await executor.run(os.getpid, size=1)
+
+        _, new_pid = await asyncio.gather(in_flight, restart())
+        assert await executor.run(os.getpid, size=1) == new_pid
+    finally:
+        executor.shutdown()
+    assert new_pid not in (worker_pid, os.getpid())
+    assert len(pools) == 2
+    assert pools[0]._shutdown_thread
+    assert executor.snapshot()["pending"] == 0
+
+
+def test_slope_graph_shares_endpoints():
+    points, lines = slope_graph(TRAPEZOID)
+    assert list(points) == ["p0", "p1", "p2", "p3"]
+    assert len({point.id for point in points.values()}) == 4
+    assert lines[0].end is lines[1].start
+    assert lines[-1].end is lines[0].start
+    assert [(line.start.x, line.start.y) for line in lines] == [(line.start.x, line.start.y) for line in TRAPEZOID]
+    assert generate_slopes_length(lines=lines, points=list(points.values()))
@@ -0,0 +1,94 @@
+import asyncio
+import zipfile
+
+import openpyxl
+import pytest
+
+from app.exceptions import ExportJobNotFound, ExportTooLarge
+from app.projects.exports import DONE, FAILED, ExportService, RedisJobStore
+from tests.test_cache import DictRedis
+from tests.test_excel import make_estimate
+
+
+class Loader:
+    """
+    Сметы по id проекта с задержкой; "missing" — удаленный проект, "broken" — ошибка.
+    """
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, project_id):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if project_id == "broken":
+                raise RuntimeError("db is down")
+            return None if project_id == "missing" else make_estimate(name=f"Дом/{project_id}")
+        finally:
+            self.running -= 1
+
+
+def make_service(tmp_path, loader, **options):
+    return ExportService(
+        directory=tmp_path, concurrency=options.get("concurrency", 3), max_projects=options.get("max_projects", 50),
+        ttl=60, loader=loader
+    )
+
+
+async def wait_finished(service, job_id, user_id="u1"):
+    for _ in range(500):
+        job = await service.get(job_id, user_id)
+        if job.status in (DONE, FAILED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("export did not finish")
+
+
+@pytest.mark.asyncio
+async def test_export_writes_zip_with_bounded_parallelism(tmp_path):
+    loader = Loader()
+    service = make_service(tmp_path, loader)
+    ids = [f"p{i}" for i in range(10)] + ["missing", "broken", "p0"]
+    job = await service.submit("u1", ids)
+    assert len(job.project_ids) == 12
+
+    job = await wait_finished(service, job.id)
+    assert job.status == DONE
+    assert job.done == 12
+    assert sorted(job.failed) == ["broken", "missing"]
+    assert loader.max_running == 3
+    with zipfile.ZipFile(service.archive_path(job.id)) as archive:
+        names = sorted(archive.namelist())
+        assert names[0] == "001 Дом p0.xlsx"
+        assert len(names) == 10
+        with archive.open(names[0]) as entry:
+            assert openpyxl.load_workbook(entry).sheetnames == ["Дом p0"]
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_private_and_limited(tmp_path):
+    service = make_service(tmp_path, Loader(), max_projects=2)
+    with pytest.raises(ExportTooLarge):
+        await service.submit("u1", ["a", "b", "c"])
+    job = await service.submit("u1", ["a"])
+    with pytest.raises(ExportJobNotFound):
+        await service.get(job.id, "u2")
+    await wait_finished(service, job.id)
+
+
+@pytest.mark.asyncio
+async def test_shutdown_marks_running_jobs_failed_in_redis(tmp_path):
+    service = make_service(tmp_path, Loader(delay=10), concurrency=1)
+    service.store = RedisJobStore(DictRedis(), ttl=60)
+    job = await service.submit("u1", ["a", "b"])
+    await asyncio.sleep(0.01)
+    assert (await service.get(job.id, "u1")).status == "running"
+    await service.shutdown()
+    job = await service.get(job.id, "u1")
+    assert job.status == FAILED and job.error == "interrupted"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.projects.slope import find_slope
+
+
+def make_lines(segments):
+    points = {}
+    lines = []
+    for idx, (start, end) in enumerate(segments):
+        for coords in (start, end):
+            if coords not in points:
+                points[coords] = SimpleNamespace(id=len(points), x=coords[0], y=coords[1])
+        lines.append(SimpleNamespace(
+            id=f'line-{idx}',
+            start_id=points[start].id,
+            end_id=points[end].id,
+            start=points[start],
+            end=points[end],
+        ))
+    return lines
+
+
+ROOFS = {
+    'gable': [
+        ((0, 0), (10, 0)), ((10, 0), (10, 3)), ((10, 3), (10, 6)),
+        ((10, 6), (0, 6)), ((0, 6), (0, 3)), ((0, 3), (0, 0)),
+        ((0, 3), (10, 3)),
+    ],
+    'hip': [
+        ((0, 0), (12, 0)), ((12, 0), (12, 6)), ((12, 6), (0, 6)), ((0, 6), (0, 0)),
+        ((3, 3), (9, 3)),
+        ((0, 0), (3, 3)), ((0, 6), (3, 3)), ((12, 0), (9, 3)), ((12, 6), (9, 3)),
+    ],
+    'l_shape_with_valley': [
+        ((0, 0), (8, 0)), ((8, 0), (8, 4)), ((8, 4), (4, 4)), ((4, 4), (4, 8)),
+        ((4, 8), (0, 8)), ((0, 8), (0, 0)),
+        ((2, 2), (6, 2)), ((2, 2), (2, 6)),
+        ((0, 0), (2, 2)), ((8, 0), (6, 2)), ((8, 4), (6, 2)),
+        ((0, 8), (2, 6)), ((4, 8), (2, 6)), ((4, 4), (2, 2)),
+    ],
+    'dangling_line': [
+        ((0, 0), (4, 0)), ((4, 0), (4, 4)), ((4, 4), (0, 4)), ((0, 4), (0, 0)),
+        ((4, 4), (6, 6)),
+    ],
+}
+
+
+def as_sets(cycles):
+    return sorted(sorted(cycle) for cycle in cycles)
+
+
+@pytest.mark.parametrize('name', ROOFS)
+def test_faces_match_cycles(name):
+    lines = make_lines(ROOFS[name])
+    assert as_sets(find_slope(lines, method='faces')) == as_sets(find_slope(lines, method='cycles'))
+
+
+@pytest.mark.parametrize('name', ROOFS)
+def test_faces_are_closed_chains(name):
+    lines = {line.id: line for line in make_lines(ROOFS[name])}
+    for cycle in find_slope(list(lines.values())):
+        for current, following in zip(cycle, cycle[1:] + cycle[:1]):
+            shared = {lines[current].start_id, lines[current].end_id} & {lines[following].start_id, lines[following].end_id}
+            assert shared
@@ -0,0 +1,26 @@
+import pytest
+
+from app.users.geoip import UNKNOWN_CITY, GeoIPResolver
+
+
+@pytest.mark.asyncio
+async def test_missing_database_is_unknown(tmp_path):
+    resolver = GeoIPResolver(str(tmp_path / "missing.mmdb"), cache_bytes=1024)
+    assert await resolver.city("8.8.8.8") == UNKNOWN_CITY
+    assert await resolver.city("192.168.0.10") == UNKNOWN_CITY
+    assert await resolver.city("not-an-ip") == UNKNOWN_CITY
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_memoized(tmp_path, monkeypatch):
+    resolver = GeoIPResolver(str(tmp_path / "missing.mmdb"), cache_bytes=1024)
+    calls = []
+
+    def lookup(ip):
+        calls.append(ip)
+        return "Москва"
+
+    monkeypatch.setattr(resolver, "_lookup", lookup)
+    for _ in range(3):
+        assert await resolver.city("77.88.55.60") == "Москва"
+    assert calls == ["77.88.55.60"]
@@ -0,0 +1,45 @@
+import pytest
+from shapely.geometry import Polygon, box
+
+from app.projects.layout import create_sheets_strips, layout_sheets
+from app.projects.slope import create_sheets
+from tests.test_slope import MockRoof
+
+
+def cutout_polygon():
+    polygon = Polygon([(0, 0), (24, 0), (20, 6), (4, 6)])
+    for i in range(5):
+        polygon = polygon.difference(box(2.5 + i * 4, 1.5, 3.7 + i * 4, 2.9))
+    return polygon
+
+
+POLYGONS = [
+    Polygon([(0, 0), (10.75, 0), (5.375, 5.8)]),
+    Polygon([(0, 0), (2, 0), (4.1, 2.4), (2.1, 2.4)]),
+    Polygon([(0, 0), (12.3, 0), (9.1, 4.7), (3.2, 4.7)]),
+    Polygon([(0, 0), (7.4, 0), (7.4, 3.3), (3.1, 9.85), (0, 3.3)]),
+    cutout_polygon(),
+]
+
+ROOFS = [
+    MockRoof(),
+    MockRoof(max_length=6, imp_sizes=[[1.0, 1.4], [2.2, 2.6]]),
+    MockRoof(overall_width=1.18, useful_width=1.15, max_length=3.5, min_length=0.8, overlap=0.2),
+]
+
+
+@pytest.mark.parametrize("polygon", POLYGONS)
+@pytest.mark.parametrize("roof", ROOFS)
+@pytest.mark.parametrize("is_left", [False, True])
+@pytest.mark.parametrize("overhang", [0, 0.3])
+def test_strips_match_shapely(polygon, roof, is_left, overhang):
+    expected = create_sheets(polygon, roof, is_left, overhang)
+    assert create_sheets_strips(polygon, roof, is_left, overhang) == expected
+
+
+def test_layout_sheets_engines():
+    polygon = POLYGONS[0]
+    roof = MockRoof()
+    assert layout_sheets(polygon, roof, False, 0) == layout_sheets(polygon, roof, False, 0, engine='shapely')
+    with pytest.raises(KeyError):
+        layout_sheets(polygon, roof, False, 0, engine='unknown')
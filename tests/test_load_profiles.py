@@ -0,0 +1,210 @@
+import uuid
+
+import pytest
+from sqlalchemy import ARRAY, create_engine, inspect, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from app.base.models import AccessoriesBD, Roofs
+from app.dao.base import FULL_GRAPH, GEOMETRY, SHEETS_ONLY
+from app.db import Base
+from app.projects.dao import (
+    CutoutsDAO, LengthSlopeDAO, LinesDAO, LinesSlopeDAO, PointsCutoutsDAO, PointsSlopeDAO, ProjectsDAO, SheetsDAO
+)
+from app.projects.executor import geo_lines, slope_figure
+from app.projects.models import (
+    Accessories, Cutouts, DeletedSheets, LengthSlope, Lines, LinesSlope, Point, PointsCutout, PointSlope, Projects,
+    Sheets, Slopes
+)
+from app.projects.plans import PlanRequest
+from app.projects.router import _slope_response
+
+
+def compiled(dao, profile):
+    query = select(dao.model).options(*dao.profile_options(profile))
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_full_graph_keeps_model_joins():
+    assert compiled(PointsSlopeDAO, FULL_GRAPH) == compiled(PointsSlopeDAO, None)
+    assert "JOIN" in compiled(PointsSlopeDAO, FULL_GRAPH)
+
+
+@pytest.mark.parametrize("dao, profile", [
+    (PointsSlopeDAO, GEOMETRY),
+    (LinesSlopeDAO, GEOMETRY),
+    (SheetsDAO, SHEETS_ONLY),
+    (SheetsDAO, GEOMETRY),
+])
+def test_profiles_do_not_join(dao, profile):
+    # связи профиля подгружаются отдельными SELECT ... IN, основной запрос без JOIN
+    assert "JOIN" not in compiled(dao, profile)
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        SheetsDAO.profile_options("everything")
+
+
+# -------------------- Загрузка из базы --------------------
+#
+# Профили проверяются на SQLite в памяти: DAO выполняют свои запросы через
+# синхронную сессию, после чего объекты отсоединяются. Обращение к связи, которую
+# профиль не загрузил, завершается ошибкой (raiseload или DetachedInstanceError),
+# как и ленивая загрузка в AsyncSession.
+
+@compiles(ARRAY, "sqlite")
+def _array_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+class SyncSession:
+    """
+    Обертка синхронной сессии с интерфейсом AsyncSession.execute.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, query):
+        return self.session.execute(query)
+
+
+PROJECT_ID = uuid.uuid4()
+SLOPE_ID = uuid.uuid4()
+# Трапеция ската и ее прообраз на чертеже
+COORDS = [(0.0, 0.0), (12.0, 0.0), (9.0, 4.0), (3.0, 4.0)]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    tables = [model.__table__ for model in (
+        Projects, Point, Lines, Slopes, PointSlope, LinesSlope, LengthSlope,
+        Cutouts, PointsCutout, Sheets, DeletedSheets, Accessories, AccessoriesBD, Roofs
+    )]
+    Base.metadata.create_all(engine, tables=tables)
+    with Session(engine) as session:
+        session.add(Projects(id=PROJECT_ID, name="Дом", address="Москва", user_id=uuid.uuid4()))
+        session.add(Slopes(id=SLOPE_ID, name="A", is_left=False, project_id=PROJECT_ID))
+        points = [Point(id=uuid.uuid4(), x=x, y=y, project_id=PROJECT_ID) for x, y in COORDS]
+        points_slope = [
+            PointSlope(id=uuid.uuid4(), x=x, y=y, parent_id=point.id, slope_id=SLOPE_ID)
+            for (x, y), point in zip(COORDS, points)
+        ]
+        lines = [
+            Lines(id=uuid.uuid4(), name=f"L{i + 1}", is_perimeter=True, length=None,
+                  start_id=points[i].id, end_id=points[(i + 1) % 4].id, project_id=PROJECT_ID)
+            for i in range(4)
+        ]
+        lines_slope = [
+            LinesSlope(id=uuid.uuid4(), name=f"L{i + 1}", number=i + 1, parent_id=line.id, slope_id=SLOPE_ID,
+                       start_id=points_slope[i].id, end_id=points_slope[(i + 1) % 4].id)
+            for i, line in enumerate(lines)
+        ]
+        session.add_all(points + points_slope + lines + lines_slope)
+        session.add_all([
+            # высота между основаниями, от основания до вершины и между вершинами
+            LengthSlope(name="h0", type=0, length=4.0, line_slope_1_id=lines_slope[0].id, line_slope_2_id=lines_slope[2].id, slope_id=SLOPE_ID),
+            LengthSlope(name="h1", type=1, length=4.0, line_slope_1_id=lines_slope[0].id, point_1_id=points_slope[3].id, slope_id=SLOPE_ID),
+            LengthSlope(name="h2", type=2, length=4.0, point_1_id=points_slope[0].id, point_2_id=points_slope[2].id, slope_id=SLOPE_ID),
+        ])
+        cutout = Cutouts(id=uuid.uuid4(), slope_id=SLOPE_ID)
+        session.add(cutout)
+        session.add_all([
+            PointsCutout(number=number, x=x, y=y, cutout_id=cutout.id)
+            for number, (x, y) in enumerate([(5, 1), (6, 1), (6, 2), (5, 2)], start=1)
+        ])
+        sheets = [
+            Sheets(id=uuid.uuid4(), x_start=x, y_start=0.0, length=4.0, area_overall=4.76, area_usefull=4.4,
+                   is_deleted=is_deleted, slope_id=SLOPE_ID)
+            for x, is_deleted in ((0.0, False), (1.1, True), (2.2, False))
+        ]
+        session.add_all(sheets)
+        session.add(DeletedSheets(number=2, deleted_sheet_id=sheets[1].id, change_sheet_id=sheets[2].id, project_id=PROJECT_ID))
+        session.commit()
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def loaded_relationships(obj) -> set:
+    state = inspect(obj)
+    return set(state.mapper.relationships.keys()) - state.unloaded
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("dao, profile, expected", [
+    (LinesDAO, GEOMETRY, {"start", "end"}),
+    (LinesSlopeDAO, GEOMETRY, {"start", "end"}),
+    (PointsSlopeDAO, GEOMETRY, set()),
+    (LengthSlopeDAO, GEOMETRY, {"point_1", "point_2", "line_slope_1", "line_slope_2"}),
+    (CutoutsDAO, GEOMETRY, set()),
+    (PointsCutoutsDAO, GEOMETRY, set()),
+    (SheetsDAO, SHEETS_ONLY, {"deleted_sheets", "change_sheets"}),
+])
+async def test_profile_loads_exact_relationships(db, dao, profile, expected):
+    objects = await dao.find_all(SyncSession(db), profile=profile)
+    assert objects
+    for obj in objects:
+        assert loaded_relationships(obj) == expected
+    for line in (getattr(obj, name) for obj in objects for name in ("line_slope_1", "line_slope_2") if name in expected):
+        if line is not None:
+            assert loaded_relationships(line) == {"start", "end"}
+
+
+@pytest.mark.asyncio
+async def test_geometry_profile_feeds_layout_and_plan(db):
+    session = SyncSession(db)
+    project_lines = await LinesDAO.find_all(session, project_id=PROJECT_ID, profile=GEOMETRY)
+    lines = await LinesSlopeDAO.find_all(session, slope_id=SLOPE_ID, profile=GEOMETRY)
+    sheets = await SheetsDAO.find_all(session, slope_id=SLOPE_ID, is_deleted=False, profile=SHEETS_ONLY)
+    cutouts = await CutoutsDAO.find_all(session, slope_id=SLOPE_ID, profile=GEOMETRY)
+    points_cutout = await PointsCutoutsDAO.find_all(session, cutout_id=cutouts[0].id, profile=GEOMETRY)
+    db.expunge_all()
+
+    assert len(geo_lines(project_lines)) == 4
+    lines = sorted(lines, key=lambda line: line.number)
+    geo = geo_lines(lines)
+    assert [(line.start.x, line.start.y) for line in geo] == COORDS
+    assert slope_figure(geo, [[(p.x, p.y) for p in sorted(points_cutout, key=lambda p: p.number)]]).area == 35
+    plan = PlanRequest.from_slope(lines, sheets, 1.19)
+    assert [sheet.x_start for sheet in plan.sheets] == [0.0, 2.2]
+    assert plan.key
+    with pytest.raises(InvalidRequestError):
+        lines[0].slope
+
+
+@pytest.mark.asyncio
+async def test_geometry_profile_feeds_length_recompute(db):
+    session = SyncSession(db)
+    length_lines = await LengthSlopeDAO.find_all(session, slope_id=SLOPE_ID, profile=GEOMETRY)
+    db.expunge_all()
+
+    lengths = {}
+    for length_slope in length_lines:
+        # как в update_line_slope: концы берутся из загруженных профилем связей
+        if length_slope.type == 0:
+            lengths[length_slope.name] = round(abs(length_slope.line_slope_2.start.y - length_slope.line_slope_1.start.y), 2)
+        elif length_slope.type == 1:
+            lengths[length_slope.name] = round(abs(length_slope.line_slope_1.start.y - length_slope.point_1.y), 2)
+        else:
+            lengths[length_slope.name] = round(abs(length_slope.point_1.y - length_slope.point_2.y), 2)
+    assert lengths == {"h0": 4, "h1": 4, "h2": 4}
+
+
+@pytest.mark.asyncio
+async def test_project_graph_feeds_slope_response(db):
+    project = await ProjectsDAO.find_graph(SyncSession(db), project_id=PROJECT_ID)
+    db.expunge_all()
+
+    points = {point.id: point for point in project.points}
+    lines = {line.id: line for line in project.lines}
+    response = _slope_response(project.slopes[0], points, lines)
+    assert len(response.points) == 4
+    assert sorted((line.start.x, line.start.y) for line in response.lines) == sorted(COORDS)
+    assert sorted(line.length for line in response.length_line) == [4, 4, 4]
+    assert len(response.cutouts[0].points) == 4
+    assert len(response.sheets) == 3
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.cache import TieredCache
+from app.db_stats import TimedCheckoutMixin
+from app.metrics import observe_geometry_task, pool_snapshot, timed_stage
+from app.projects.executor import GeometryExecutor
+from app.users.passwords import PasswordService
+from tests.test_cache import DictRedis
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_geometry_tasks_map_to_stages():
+    before = sample("roof_geometry_stage_seconds_count", stage="find_slope", mode="pool")
+    wait_before = sample("roof_geometry_queue_wait_seconds_count", stage="find_slope")
+    observe_geometry_task("find_slopes", 0.2, 0.05, inline=False)
+    assert sample("roof_geometry_stage_seconds_count", stage="find_slope", mode="pool") == before + 1
+    assert sample("roof_geometry_queue_wait_seconds_count", stage="find_slope") == wait_before + 1
+
+
+@pytest.mark.asyncio
+async def test_timed_stage_wraps_sync_and_async():
+    @timed_stage("test_sync")
+    def sync_stage(x):
+        return x + 1
+
+    @timed_stage("test_async")
+    async def async_stage(x):
+        return x * 2
+
+    assert sync_stage(1) == 2
+    assert await async_stage(3) == 6
+    assert sample("roof_geometry_stage_seconds_count", stage="test_sync", mode="inline") == 1
+    assert sample("roof_geometry_stage_seconds_count", stage="test_async", mode="inline") == 1
+
+
+@pytest.mark.asyncio
+async def test_objects_update_runtime_metrics():
+    cache = TieredCache(prefix="metrics-test", max_bytes=1024, ttl=60)
+    cache.redis = DictRedis()
+    await cache.set("a", 1)
+    assert sample("roof_cache_local_entries", cache="metrics-test") == 1
+    cache.local.clear()
+    assert await cache.get("a") == 1   # из Redis
+    assert await cache.get("a") == 1   # из локального LRU
+    assert await cache.get("b") is None
+    assert sample("roof_redis_command_seconds_count", cache="metrics-test", command="get") == 2
+    assert sample("roof_cache_requests_total", cache="metrics-test", result="local_hit") == 1
+    assert sample("roof_cache_requests_total", cache="metrics-test", result="redis_hit") == 1
+    assert sample("roof_cache_requests_total", cache="metrics-test", result="miss") == 1
+    assert sample("roof_cache_hit_ratio", cache="metrics-test") == pytest.approx(2 / 3)
+    assert sample("roof_cache_local_entries", cache="metrics-test") == 1
+
+    before = sample("roof_geometry_tasks_total", task="rotate_lines", mode="inline")
+    GeometryExecutor()._observe("rotate_lines", 0.01, 0.0, inline=True)
+    assert sample("roof_geometry_tasks_total", task="rotate_lines", mode="inline") == before + 1
+
+    calls = sample("roof_password_calls_total")
+    service = PasswordService(max_workers=1, max_waiting=1)
+    try:
+        await service.verify("secret", await service.hash("secret"))
+    finally:
+        service.shutdown()
+    assert sample("roof_password_calls_total") == calls + 2
+    assert sample("roof_password_waiting") == 0
+    assert sample("roof_password_in_flight") == 0
+
+
+# Воркер uvicorn: кэш с одной записью и задача, ожидающая в пуле геометрии
+WORKER = """
+import asyncio
+from app.cache import TieredCache
+from app.metrics import GEOMETRY_PENDING
+cache = TieredCache(prefix="multiproc", max_bytes=1024, ttl=60)
+asyncio.run(cache.set("key", 1))
+GEOMETRY_PENDING.inc()
+"""
+
+
+def test_workers_are_summed_in_multiprocess_mode(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER], env=env) for _ in range(2)]
+    assert [worker.wait() for worker in workers] == [0, 0]
+
+    def collect():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+        return registry.get_sample_value
+
+    value = collect()
+    assert value("roof_cache_local_entries", {"cache": "multiproc"}) == 2
+    assert value("roof_geometry_pending") == 2
+    for worker in workers:
+        assert value("roof_cache_hit_ratio", {"cache": "multiproc", "pid": str(worker.pid)}) == 0
+
+    multiprocess.mark_process_dead(workers[0].pid, path=str(tmp_path))
+    value = collect()
+    assert value("roof_cache_local_entries", {"cache": "multiproc"}) == 1
+    assert value("roof_geometry_pending") == 1
+    assert value("roof_cache_hit_ratio", {"cache": "multiproc", "pid": str(workers[0].pid)}) is None
+
+
+def test_pool_checkout_is_timed(tmp_path):
+    class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+        pass
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool)
+    before = sample("roof_db_pool_checkout_seconds_count")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert sample("roof_db_pool_checkout_seconds_count") == before + 1
+
+
+def test_pool_saturation_and_timeouts(tmp_path):
+    class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+        pass
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.01
+    )
+    before = sample("roof_db_pool_timeouts_total")
+    first, second = engine.connect(), engine.connect()
+    assert pool_snapshot(engine.pool) == {
+        "size": 1, "max_connections": 2, "checked_out": 2, "checked_in": 0, "overflow": 1, "saturation": 1.0
+    }
+    assert sample("roof_db_pool_saturation") == 1.0
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    assert sample("roof_db_pool_timeouts_total") == before + 1
+    second.close()
+    first.close()
+    assert sample("roof_db_pool_checked_out") == 0
+    assert sample("roof_db_pool_overflow") == 0
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.exceptions import PasswordServiceBusyException
+from app.users.passwords import PasswordService
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify():
+    service = PasswordService(max_workers=2, max_waiting=10)
+    try:
+        hashed = await service.hash("secret")
+        assert await service.verify("secret", hashed)
+        assert not await service.verify("other", hashed)
+    finally:
+        service.shutdown()
+    snapshot = service.snapshot()
+    assert snapshot["calls"] == 3
+    assert snapshot["waiting"] == 0
+    assert snapshot["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_rejection():
+    service = PasswordService(max_workers=1, max_waiting=1)
+    try:
+        hashed = await service.hash("secret")
+        first = asyncio.create_task(service.verify("secret", hashed))
+        second = asyncio.create_task(service.verify("secret", hashed))
+        await asyncio.sleep(0)
+        assert service.in_flight == 1
+        assert service.waiting == 1
+        with pytest.raises(PasswordServiceBusyException):
+            await service.verify("secret", hashed)
+        assert await first and await second
+    finally:
+        service.shutdown()
+    assert service.snapshot()["rejected"] == 1
+    assert service.snapshot()["max_wait_seconds"] > 0
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.cache import TieredCache
+from app.projects.draw import draw_plan
+from app.projects.executor import GeometryExecutor
+from app.projects.plans import PlanRenderer, PlanRequest
+from tests.test_cache import DictRedis
+
+
+def slope(length=3.35):
+    point = lambda x, y: SimpleNamespace(x=x, y=y)
+    lines = [
+        SimpleNamespace(start=point(0, 0), end=point(3.3, 0), name="A"),
+        SimpleNamespace(start=point(0, 0), end=point(0, 6), name="B"),
+    ]
+    sheets = [SimpleNamespace(x_start=x * 1.1, y_start=0, length=length) for x in range(3)]
+    return lines, sheets
+
+
+class SlowExecutor(GeometryExecutor):
+    """
+    Инлайн-исполнитель, который уступает циклу событий перед отрисовкой.
+    """
+
+    async def run(self, func, *args, size: int = 0):
+        await asyncio.sleep(0.01)
+        return await super().run(func, *args, size=size)
+
+
+def make_renderer():
+    cache = TieredCache(prefix="plan-test", max_bytes=1024 * 1024, ttl=60)
+    cache.redis = DictRedis()
+    executor = SlowExecutor()
+    return PlanRenderer(cache=cache, executor=executor), executor
+
+
+def test_key_depends_on_content_and_options():
+    lines, sheets = slope()
+    key = PlanRequest.from_slope(lines, sheets, 1.19).key
+    assert PlanRequest.from_slope(list(reversed(lines)), list(reversed(sheets)), 1.19).key == key
+    assert PlanRequest.from_slope(lines, sheets, 1.19, dpi=300).key == key   # dpi только для PNG
+    assert PlanRequest.from_slope(*slope(length=4.0), 1.19).key != key
+    assert PlanRequest.from_slope(lines, sheets, 1.19, labels=False).key != key
+    assert PlanRequest.from_slope(lines, sheets, 1.19, fmt="png").key != key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_render_once_and_hit_cache():
+    renderer, executor = make_renderer()
+    lines, sheets = slope()
+    request = PlanRequest.from_slope(lines, sheets, 1.19, fmt="png", dpi=50)
+    results = await asyncio.gather(*(renderer.render(request) for _ in range(5)))
+    assert executor.stats["slope_plan"].calls == 1
+    assert all(result == results[0] for result in results)
+    assert results[0].startswith(b"\x89PNG")
+    assert renderer._in_flight == {}
+
+    renderer.cache.local.clear()
+    assert await renderer.render(request) == results[0]   # из Redis
+    assert executor.stats["slope_plan"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_render():
+    renderer, executor = make_renderer()
+    request = PlanRequest.from_slope(*slope(), 1.19)
+    first = asyncio.ensure_future(renderer.render(request))
+    second = asyncio.ensure_future(renderer.render(request))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert (await second).startswith(b"<?xml")
+    assert executor.stats["slope_plan"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_render_is_timed_once():
+    renderer, _ = make_renderer()
+    request = PlanRequest.from_slope(*slope(), 1.19)
+    labels = {"stage": "draw_plan", "mode": "inline"}
+    before = REGISTRY.get_sample_value("roof_geometry_stage_seconds_count", labels) or 0
+    content = await renderer.render(request)
+    # Исполнитель учитывает задачу под именем стадии draw_plan, сама отрисовка не таймится повторно
+    assert REGISTRY.get_sample_value("roof_geometry_stage_seconds_count", labels) == before + 1
+    assert content == draw_plan(request.lines, request.sheets, request.width)
@@ -0,0 +1,44 @@
+import json
+import pathlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.projects.rotate import apply_affine, rotation, rotate_slope, translation
+
+# Эталон получен из реализации на shapely (LineString + translate/rotate/scale)
+GOLDEN = json.loads((pathlib.Path(__file__).parent / "rotate_golden.json").read_text(encoding="utf-8"))
+
+
+def make_lines(case):
+    points, lines = {}, []
+    for i, (line_type, start, end) in enumerate(case):
+        for coords in (tuple(start), tuple(end)):
+            if coords not in points:
+                points[coords] = SimpleNamespace(id=f"p{len(points)}", x=coords[0], y=coords[1])
+        lines.append(SimpleNamespace(
+            id=f"l{i}", type=line_type, start=points[tuple(start)], end=points[tuple(end)]
+        ))
+    return lines
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=[case["name"] for case in GOLDEN])
+def test_matches_shapely_pipeline(case):
+    lines = rotate_slope(make_lines(case["lines"]))
+    assert [[l.start.x, l.start.y, l.end.x, l.end.y] for l in lines] == case["result"]
+
+
+def test_quarter_turns_are_exact():
+    segments = np.array([[[1.1, 2.3], [-4.7, 0.3]]])
+    turned = segments
+    for _ in range(4):
+        turned = apply_affine(rotation(90), turned)
+    assert turned.tolist() == segments.tolist()
+    moved = apply_affine(translation(-1.1, -2.3), segments)
+    assert moved.tolist() == (segments - (1.1, 2.3)).tolist()
+
+
+def test_ridge_required():
+    with pytest.raises(ValueError):
+        rotate_slope(make_lines([["примыкание", [0, 0], [1, 1]]]))
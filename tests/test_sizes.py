@@ -0,0 +1,81 @@
+import json
+import pathlib
+
+import pytest
+
+from app.projects.sizes import SizeLength, SizeLine, SizePoint, solve_sizes
+
+
+def rectangle():
+    points = [SizePoint("A", 0, 0), SizePoint("B", 10, 0), SizePoint("C", 10, 5), SizePoint("D", 0, 5)]
+    lines = [
+        SizeLine("AB", "A", "B", "pAB", "карниз", 2, 10),
+        SizeLine("BC", "B", "C", "pBC", "торец", 1, 5),
+        SizeLine("CD", "C", "D", "pCD", "конек", 2, 10),
+        SizeLine("DA", "D", "A", "pDA", "торец", 1, 5),
+    ]
+    return points, lines
+
+
+def test_rectangle_is_stretched():
+    points, lines = rectangle()
+    diff = solve_sizes(points, lines, [], line_sizes={"AB": 12, "BC": 6}, length_sizes={})
+    assert diff.points == {"B": (12, 0), "C": (12, 6), "D": (0, 6)}
+    assert diff.lines == {"AB": 12, "BC": 6, "CD": 12, "DA": 6}
+    assert diff.parents == {"pAB": 12, "pBC": 6, "pCD": 12, "pDA": 6}
+    # исходные точки не меняются
+    assert points[1].x == 10
+
+
+def test_unchanged_sizes_give_empty_diff():
+    points, lines = rectangle()
+    diff = solve_sizes(points, lines, [], line_sizes={"AB": 10, "BC": 5}, length_sizes={})
+    assert diff.points == {}
+    assert diff.lines == {}
+    assert diff.parents == {"pAB": 10, "pBC": 5, "pCD": 10, "pDA": 5}
+
+
+def test_measurement_sets_height_and_recomputes_lengths():
+    points = [SizePoint("A", 0, 0), SizePoint("B", 10, 0), SizePoint("C", 5, 4)]
+    lines = [
+        SizeLine("AB", "A", "B", "pAB", "карниз", 2, 10),
+        SizeLine("BC", "B", "C", "pBC", "ребро", 0, 6.403),
+        SizeLine("CA", "C", "A", "pCA", "ребро", 0, 6.403),
+    ]
+    lengths = [
+        SizeLength("h", 1, 4, point_1_id="C", line_slope_1_id="AB"),
+        SizeLength("h2", 2, 4, point_1_id="A", point_2_id="C"),
+    ]
+    diff = solve_sizes(points, lines, lengths, line_sizes={}, length_sizes={"h": 5})
+    assert diff.points == {"C": (5, 5)}
+    assert diff.lines == {"BC": 7.071, "CA": 7.071}
+    assert diff.lengths == {"h": 5, "h2": 5}
+
+
+# Эталон получен из прежней реализации add_sizes (шаги с UPDATE на каждую точку)
+# на скатах, построенных как в add_slope из планов benchmarks/roofs.py и
+# полувальмовой крыши, скатов между ендовами, над ендовами с фронтонами и
+# карнизами, ската с карнизом уступами.
+# Правки: каждая горизонталь, диагональ и вертикаль, конёк вместе с диагоналями,
+# все размеры сразу, высоты измерительных линий; полный запрос (все линии
+# ската) и только изменённые линии. Не вошли запросы, на которых прежняя
+# реализация падала (горизонталь у конька без размера в запросе).
+CORPUS = json.loads((pathlib.Path(__file__).parent / "sizes_golden.json").read_text(encoding="utf-8"))
+CASES = [(slope, edit) for slope in CORPUS for edit in slope["edits"]]
+
+
+@pytest.mark.parametrize("slope, edit", CASES, ids=[f"{slope['name']}/{edit['name']}" for slope, edit in CASES])
+def test_matches_corpus(slope, edit):
+    lines = [SizeLine(*line) for line in slope["lines"]]
+    diff = solve_sizes(
+        points=[SizePoint(*point) for point in slope["points"]],
+        lines=lines,
+        lengths=[SizeLength(*length) for length in slope["lengths"]],
+        line_sizes=edit["line_sizes"],
+        length_sizes=edit["length_sizes"]
+    )
+    assert diff.points == {pid: tuple(xy) for pid, xy in edit["points"].items()}
+    assert diff.lines == edit["lines"]
+    # родительские линии получают длины всех линий ската
+    assert diff.parents == {line.parent_id: edit["lines"].get(line.id, line.length) for line in lines}
+    assert {lid: diff.lengths.get(lid) for lid in edit["lengths"]} == edit["lengths"]
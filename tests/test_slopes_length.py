@@ -0,0 +1,46 @@
+import json
+import pathlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.projects.slope import generate_slopes_length
+
+# Эталон получен из прежней реализации со списками: нормализованные скаты
+# из tests/rotate_golden.json и ступенчатые скаты, в том числе с перемешанным
+# порядком линий и точек
+CORPUS = json.loads((pathlib.Path(__file__).parent / "slopes_length_golden.json").read_text(encoding="utf-8"))
+
+
+def make_slope(case):
+    points = {pid: SimpleNamespace(id=pid, x=x, y=y) for pid, x, y in case["points"]}
+    lines = [
+        SimpleNamespace(id=lid, start_id=start, end_id=end, start=points[start], end=points[end])
+        for lid, start, end in case["lines"]
+    ]
+    return lines, list(points.values())
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_matches_corpus(case):
+    lines, points = make_slope(case)
+    assert generate_slopes_length(lines=lines, points=points) == case["result"]
+
+
+def test_large_comb_slope():
+    # Гребёнка из 200 ступеней: при переборе списков работает квадратично
+    segments = [((0, 0), (400, 0))]
+    x = 400
+    for step in range(200):
+        segments.append(((x, step), (x, step + 1)))
+        segments.append(((x, step + 1), (x - 2, step + 1)))
+        x -= 2
+    segments.append(((0, 200), (0, 0)))
+    points, lines = {}, []
+    for idx, (a, b) in enumerate(segments):
+        for coords in (a, b):
+            points.setdefault(coords, SimpleNamespace(id=f"p{len(points)}", x=coords[0], y=coords[1]))
+        lines.append(SimpleNamespace(id=f"l{idx}", start_id=points[a].id, end_id=points[b].id, start=points[a], end=points[b]))
+    result = generate_slopes_length(lines=lines, points=list(points.values()))
+    assert len(result) == 198
+    assert all(s_line[0] == 0 and s_line[1] == "l0" for s_line in result)